@@ -0,0 +1,291 @@
+"""Benchmarks of the optimizer hot paths
+
+Each hot path is timed separately on the corpora from `data/raw` and the results are written as JSON. The import of
+the package is timed in fresh interpreters, it must not load the corpus processing dependencies. With `--compare` the
+results are compared with a saved baseline and the benchmarks that became slower than the tolerance are reported as
+regressions (the exit code is 1 in this case, as well as when the import loads the corpus processing dependencies)
+
+Usage (from the repository root)::
+
+    python -m benchmarks.run_benchmarks --output baseline.json
+    python -m benchmarks.run_benchmarks --output current.json --compare baseline.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import pathlib
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from mlo_optimizer.components.genetic_alg import mate_matrix, mutate_matrix, random_matrix, vary_population
+from mlo_optimizer.components.genome import LayoutTemplate
+from mlo_optimizer.data.read import read_dir
+from mlo_optimizer.keyboards.bigram_counter import count_bigrams
+from mlo_optimizer.keyboards.bigrams import filter_bigram_probs, get_bigram_probs, get_bigram_probs_vec, \
+    tokenize_by_letters
+from mlo_optimizer.keyboards.evaluator import LayoutEvaluator
+from mlo_optimizer.keyboards.fitness import weighted_average_fitness_func
+from mlo_optimizer.optimizer import Optimizer
+
+import numpy as np
+
+ROOT_DIR = pathlib.Path(__file__).resolve().parent.parent
+DATA_DIR = ROOT_DIR / 'data' / 'raw'
+
+PUNCTUATION = ['.', ',', '!', '?', '-', ':', ';', '(', ')']
+ALPHABETS = {
+    'en': [chr(i) for i in range(ord('a'), ord('z') + 1)],
+    'ru': [chr(i) for i in range(ord('а'), ord('я') + 1)] + ['ё'],
+}
+
+POPULATION_SIZES = (50, 200, 800)
+IMPORTED_MODULES = ('mlo_optimizer.optimizer', 'mlo_optimizer.keyboards.evaluator')
+LAZY_MODULES = ('nltk', 'pandas', 'tqdm')
+TOLERANCE_DEFAULT = 0.2
+
+
+def get_layout(lang: str) -> tuple:
+    """Creates the initial matrix, counted and permutable elements of the language
+
+    :param lang: Language of the corpus ('en' or 'ru')
+    :type lang: str
+    :return: Initial matrix, counted elements and permutable elements
+    """
+    permutable_elems = ALPHABETS[lang] + PUNCTUATION
+    counted_elems = ALPHABETS[lang] + ['space', 'enter'] + PUNCTUATION
+
+    # Free slots surrounded by a frame of invisible keys, space and enter are fixed
+    n_cols = 9
+    n_rows = -(-(len(permutable_elems) + 2) // (n_cols - 2)) + 2
+    init_matrix = [['inv'] + [None] * (n_cols - 2) + ['inv'] for _ in range(n_rows)]
+    init_matrix[0] = init_matrix[-1] = ['inv'] * n_cols
+    init_matrix[n_rows // 2][n_cols // 2] = 'space'
+    init_matrix[n_rows // 2][-2] = 'enter'
+
+    return init_matrix, counted_elems, permutable_elems
+
+
+def time_call(func: callable, repeat: int, number: int = 1) -> dict:
+    """Times the function call
+
+    :param func: Function without arguments
+    :type func: callable
+    :param repeat: Number of measurements
+    :type repeat: int
+    :param number: Number of calls in one measurement
+    :type number: int
+    :return: Median and minimal time of one call in seconds
+    """
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start_time) / number)
+
+    return {'median': statistics.median(timings), 'min': min(timings), 'repeat': repeat, 'number': number}
+
+
+def run_in_interpreter(code: str) -> str:
+    """Runs the code in a fresh interpreter started in the repository root
+
+    :param code: Python code
+    :type code: str
+    :return: Standard output of the code
+    """
+    return subprocess.run([sys.executable, '-c', code], cwd=ROOT_DIR, capture_output=True, text=True,
+                          check=True).stdout
+
+
+def time_import(module: str, repeat: int) -> dict:
+    """Times the import of the module in fresh interpreters (the startup of the interpreter is not included)
+
+    :param module: Name of the module
+    :type module: str
+    :param repeat: Number of measurements
+    :type repeat: int
+    :return: Median and minimal import time in seconds
+    """
+    code = f'import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)'
+    timings = [float(run_in_interpreter(code)) for _ in range(repeat)]
+
+    return {'median': statistics.median(timings), 'min': min(timings), 'repeat': repeat, 'number': 1}
+
+
+def get_loaded_lazy_modules(module: str) -> list:
+    """Finds the corpus processing dependencies loaded by the import of the module
+
+    :param module: Name of the module
+    :type module: str
+    :return: Names of the loaded modules from `LAZY_MODULES`
+    """
+    code = f'import json, sys; import {module}; print(json.dumps([name for name in {LAZY_MODULES!r} ' \
+           f'if name in sys.modules]))'
+    return json.loads(run_in_interpreter(code))
+
+
+def run_import_benchmarks(repeat: int) -> tuple:
+    """Times the imports of the package modules
+
+    :param repeat: Number of measurements of each benchmark
+    :type repeat: int
+    :return: Dictionary with timings of benchmarks and list of messages about eagerly loaded dependencies
+    """
+    results, errors = {}, []
+    for module in IMPORTED_MODULES:
+        results[f'import/{module}'] = time_import(module, repeat)
+        print(f'import/{module}: {results[f"import/{module}"]["median"]:.6f} s', file=sys.stderr)
+
+        loaded_modules = get_loaded_lazy_modules(module)
+        if loaded_modules:
+            errors.append(f'import {module} loads {", ".join(loaded_modules)}')
+
+    return results, errors
+
+
+def run_lang_benchmarks(lang: str, repeat: int, population_sizes: tuple) -> dict:
+    """Times the hot paths on the corpus of the language
+
+    :param lang: Language of the corpus ('en' or 'ru')
+    :type lang: str
+    :param repeat: Number of measurements of each benchmark
+    :type repeat: int
+    :param population_sizes: Population sizes of the timed optimizer generations
+    :type population_sizes: tuple
+    :return: Dictionary with timings of benchmarks
+    """
+    lang_dir = str(DATA_DIR / lang)
+    init_matrix, counted_elems, permutable_elems = get_layout(lang)
+    results = {}
+
+    def bench(name, func, number=1):
+        results[f'{lang}/{name}'] = time_call(func, repeat, number)
+        print(f'{lang}/{name}: {results[f"{lang}/{name}"]["median"]:.6f} s', file=sys.stderr)
+
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        texts = read_dir(lang_dir)
+        tokenized_text = tokenize_by_letters(texts)
+        raw_bigram_probs = get_bigram_probs(tokenized_text)
+        bigram_probs = filter_bigram_probs(raw_bigram_probs, counted_elems)
+        bigram_probs_vec = get_bigram_probs_vec(bigram_probs)
+
+    def run_quietly(func):
+        def wrapper():
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                func()
+        return wrapper
+
+    bench('read_dir', run_quietly(lambda: read_dir(lang_dir)))
+    bench('tokenize_by_letters', run_quietly(lambda: tokenize_by_letters(texts)))
+    bench('get_bigram_probs', run_quietly(lambda: get_bigram_probs(tokenized_text)))
+    bench('filter_bigram_probs', run_quietly(lambda: filter_bigram_probs(raw_bigram_probs, counted_elems)))
+    bench('count_bigrams', run_quietly(lambda: count_bigrams(lang_dir, counted_elems)))
+
+    template = LayoutTemplate(init_matrix, permutable_elems)
+    rng = np.random.default_rng(0)
+    population = [random_matrix(template, rng=rng) for _ in range(max(population_sizes))]
+    matrix = template.to_matrix(population[0].genome)
+    evaluator = LayoutEvaluator(init_matrix, bigram_probs, bigram_probs_vec, dist_func='hex', template=template)
+    for individual, fitness in zip(population, evaluator.evaluate_population(population)):
+        individual.fitness.values = fitness
+
+    bench('weighted_average_fitness_func', lambda: weighted_average_fitness_func(
+        matrix, bigram_probs, bigram_probs_vec, dist_func='hex'), number=10)
+    bench('layout_evaluator', lambda: evaluator.evaluate(matrix), number=100)
+    bench('mate_matrix', lambda: mate_matrix(population[0], population[1]), number=1000)
+    bench('mutate_matrix', lambda: mutate_matrix(population[0], template), number=1000)
+
+    for population_size in population_sizes:
+        sample = population[:population_size]
+        bench(f'evaluate_population/pop={population_size}',
+              lambda sample=sample: evaluator.evaluate_population(sample))
+        bench(f'vary_population/pop={population_size}',
+              lambda sample=sample: vary_population(sample, 0.9, 0.2, template, rng))
+
+        optimizer = Optimizer(init_matrix, counted_elems, permutable_elems, fitness_func='hex',
+                              population_size=population_size, max_generation=1, seed=0)
+        optimizer.bigram_probs, optimizer.bigram_probs_vec = bigram_probs, bigram_probs_vec
+        bench(f'optimize_generation/pop={population_size}', run_quietly(optimizer.optimize))
+
+    return results
+
+
+def compare_results(results: dict, baseline: dict, tolerance: float) -> list:
+    """Compares the timings with the baseline
+
+    :param results: Timings of benchmarks
+    :type results: dict
+    :param baseline: Timings of benchmarks of the baseline
+    :type baseline: dict
+    :param tolerance: Allowed relative slowdown
+    :type tolerance: float
+    :return: Names of the benchmarks that became slower than the tolerance
+    """
+    regressions = []
+
+    print(f'{"benchmark":<45} {"baseline, s":>12} {"current, s":>12} {"ratio":>8}')
+    for name, timing in results.items():
+        if name not in baseline:
+            print(f'{name:<45} {"-":>12} {timing["median"]:>12.6f} {"-":>8}')
+            continue
+
+        ratio = timing['median'] / baseline[name]['median']
+        is_regression = ratio > 1 + tolerance
+        if is_regression:
+            regressions.append(name)
+        print(f'{name:<45} {baseline[name]["median"]:>12.6f} {timing["median"]:>12.6f} {ratio:>8.2f}'
+              f'{"  REGRESSION" if is_regression else ""}')
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks of the optimizer hot paths')
+    parser.add_argument('--langs', nargs='*', default=['en', 'ru'], choices=sorted(ALPHABETS),
+                        help='Corpora from data/raw to benchmark (only imports are benchmarked without corpora)')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of measurements of each benchmark')
+    parser.add_argument('--population-sizes', nargs='+', type=int, default=list(POPULATION_SIZES),
+                        help='Population sizes of the timed optimizer generations')
+    parser.add_argument('--output', help='Path to the JSON file with results')
+    parser.add_argument('--compare', help='Path to the JSON file with baseline results')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE_DEFAULT,
+                        help='Allowed relative slowdown before a benchmark is reported as a regression')
+    args = parser.parse_args()
+
+    results, import_errors = run_import_benchmarks(args.repeat)
+    for lang in args.langs:
+        results.update(run_lang_benchmarks(lang, args.repeat, tuple(args.population_sizes)))
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+    if args.output:
+        pathlib.Path(args.output).write_text(json.dumps(report, indent=2))
+    else:
+        print(json.dumps(report, indent=2))
+
+    for error in import_errors:
+        print(f'REGRESSION: {error}')
+
+    if args.compare:
+        baseline = json.loads(pathlib.Path(args.compare).read_text())['results']
+        if compare_results(results, baseline, args.tolerance):
+            sys.exit(1)
+
+    if import_errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,58 +1,217 @@
 from deap import tools
 from deap.algorithms import varAnd
 
+from mlo_optimizer.components.instrumentation import get_profiler
 
-def ea_simple_elitism(population, toolbox, cxpb, mutpb, ngen, stats=None, halloffame=None, verbose=__debug__,
-                      callback=None):
-    logbook = tools.Logbook()
-    logbook.header = ['gen', 'nevals'] + (stats.fields if stats else [])
-
-    # Evaluate the individuals with an invalid fitness
-    invalid_ind = [ind for ind in population if not ind.fitness.valid]
-    fitnesses = toolbox.map(toolbox.evaluate, invalid_ind)
-    for ind, fit in zip(invalid_ind, fitnesses):
+
+def evaluate_individuals(individuals, toolbox):
+    """Evaluates the individuals and assigns them fitness values
+
+    If the toolbox has an `evaluate_population` function, the individuals are evaluated by it in a single call,
+    otherwise `evaluate` is mapped over them one by one
+
+    :param individuals: Individuals to be evaluated
+    :type individuals: list
+    :param toolbox: Toolbox with registered evaluation functions
+    :type toolbox: class:`deap.base.Toolbox`
+    """
+    if not individuals:
+        return
+
+    if hasattr(toolbox, 'evaluate_population'):
+        fitnesses = toolbox.evaluate_population(individuals)
+    else:
+        fitnesses = toolbox.map(toolbox.evaluate, individuals)
+
+    for ind, fit in zip(individuals, fitnesses):
         ind.fitness.values = fit
+        # The ancestor is not needed after the evaluation and must not be kept alive by the individual
+        if getattr(ind, 'origin', None) is not None:
+            ind.origin = None
+
+
+def vary_individuals(individuals, toolbox, cxpb, mutpb):
+    """Applies crossover and mutation to the individuals
+
+    If the toolbox has a `vary_population` function, the whole pool is varied by it in a single call, otherwise
+    `deap.algorithms.varAnd` is used
+
+    :param individuals: Individuals to be varied
+    :type individuals: list
+    :param toolbox: Toolbox with registered variation operators
+    :type toolbox: class:`deap.base.Toolbox`
+    :param cxpb: Crossbreeding probability
+    :type cxpb: float
+    :param mutpb: Mutation probability
+    :type mutpb: float
+    :return: List of offspring
+    """
+    if hasattr(toolbox, 'vary_population'):
+        return toolbox.vary_population(individuals, cxpb, mutpb)
+    return varAnd(individuals, toolbox, cxpb, mutpb)
+
+
+def refine_individuals(individuals, toolbox):
+    """Improves the evaluated individuals by a local search
+
+    If the toolbox has a `refine_population` function, it receives the evaluated individuals and returns a list
+    where some of them are replaced by improved individuals with valid fitness, otherwise the individuals are kept
+
+    :param individuals: Evaluated individuals
+    :type individuals: list
+    :param toolbox: Toolbox with an optional `refine_population` function
+    :type toolbox: class:`deap.base.Toolbox`
+    :return: List of individuals
+    """
+    if hasattr(toolbox, 'refine_population'):
+        return toolbox.refine_population(individuals)
+    return individuals
+
+
+def get_log_record(toolbox) -> dict:
+    """Gets additional logbook fields of the current generation
+
+    :param toolbox: Toolbox with an optional `get_log_record` function
+    :type toolbox: class:`deap.base.Toolbox`
+    :return: Dictionary with additional fields
+    """
+    if hasattr(toolbox, 'get_log_record'):
+        return toolbox.get_log_record()
+    return {}
+
+
+def get_elites(halloffame) -> list:
+    """Gets the individuals of the hall of fame returned to the population
+
+    :param halloffame: Hall of fame with an optional `get_elites` method (e.g. the one that keeps exact fitness values
+        of approximately evaluated individuals)
+    :return: List of individuals
+    """
+    if hasattr(halloffame, 'get_elites'):
+        return halloffame.get_elites()
+    return halloffame.items
 
-    if halloffame is not None:
-        halloffame.update(population)
 
-    hof_size = len(halloffame.items) if halloffame.items else 0
+def get_stop_reason(toolbox, logbook):
+    """Checks whether the run must stop after the last recorded generation
 
-    record = stats.compile(population) if stats else {}
-    logbook.record(gen=0, nevals=len(invalid_ind), **record)
-    if verbose:
-        print(logbook.stream)
+    The reason is saved in the 'stop_reason' field of the last logbook record
+
+    :param toolbox: Toolbox with an optional `get_stop_reason` function that receives a logbook record
+    :type toolbox: class:`deap.base.Toolbox`
+    :param logbook: Logbook of the completed generations
+    :type logbook: class:`deap.tools.Logbook`
+    :return: Reason of the stop or None
+    """
+    if not hasattr(toolbox, 'get_stop_reason'):
+        return None
+
+    stop_reason = toolbox.get_stop_reason(logbook[-1])
+    if stop_reason is not None:
+        logbook[-1]['stop_reason'] = stop_reason
+    return stop_reason
+
+
+def ea_simple_elitism(population, toolbox, cxpb, mutpb, ngen, stats=None, halloffame=None, verbose=__debug__,
+                      callback=None, start_gen=1, logbook=None):
+    # Phases are measured if the toolbox has a profiler
+    profiler = get_profiler(toolbox)
+
+    # A run resumed from a checkpoint continues with the evaluated population and the logbook of the completed
+    # generations
+    if logbook is None:
+        logbook = tools.Logbook()
+        logbook.header = ['gen', 'nevals'] + (stats.fields if stats else [])
+
+        # Evaluate the individuals with an invalid fitness
+        invalid_ind = [ind for ind in population if not ind.fitness.valid]
+        with profiler.phase('evaluate'):
+            evaluate_individuals(invalid_ind, toolbox)
+        with profiler.phase('refine'):
+            population[:] = refine_individuals(population, toolbox)
+
+        if halloffame is not None:
+            with profiler.phase('halloffame'):
+                halloffame.update(population)
+
+        with profiler.phase('stats'):
+            record = stats.compile(population) if stats else {}
+        record.update(get_log_record(toolbox))
+        record.update(profiler.get_log_record(len(invalid_ind), record))
+        logbook.header.extend(key for key in record if key not in logbook.header)
+        logbook.record(gen=0, nevals=len(invalid_ind), **record)
+        if verbose:
+            print(logbook.stream)
+
+        stop_reason = get_stop_reason(toolbox, logbook)
+        profiler.write(logbook[-1])
+        if stop_reason is not None:
+            return population, logbook
+    elif logbook and logbook[-1].get('stop_reason', 'max_generation') != 'max_generation':
+        # A run stopped early by a criterion is not continued, only a run that reached the last generation is extended
+        if verbose:
+            print(f'Early stop: {logbook[-1]["stop_reason"]}')
+        return population, logbook
+
+    # With a survivor selection (NSGA-II) the parents compete with a full set of offspring, otherwise the hall of fame
+    # individuals fill the rest of the next generation
+    survival = hasattr(toolbox, 'select_survivors')
 
     # Begin the generational process
-    for gen in range(1, ngen + 1):
+    for gen in range(start_gen, ngen + 1):
+        # The hall of fame with the diversity filter may shrink, so the number of elites is taken every generation
+        elites = get_elites(halloffame) if halloffame is not None and not survival else []
+
         # Select the next generation individuals
-        offspring = toolbox.select(population, len(population) - hof_size)
+        with profiler.phase('select'):
+            offspring = toolbox.select(population, len(population) - len(elites))
 
         # Vary the pool of individuals
-        offspring = varAnd(offspring, toolbox, cxpb, mutpb)
+        with profiler.phase('vary'):
+            offspring = vary_individuals(offspring, toolbox, cxpb, mutpb)
 
         # Evaluate the individuals with an invalid fitness
         invalid_ind = [ind for ind in offspring if not ind.fitness.valid]
-        fitnesses = toolbox.map(toolbox.evaluate, invalid_ind)
-        for ind, fit in zip(invalid_ind, fitnesses):
-            ind.fitness.values = fit
+        with profiler.phase('evaluate'):
+            evaluate_individuals(invalid_ind, toolbox)
+        with profiler.phase('refine'):
+            offspring = refine_individuals(offspring, toolbox)
 
-        offspring.extend(halloffame.items)
+        offspring.extend(elites)
 
         # Update the hall of fame with the generated individuals
         if halloffame is not None:
-            halloffame.update(offspring)
+            with profiler.phase('halloffame'):
+                halloffame.update(offspring)
 
-        # Replace the current population by the offspring
-        population[:] = offspring
+        # Replace the current population by the offspring or by the survivors of parents and offspring
+        if survival:
+            with profiler.phase('select'):
+                population[:] = toolbox.select_survivors(population + offspring, len(population))
+        else:
+            population[:] = offspring
 
         # Append the current generation statistics to the logbook
-        record = stats.compile(population) if stats else {}
+        with profiler.phase('stats'):
+            record = stats.compile(population) if stats else {}
+        record.update(get_log_record(toolbox))
+        record.update(profiler.get_log_record(len(invalid_ind), record))
         logbook.record(gen=gen, nevals=len(invalid_ind), **record)
         if verbose:
             print(logbook.stream)
 
+        stop_reason = get_stop_reason(toolbox, logbook)
+        profiler.write(logbook[-1])
+        if verbose and stop_reason is not None and stop_reason != 'max_generation':
+            print(f'Early stop: {stop_reason}')
+
+        if hasattr(toolbox, 'checkpoint'):
+            toolbox.checkpoint(gen, population, halloffame, logbook)
+
         if callback:
             callback[0](*callback[1])
 
+        if stop_reason is not None:
+            break
+
     return population, logbook
@@ -0,0 +1,132 @@
+from mlo_optimizer.components.archive import GenomeArchive
+
+
+class RescoredHallOfFame(GenomeArchive):
+    """Hall of fame with exact fitness values of individuals evaluated by an approximate objective function
+
+    The population is evaluated approximately, the exact score S of an individual with the approximate score S' lies
+    in [S', S' + error_bound]. Only the individuals that may enter the hall of fame by their exact score (the hall of
+    fame is not full or the best possible exact score is not worse than the worst kept one) are evaluated exactly, so
+    the hall of fame is the same as with exact evaluation of the whole population, while the number of exact
+    evaluations is small. Exact fitness values are kept only inside the hall of fame: the elite individuals returned
+    to the population (see `get_elites`) have their approximate fitness values, so they are selected on a par with the
+    other individuals and their offspring are evaluated incrementally from approximate scores
+
+    :param maxsize: Maximum number of kept individuals
+    :type maxsize: int
+    :param evaluate_population: Function that receives a list of individuals and returns a list of exact fitness
+        assessments
+    :type evaluate_population: callable
+    :param error_bound: Maximum difference between the exact and the approximate scores
+    :type error_bound: float
+    :param minimization: Minimization and Maximization Flag of the Objective Function
+    :type minimization: bool
+    :param min_distance: Minimum Hamming distance between kept genomes (see `GenomeArchive`)
+    :type min_distance: int
+    :param approximate_evaluate_population: Function that receives a list of individuals and returns a list of
+        approximate fitness assessments (it evaluates the individuals loaded from a checkpoint)
+    :type approximate_evaluate_population: callable
+    """
+
+    def __init__(self, maxsize: int, evaluate_population: callable, error_bound: float, minimization: bool = True,
+                 min_distance: int = 0, approximate_evaluate_population: callable = None):
+        super().__init__(maxsize, min_distance)
+        self.evaluate_population = evaluate_population
+        self.error_bound = error_bound
+        self.minimization = minimization
+        self.approximate_evaluate_population = approximate_evaluate_population
+        # Approximate fitness values of the kept individuals: bytes of the genome -> fitness values
+        self.approximate_values = {}
+        # Total number of exact evaluations
+        self.n_exact_evals = 0
+
+    def update(self, population: list):
+        """Evaluates exactly the individuals that may enter the hall of fame and updates it with them
+
+        :param population: Individuals with approximate fitness values
+        :type population: list
+        """
+        candidates = {}
+        for individual in population:
+            key = individual.genome.tobytes()
+            if key not in self.index and key not in candidates and self._may_enter(individual.fitness.values[0]):
+                candidates[key] = individual
+        if not candidates:
+            return
+
+        rescored = [type(individual)(individual.genome.copy()) for individual in candidates.values()]
+        for individual, fitness in zip(rescored, self.evaluate_population(rescored)):
+            individual.fitness.values = fitness
+        self.n_exact_evals += len(rescored)
+
+        super().update(rescored)
+
+        for key, individual in candidates.items():
+            if key in self.index:
+                self.approximate_values[key] = individual.fitness.values
+        # Values of the removed individuals are dropped
+        if len(self.approximate_values) > len(self.index):
+            self.approximate_values = {key: values for key, values in self.approximate_values.items()
+                                       if key in self.index}
+
+    def load(self, individuals: list):
+        """Replaces the kept individuals by the individuals with exact fitness values sorted from the best one and
+        evaluates them approximately
+
+        :param individuals: Evaluated individuals sorted from the best one
+        :type individuals: list
+        """
+        super().load(individuals)
+
+        self.approximate_values = {}
+        if self.approximate_evaluate_population is not None and self.items:
+            copies = [type(individual)(individual.genome) for individual in self.items]
+            for individual, fitness in zip(self.items, self.approximate_evaluate_population(copies)):
+                self.approximate_values[individual.genome.tobytes()] = tuple(fitness)
+
+    def clear(self):
+        super().clear()
+        self.approximate_values = {}
+
+    def get_elites(self) -> list:
+        """Gets copies of the kept individuals with their approximate fitness values
+
+        Individuals whose approximate values are unknown (loaded without the approximate objective function) keep
+        their exact values
+
+        :return: List of individuals from the best one by the exact fitness
+        """
+        elites = []
+        for item in self.items:
+            elite = type(item)(item.genome.copy())
+            elite.fitness.values = self.approximate_values.get(item.genome.tobytes(), item.fitness.values)
+            elites.append(elite)
+        return elites
+
+    def _may_enter(self, score: float) -> bool:
+        if len(self) < self.maxsize:
+            return True
+
+        worst_score = self.items[-1].fitness.values[0]
+        if self.minimization:
+            return score <= worst_score
+        return score + self.error_bound >= worst_score
+
+
+def rescore_halloffame(halloffame: GenomeArchive, evaluate_population: callable) -> GenomeArchive:
+    """Replaces the approximate fitness values of the kept individuals by exact ones
+
+    :param halloffame: Hall of fame with approximately evaluated individuals
+    :type halloffame: class:`GenomeArchive`
+    :param evaluate_population: Function that receives a list of individuals and returns a list of exact fitness
+        assessments
+    :type evaluate_population: callable
+    :return: Hall of fame of the same size sorted by exact fitness values
+    """
+    rescored = [type(individual)(individual.genome.copy()) for individual in halloffame.items]
+    for individual, fitness in zip(rescored, evaluate_population(rescored)):
+        individual.fitness.values = fitness
+
+    exact_halloffame = GenomeArchive(halloffame.maxsize, halloffame.min_distance)
+    exact_halloffame.update(rescored)
+    return exact_halloffame
@@ -0,0 +1,165 @@
+from bisect import bisect_left, bisect_right
+from copy import deepcopy
+
+import numpy as np
+
+
+class GenomeArchive:
+    """Hall of fame of individuals with compact genomes indexed by the bytes of their genomes
+
+    It keeps the interface of `deap.tools.HallOfFame` (items are sorted from the best one, keys are the fitnesses
+    sorted from the worst one), but an individual is checked against the kept ones by a single lookup in the hash index
+    instead of comparing it with every kept individual, and the position of a new individual is found by a binary
+    search. The insertion into the sorted lists shifts the references after the position, so it is linear in the size
+    of the archive, but it is a single memory move of at most `maxsize` pointers, which is faster than rebalancing a
+    tree for sizes of a hall of fame. Individuals that are not better than the worst kept one are skipped without
+    copying, so the elite individuals returned to the population every generation cost a comparison each
+
+    With `min_distance` > 0 the kept genomes differ from each other in at least `min_distance` genes (Hamming
+    distance): an individual close to kept ones enters the archive only if it is better than all of them, and they
+    are removed
+
+    :param maxsize: Maximum number of kept individuals
+    :type maxsize: int
+    :param min_distance: Minimum Hamming distance between kept genomes (0 - only equal genomes are not kept twice)
+    :type min_distance: int
+    """
+
+    def __init__(self, maxsize: int, min_distance: int = 0):
+        self.maxsize = maxsize
+        self.min_distance = min_distance
+        self.items = []
+        self.keys = []
+        self.index = {}
+        # Genomes of kept individuals by rows (only for the diversity filter)
+        self.genomes = None
+        self.row_items = []
+        self.rows = {}
+        self.free_rows = []
+
+    def update(self, population: list):
+        """Replaces the worst kept individuals by the better individuals of the population
+
+        :param population: Evaluated individuals
+        :type population: list
+        """
+        for individual in population:
+            if self.maxsize == 0:
+                return
+            if len(self) < self.maxsize or individual.fitness > self.keys[0]:
+                key = individual.genome.tobytes()
+                if key in self.index:
+                    continue
+
+                close_items = self._get_close_items(individual.genome) if self.min_distance > 0 else []
+                if any(not individual.fitness > item.fitness for item in close_items):
+                    continue
+                for item in close_items:
+                    self._remove_item(item)
+
+                if len(self) >= self.maxsize:
+                    self._remove_item(self.items[-1])
+                self.insert(individual, key)
+
+    def insert(self, individual, key: bytes = None):
+        """Inserts a copy of the individual after the kept individuals with equal fitness (the size is not checked)
+
+        The position is found in O(log n) comparisons of fitnesses, the lists are shifted in O(n) by a memory move
+
+        :param individual: Evaluated individual
+        :param key: Bytes of the genome
+        :type key: bytes
+        """
+        individual = deepcopy(individual)
+        key = key if key is not None else individual.genome.tobytes()
+
+        i = bisect_right(self.keys, individual.fitness)
+        self.items.insert(len(self) - i, individual)
+        self.keys.insert(i, individual.fitness)
+        self.index[key] = individual
+
+        if self.min_distance > 0:
+            self._add_row(key, individual)
+
+    def load(self, individuals: list):
+        """Replaces the kept individuals by the individuals sorted from the best one (e.g. restored from a checkpoint)
+        without copying them
+
+        :param individuals: Evaluated individuals sorted from the best one
+        :type individuals: list
+        """
+        self.clear()
+        self.items = list(individuals[:self.maxsize])
+        self.keys = [individual.fitness for individual in reversed(self.items)]
+        for individual in self.items:
+            key = individual.genome.tobytes()
+            self.index[key] = individual
+            if self.min_distance > 0:
+                self._add_row(key, individual)
+
+    def remove(self, index: int):
+        """Removes the individual by its position in items
+
+        :param index: Position of the individual
+        :type index: int
+        """
+        self._remove_item(self.items[index])
+
+    def clear(self):
+        self.items = []
+        self.keys = []
+        self.index = {}
+        self.genomes = None
+        self.row_items = []
+        self.rows = {}
+        self.free_rows = []
+
+    def _remove_item(self, individual):
+        # Equal fitnesses are neighbours among the keys, so the individual is found among them
+        start, end = bisect_left(self.keys, individual.fitness), bisect_right(self.keys, individual.fitness)
+        for i in range(start, end):
+            if self.items[len(self) - 1 - i] is individual:
+                del self.items[len(self) - 1 - i]
+                del self.keys[i]
+                break
+
+        key = individual.genome.tobytes()
+        del self.index[key]
+        if key in self.rows:
+            row = self.rows.pop(key)
+            self.row_items[row] = None
+            self.free_rows.append(row)
+
+    def _add_row(self, key: bytes, individual):
+        if self.genomes is None:
+            self.genomes = np.zeros((max(self.maxsize, 1), len(individual.genome)), dtype=individual.genome.dtype)
+            self.row_items = [None] * len(self.genomes)
+            self.free_rows = list(range(len(self.genomes) - 1, -1, -1))
+
+        row = self.free_rows.pop()
+        self.genomes[row] = individual.genome
+        self.row_items[row] = individual
+        self.rows[key] = row
+
+    def _get_close_items(self, genome: np.array) -> list:
+        if self.genomes is None:
+            return []
+        # Free rows keep stale genomes, they are skipped
+        distances = np.count_nonzero(self.genomes != genome, axis=1)
+        close_items = (self.row_items[row] for row in np.flatnonzero(distances < self.min_distance).tolist())
+        return [item for item in close_items if item is not None]
+
+    def __contains__(self, individual) -> bool:
+        return individual.genome.tobytes() in self.index
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, i):
+        return self.items[i]
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __reversed__(self):
+        return reversed(self.items)
@@ -0,0 +1,206 @@
+import copy
+import os
+import pathlib
+import pickle
+import random
+import threading
+
+import numpy as np
+
+
+def get_checkpoint_state(gen: int, population: list, halloffame, logbook, rng: np.random.Generator,
+                         stopping_criteria=None) -> dict:
+    """Collects the state of the optimization after the generation
+
+    Genomes and fitness values of individuals are packed into arrays, so the state is compact and is collected without
+    copying individuals
+
+    :param gen: Number of the completed generation
+    :type gen: int
+    :param population: Current population
+    :type population: list
+    :param halloffame: Hall of fame
+    :type halloffame: class:`deap.tools.HallOfFame`
+    :param logbook: Logbook of the completed generations
+    :type logbook: class:`deap.tools.Logbook`
+    :param rng: Random number generator of the variation operators
+    :type rng: class:`numpy.random.Generator`
+    :param stopping_criteria: Stopping criteria whose counters are saved (None - the criteria are not saved)
+    :type stopping_criteria: class:`StoppingCriteria`
+    :return: Dictionary with the state
+    """
+    return {
+        'gen': gen,
+        'genomes': np.stack([individual.genome for individual in population]),
+        'fitness_values': np.array([individual.fitness.values for individual in population]),
+        'hof_genomes': np.stack([individual.genome for individual in halloffame.items]),
+        'hof_fitness_values': np.array([individual.fitness.values for individual in halloffame.items]),
+        'logbook': copy.copy(logbook),
+        'random_state': random.getstate(),
+        'np_random_state': np.random.get_state(),
+        'rng_state': rng.bit_generator.state,
+        'stopping_state': stopping_criteria.get_state() if stopping_criteria is not None else None,
+    }
+
+
+def restore_checkpoint_state(state: dict, individual_class: type, halloffame, rng: np.random.Generator,
+                             stopping_criteria=None) -> tuple:
+    """Restores the optimization from the state collected by `get_checkpoint_state`
+
+    The population is rebuilt, the hall of fame is filled and the states of the random number generators and the
+    counters of the stopping criteria (the elapsed time, the number of evaluations and the best fitness) are set.
+    Individuals of a state without fitness values (a population that has not been evaluated yet) get invalid fitness
+
+    :param state: Dictionary with the state
+    :type state: dict
+    :param individual_class: Class of individuals
+    :type individual_class: type
+    :param halloffame: Empty hall of fame
+    :type halloffame: class:`GenomeArchive` or class:`ParetoArchive`
+    :param rng: Random number generator of the variation operators
+    :type rng: class:`numpy.random.Generator`
+    :param stopping_criteria: Stopping criteria of the resumed run (None - the criteria are not restored)
+    :type stopping_criteria: class:`StoppingCriteria`
+    :return: Number of the completed generation, population and logbook
+    """
+    def make_individuals(genomes, fitness_values):
+        individuals = []
+        for i, genome in enumerate(genomes):
+            individual = individual_class(genome)
+            if fitness_values is not None:
+                individual.fitness.values = tuple(fitness_values[i].tolist())
+            individuals.append(individual)
+        return individuals
+
+    population = make_individuals(state['genomes'], state['fitness_values'])
+
+    # Individuals of the hall of fame are saved from the best one
+    if state['hof_genomes'] is not None:
+        halloffame.load(make_individuals(state['hof_genomes'], state['hof_fitness_values']))
+
+    random.setstate(state['random_state'])
+    np.random.set_state(state['np_random_state'])
+    rng.bit_generator.state = state['rng_state']
+
+    # Checkpoints written before the counters were saved restart the budgets of the criteria
+    if stopping_criteria is not None and state.get('stopping_state') is not None:
+        stopping_criteria.set_state(state['stopping_state'])
+
+    return state['gen'], population, state['logbook']
+
+
+def write_checkpoint(path: str, state: dict):
+    """Writes the state to the binary file replacing it atomically
+
+    :param path: Path to checkpoint file
+    :type path: str
+    :param state: Dictionary with the state
+    :type state: dict
+    """
+    path = pathlib.Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+
+    with open(tmp_path, 'wb') as file:
+        pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def read_checkpoint(path: str) -> dict:
+    """Reads the state written by `write_checkpoint`
+
+    :param path: Path to checkpoint file
+    :type path: str
+    :return: Dictionary with the state
+    """
+    with open(path, 'rb') as file:
+        return pickle.load(file)
+
+
+class Checkpointer:
+    """Periodically saves the state of the optimization in a background thread
+
+    The state is collected in the generation loop and is written by a background thread, so the loop does not wait
+    for the disk. If the writer falls behind, only the latest state is written. An error of the writer is raised in
+    the generation loop by the next `checkpoint` call or by `close`
+
+    :param path: Path to checkpoint file
+    :type path: str
+    :param interval: Number of generations between checkpoints
+    :type interval: int
+    :param last_gen: Number of the last generation (its state is always saved)
+    :type last_gen: int
+    :param rng: Random number generator of the variation operators
+    :type rng: class:`numpy.random.Generator`
+    :param stopping_criteria: Stopping criteria whose counters are saved with the state
+    :type stopping_criteria: class:`StoppingCriteria`
+    """
+
+    def __init__(self, path: str, interval: int, last_gen: int, rng: np.random.Generator, stopping_criteria=None):
+        self.path = path
+        self.interval = interval
+        self.last_gen = last_gen
+        self.rng = rng
+        self.stopping_criteria = stopping_criteria
+
+        self._pending = None
+        self._closed = False
+        self._error = None
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def checkpoint(self, gen: int, population: list, halloffame, logbook):
+        """Saves the state after the generation if it is time to
+
+        :param gen: Number of the completed generation
+        :type gen: int
+        :param population: Current population
+        :type population: list
+        :param halloffame: Hall of fame
+        :type halloffame: class:`deap.tools.HallOfFame`
+        :param logbook: Logbook of the completed generations
+        :type logbook: class:`deap.tools.Logbook`
+        """
+        self._raise_error()
+
+        # The state is also saved when the run stops early
+        if gen % self.interval and gen != self.last_gen and 'stop_reason' not in logbook[-1]:
+            return
+
+        state = get_checkpoint_state(gen, population, halloffame, logbook, self.rng, self.stopping_criteria)
+        with self._condition:
+            self._pending = state
+            self._condition.notify()
+
+    def close(self):
+        """Writes the pending state and stops the background thread"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+        self._raise_error()
+
+    def _raise_error(self):
+        # The error is raised once, so `close` after a failed `checkpoint` does not raise it again
+        with self._condition:
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _write_loop(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._pending is None:
+                    return
+                state, self._pending = self._pending, None
+
+            try:
+                write_checkpoint(self.path, state)
+            except Exception as error:
+                # Any error (not only of the disk) is passed to the generation loop, the first one is kept
+                with self._condition:
+                    if self._error is None:
+                        self._error = error
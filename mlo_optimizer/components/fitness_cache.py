@@ -0,0 +1,109 @@
+from collections import OrderedDict
+
+from mlo_optimizer.components.genome import LayoutTemplate
+
+
+class FitnessCache:
+    """Memoizes fitness values of individuals with compact genomes
+
+    Fitness values are keyed by the bytes of the placed part of the genome (genomes that differ only in elements that
+    are not placed give the same matrix). The number of kept values is bounded, the least recently used ones are
+    evicted first. Individuals with the same genome in one batch are evaluated once. The cache may be used only with
+    pure objective functions (the fitness depends on the individual only)
+
+    :param evaluate_population: Function that receives a list of individuals and returns a list of fitness assessments
+    :type evaluate_population: callable
+    :param template: Layout template of the individuals
+    :type template: class:`LayoutTemplate`
+    :param maxsize: Maximum number of kept fitness values
+    :type maxsize: int
+    """
+
+    def __init__(self, evaluate_population: callable, template: LayoutTemplate, maxsize: int):
+        self.evaluate = evaluate_population
+        self.n_placed = template.n_placed
+        self.maxsize = maxsize
+
+        self.values = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._logged_hits = 0
+        self._logged_misses = 0
+
+    def get_key(self, individual) -> bytes:
+        """Calculates the cache key of the individual
+
+        :param individual: Individual with a compact genome
+        :return: Bytes of the placed part of the genome
+        """
+        return individual.genome[:self.n_placed].tobytes()
+
+    def evaluate_population(self, individuals: list) -> list:
+        """Evaluates individuals whose fitness is not cached and takes the others from the cache
+
+        :param individuals: Individuals to be evaluated
+        :type individuals: list
+        :return: List of fitness assessments in the order of individuals
+        """
+        keys = [self.get_key(individual) for individual in individuals]
+
+        missing = {}
+        for individual, key in zip(individuals, keys):
+            if key in self.values:
+                self.values.move_to_end(key)
+                self.hits += 1
+            elif key not in missing:
+                missing[key] = individual
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        fitnesses = {key: self.values[key] for key in keys if key in self.values}
+        if missing:
+            fitnesses.update(zip(missing, self.evaluate(list(missing.values()))))
+            for key in missing:
+                self._store(key, fitnesses[key])
+
+        return [fitnesses[key] for key in keys]
+
+    def get(self, individual):
+        """Takes the fitness of the individual from the cache
+
+        It is used with the asynchronous evaluation, where the evaluated fitness is stored by `put` when it completes
+
+        :param individual: Individual with a compact genome
+        :return: Fitness assessment or None if it is not cached
+        """
+        key = self.get_key(individual)
+        fitness = self.values.get(key)
+        if fitness is None:
+            self.misses += 1
+            return None
+
+        self.values.move_to_end(key)
+        self.hits += 1
+        return fitness
+
+    def put(self, individual, fitness: tuple):
+        """Stores the evaluated fitness of the individual
+
+        :param individual: Individual with a compact genome
+        :param fitness: Fitness assessment
+        :type fitness: tuple
+        """
+        self._store(self.get_key(individual), fitness)
+
+    def _store(self, key: bytes, fitness: tuple):
+        self.values[key] = fitness
+        self.values.move_to_end(key)
+        while len(self.values) > self.maxsize:
+            self.values.popitem(last=False)
+
+    def get_log_record(self) -> dict:
+        """Gets the numbers of cache hits and misses since the previous call
+
+        :return: Dictionary with the numbers of hits and misses
+        """
+        record = {'cache_hits': self.hits - self._logged_hits, 'cache_misses': self.misses - self._logged_misses}
+        self._logged_hits, self._logged_misses = self.hits, self.misses
+        return record
@@ -1,133 +1,326 @@
 import random
 from copy import deepcopy
+from functools import partial
 
-from deap import creator
+from deap import base, tools
+
+from mlo_optimizer.components.fitness_cache import FitnessCache
+from mlo_optimizer.components.genome import LayoutTemplate
+from mlo_optimizer.components.individual import IndividualMin, get_origin, is_multi_objective
+from mlo_optimizer.components.nsga import sel_crowded_tournament, sel_nsga2
+from mlo_optimizer.keyboards.local_search import SwapLocalSearch
 
 import numpy as np
 
 
-def random_matrix(init_matrix: list, permutable_elems: list):
-    """Creates an individual matrix with randomly placed elements from permutable_elems
+def random_matrix(template: LayoutTemplate, individual_class: type = IndividualMin, rng: np.random.Generator = None):
+    """Creates an individual with randomly placed elements from permutable_elems
 
-    :param init_matrix: Initial initialization matrix with elements
-    :type init_matrix: list
-    :param permutable_elems: Set of elements that will be entered into the matrix and randomly rearranged
-    :type permutable_elems: list
+    :param template: Layout template with the initial matrix and permutable elements
+    :type template: class:`LayoutTemplate`
+    :param individual_class: Class of the created individual
+    :type individual_class: type
+    :param rng: Random number generator (the global NumPy generator by default)
+    :type rng: class:`numpy.random.Generator`
     :return: Individual
     """
-    permutable_elems_copy = deepcopy(permutable_elems)
-    random.shuffle(permutable_elems_copy)
+    return individual_class(template.random_genome(rng))
+
+
+def _ordered_crossover(genome_1: np.array, genome_2: np.array, start: int, end: int) -> np.array:
+    size = len(genome_1)
 
-    np_array = np.array(init_matrix)
-    dims = np_array.shape
-    vec = np_array.flatten()
+    in_segment = np.zeros(size, dtype=bool)
+    in_segment[genome_2[start:end + 1]] = True
 
-    for i in range(len(vec)):
-        if vec[i] is None:
-            try:
-                random_elem = permutable_elems_copy.pop()
-                vec[i] = random_elem
-            except IndexError:
-                break
+    # Elements of the 1st parent that are not in the segment of the 2nd one keep their order starting after the segment
+    rest = np.roll(genome_1, -(end + 1))
+    rest = rest[~in_segment[rest]]
 
-    res_matrix = vec.reshape(dims).tolist()
-    return creator.Individual(res_matrix)
+    child = genome_2.copy()
+    child[(np.arange(len(rest)) + end + 1) % size] = rest
 
+    return child
 
-def mate_matrix(individual_1: list, individual_2: list, permutable_elems: list):
+
+def mate_matrix(individual_1: IndividualMin, individual_2: IndividualMin):
     """Crossbreeding method based on ordered crossover
 
-    Rearranges elements only from permutable_elems
+    Rearranges elements only from permutable_elems: the genomes of individuals are permutations of permutable elements
 
     :param individual_1: 1st individual
-    :type individual_1: list
+    :type individual_1: class:`IndividualMin`
     :param individual_2: 2nd individual
-    :type individual_2: list
-    :param permutable_elems: Elements that can be rearranged during crossing
-    :type permutable_elems: list
+    :type individual_2: class:`IndividualMin`
     :return: Children of crossed individuals
     """
-    np_array_1, np_array_2 = np.array(individual_1), np.array(individual_2)
-    dims_1, dims_2 = np_array_1.shape, np_array_2.shape
-
-    vec_1 = np_array_1.flatten().tolist()
-    vec_2 = np_array_2.flatten().tolist()
+    genome_1, genome_2 = individual_1.genome, individual_2.genome
+    size = len(genome_1)
 
-    size = len(vec_1)
+    assert size == len(genome_2), 'Mismatched dimensions of genomes when trying to crossbreeding'
 
-    assert size == len(vec_2), 'Mismatched dimensions of matrices when trying to crossbreeding'
+    start, end = random.sample(range(size), 2)
+    if start > end:
+        start, end = end, start
 
-    vec_1_indexes, vec_2_indexes = {}, {}
-    for i in range(size):
-        vec_1_indexes[i] = vec_1[i]
-        vec_2_indexes[i] = vec_2[i]
+    child_1 = type(individual_1)(_ordered_crossover(genome_1, genome_2, start, end))
+    child_2 = type(individual_2)(_ordered_crossover(genome_2, genome_1, start, end))
+    child_1.origin, child_2.origin = get_origin(individual_1), get_origin(individual_2)
 
-    vec_1 = list(vec_1_indexes.keys())
-    vec_2 = list(vec_2_indexes.keys())
+    return child_1, child_2
 
-    a, b = random.sample(range(size), 2)
-    if a > b:
-        a, b = b, a
 
-    holes_1, holes_2 = [True if key in permutable_elems else False for key in vec_1], \
-        [True if key in permutable_elems else False for key in vec_2]
+def mutate_matrix(individual: IndividualMin, template: LayoutTemplate):
+    """Mutation method based on permutation mutation
 
-    for i in range(size):
-        if i < a or i > b:
-            holes_1[vec_2[i]] = False
-            holes_2[vec_1[i]] = False
+    Rearranges elements only from permutable_elems placed in the matrix. Each of them is swapped with another one with
+    the probability 1 / (number of matrix cells)
 
-    temp_1, temp_2 = vec_1, vec_2
-    k_1, k_2 = b + 1, b + 1
-    for i in range(size):
-        if not holes_1[temp_1[(i + b + 1) % size]]:
-            vec_1[k_1 % size] = temp_1[(i + b + 1) % size]
-            k_1 += 1
+    :param individual: Individual
+    :type individual: class:`IndividualMin`
+    :param template: Layout template with the initial matrix and permutable elements
+    :type template: class:`LayoutTemplate`
+    :return: Mutated element
+    """
+    genome = individual.genome.copy()
 
-        if not holes_2[temp_2[(i + b + 1) % size]]:
-            vec_2[k_2 % size] = temp_2[(i + b + 1) % size]
-            k_2 += 1
+    size = template.n_placed
+    indpb = 1.0 / template.n_cells
 
-    for i in range(a, b + 1):
-        vec_1[i], vec_2[i] = vec_2[i], vec_1[i]
+    if size > 1:
+        for i in np.flatnonzero(np.random.random(size) < indpb):
+            swap_i = random.randint(0, size - 2)
+            if swap_i >= i:
+                swap_i += 1
+            genome[i], genome[swap_i] = genome[swap_i], genome[i]
 
-    res_matrix_1 = np.array([vec_1_indexes[i] for i in vec_1]).reshape(dims_1).tolist()
-    res_matrix_2 = np.array([vec_2_indexes[i] for i in vec_2]).reshape(dims_2).tolist()
+    child = type(individual)(genome)
+    child.origin = get_origin(individual)
 
-    return creator.Individual(res_matrix_1), creator.Individual(res_matrix_2)
+    return (child,)
 
 
-def mutate_matrix(individual: list, permutable_elems: list):
-    """Mutation method based on permutation mutation
+def mate_population(genomes_1: np.array, genomes_2: np.array, rng: np.random.Generator) -> np.array:
+    """Batch version of ordered crossover
 
-    Rearranges elements only from permutable_elems
+    The k-th rows of both arrays are crossed with their own pair of cut points, the elements are rearranged in the
+    same way as in `mate_matrix`
 
-    :param individual: Individual
-    :type individual: list
-    :param permutable_elems: Elements that can be rearranged during crossing
-    :type permutable_elems: list
-    :return: Mutated element
+    :param genomes_1: Integer array of shape (number of pairs, number of genes) with genomes of the 1st parents
+    :type genomes_1: class:`numpy.array`
+    :param genomes_2: Genomes of the 2nd parents of the same shape
+    :type genomes_2: class:`numpy.array`
+    :param rng: Random number generator
+    :type rng: class:`numpy.random.Generator`
+    :return: Genomes of the children of the 1st parents and genomes of the children of the 2nd parents
     """
-    np_array = np.array(individual)
-    dims = np_array.shape
+    n_pairs, size = genomes_1.shape
 
-    vec = np.array(individual).flatten()
+    assert genomes_1.shape == genomes_2.shape, 'Mismatched dimensions of genomes when trying to crossbreeding'
 
-    size = len(vec)
-    indpb = 1.0 / size
+    # Two distinct cut points for each pair
+    first_cuts = rng.integers(0, size, n_pairs)
+    second_cuts = rng.integers(0, size - 1, n_pairs)
+    second_cuts += second_cuts >= first_cuts
+    starts, ends = np.minimum(first_cuts, second_cuts), np.maximum(first_cuts, second_cuts)
 
-    for i in range(size):
-        if vec[i] in permutable_elems and np.random.random() < indpb:
-            while True:
-                swap_i = random.randint(0, size - 2)
+    return _ordered_crossover_rows(genomes_1, genomes_2, starts, ends), \
+        _ordered_crossover_rows(genomes_2, genomes_1, starts, ends)
 
-                if swap_i >= i:
-                    swap_i += 1
-                if vec[swap_i] not in permutable_elems:
-                    continue
-                vec[i], vec[swap_i] = vec[swap_i], vec[i]
-                break
 
-    res_matrix = vec.reshape(dims).tolist()
+def _ordered_crossover_rows(genomes_1: np.array, genomes_2: np.array, starts: np.array, ends: np.array) -> np.array:
+    n_rows, size = genomes_1.shape
+    rows = np.arange(n_rows)[:, None]
+    positions = np.arange(size)
 
-    return (creator.Individual(res_matrix),)
+    in_segment = np.zeros((n_rows, size), dtype=bool)
+    in_segment[rows, genomes_2] = (positions >= starts[:, None]) & (positions <= ends[:, None])
+
+    # Elements of the 1st parent that are not in the segment of the 2nd one keep their order starting after the segment
+    rest = np.take_along_axis(genomes_1, (positions + ends[:, None] + 1) % size, axis=1)
+    keep_mask = ~in_segment[rows, rest]
+    dest = (np.cumsum(keep_mask, axis=1) - 1 + ends[:, None] + 1) % size
+
+    children = genomes_2.copy()
+    rest_rows = np.broadcast_to(rows, rest.shape)
+    children[rest_rows[keep_mask], dest[keep_mask]] = rest[keep_mask]
+
+    return children
+
+
+def mutate_population(genomes: np.array, template: LayoutTemplate, rng: np.random.Generator) -> np.array:
+    """Batch version of swap mutation
+
+    Each placed gene of each genome is swapped with another placed gene with the probability 1 / (number of matrix
+    cells), swaps of one genome are applied in the order of genes as in `mutate_matrix`
+
+    :param genomes: Integer array of shape (number of individuals, number of genes) with genomes
+    :type genomes: class:`numpy.array`
+    :param template: Layout template with the initial matrix and permutable elements
+    :type template: class:`LayoutTemplate`
+    :param rng: Random number generator
+    :type rng: class:`numpy.random.Generator`
+    :return: Mutated genomes
+    """
+    genomes = genomes.copy()
+    size = template.n_placed
+
+    if size < 2:
+        return genomes
+
+    rows, genes = np.nonzero(rng.random((len(genomes), size)) < 1.0 / template.n_cells)
+    partners = rng.integers(0, size - 1, len(genes))
+    partners += partners >= genes
+
+    # Swaps of different genomes are independent, so the k-th swaps of all genomes are applied at once
+    ranks = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    for rank in range(ranks.max(initial=-1) + 1):
+        rank_mask = ranks == rank
+        rank_rows, rank_genes, rank_partners = rows[rank_mask], genes[rank_mask], partners[rank_mask]
+        genomes[rank_rows, rank_genes], genomes[rank_rows, rank_partners] = \
+            genomes[rank_rows, rank_partners], genomes[rank_rows, rank_genes]
+
+    return genomes
+
+
+def vary_population(population: list, cxpb: float, mutpb: float, template: LayoutTemplate,
+                    rng: np.random.Generator) -> list:
+    """Batch version of `deap.algorithms.varAnd` for individuals with compact genomes
+
+    Consecutive individuals are crossed with the probability cxpb, then each individual is mutated with the probability
+    mutpb. All crossovers and all mutations are made by single calls of `mate_population` and `mutate_population`
+
+    :param population: List of individuals
+    :type population: list
+    :param cxpb: Crossbreeding probability
+    :type cxpb: float
+    :param mutpb: Mutation probability
+    :type mutpb: float
+    :param template: Layout template with the initial matrix and permutable elements
+    :type template: class:`LayoutTemplate`
+    :param rng: Random number generator
+    :type rng: class:`numpy.random.Generator`
+    :return: List of offspring
+    """
+    if not population:
+        return []
+
+    genomes = np.stack([individual.genome for individual in population])
+    changed_mask = np.zeros(len(population), dtype=bool)
+
+    first_ids = np.arange(0, len(population) - 1, 2)
+    first_ids = first_ids[rng.random(len(first_ids)) < cxpb]
+    if len(first_ids) and genomes.shape[1] > 1:
+        genomes[first_ids], genomes[first_ids + 1] = mate_population(genomes[first_ids], genomes[first_ids + 1], rng)
+        changed_mask[first_ids] = changed_mask[first_ids + 1] = True
+
+    mutant_ids = np.flatnonzero(rng.random(len(population)) < mutpb)
+    genomes[mutant_ids] = mutate_population(genomes[mutant_ids], template, rng)
+    changed_mask[mutant_ids] = True
+
+    offspring = []
+    for individual, genome, is_changed in zip(population, genomes, changed_mask):
+        if is_changed:
+            child = type(individual)(genome)
+            child.origin = get_origin(individual)
+        else:
+            child = deepcopy(individual)
+        offspring.append(child)
+
+    return offspring
+
+
+def make_toolbox(template: LayoutTemplate, individual_class: type, evaluate: callable, rng: np.random.Generator,
+                 tourn_size: int, evaluate_population: callable = None, fitness_cache_size: int = 0,
+                 local_search_top_k: int = 0, local_search_max_steps: int = 1) -> base.Toolbox:
+    """Registers the components of the genetic algorithm
+
+    :param template: Layout template with the initial matrix and permutable elements
+    :type template: class:`LayoutTemplate`
+    :param individual_class: Class of individuals
+    :type individual_class: type
+    :param evaluate: Objective function that receives an individual and returns a fitness score. If it has
+        `evaluate_population` method, the population is evaluated by it
+    :type evaluate: callable
+    :param rng: Random number generator
+    :type rng: class:`numpy.random.Generator`
+    :param tourn_size: sample size for tournament selection (binary crowded tournaments are used for several
+        objectives)
+    :type tourn_size: int
+    :param evaluate_population: Function that evaluates a list of individuals (e.g. in parallel processes)
+    :type evaluate_population: callable
+    :param fitness_cache_size: Maximum number of fitness values memoized by genome (0 disables the cache, the
+        objective function must be pure otherwise)
+    :type fitness_cache_size: int
+    :param local_search_top_k: Number of the best offspring refined by the swap local search in each generation (0
+        disables the local search, the objective function must be a `LayoutEvaluator` otherwise)
+    :type local_search_top_k: int
+    :param local_search_max_steps: Maximum number of swaps applied to a refined individual
+    :type local_search_max_steps: int
+    :return: Toolbox
+    """
+    toolbox = base.Toolbox()
+    toolbox.register('randomMatrix', random_matrix, template, individual_class=individual_class, rng=rng)
+    toolbox.register('populationCreator', tools.initRepeat, list, toolbox.randomMatrix)
+
+    toolbox.register('evaluate', evaluate)
+    if evaluate_population is None:
+        evaluate_population = getattr(evaluate, 'evaluate_population', None)
+    if evaluate_population is not None:
+        toolbox.register('evaluate_population', evaluate_population)
+
+    if fitness_cache_size:
+        if evaluate_population is None:
+            evaluate_population = partial(_evaluate_serially, evaluate)
+        fitness_cache = FitnessCache(evaluate_population, template, fitness_cache_size)
+        toolbox.register('evaluate_population', fitness_cache.evaluate_population)
+        toolbox.register('get_log_record', fitness_cache.get_log_record)
+        # The steady-state algorithm submits offspring one by one and uses the cache around the submission
+        toolbox.register('get_cached_fitness', fitness_cache.get)
+        toolbox.register('cache_fitness', fitness_cache.put)
+
+    if is_multi_objective(individual_class):
+        # NSGA-II: parents are chosen by crowded tournaments, survivors by fronts and crowding distances
+        toolbox.register('select', sel_crowded_tournament, rng=rng)
+        toolbox.register('select_survivors', sel_nsga2)
+    else:
+        toolbox.register('select', tools.selTournament, tournsize=tourn_size)
+    toolbox.register('mate', mate_matrix)
+    toolbox.register('mutate', mutate_matrix, template=template)
+    toolbox.register('vary_population', vary_population, template=template, rng=rng)
+
+    if local_search_top_k:
+        local_search = SwapLocalSearch(evaluate, local_search_max_steps,
+                                       minimization=individual_class.fitness_class.weights[0] < 0)
+        toolbox.register('refine_population', local_search.refine_best, top_k=local_search_top_k)
+
+    return toolbox
+
+
+def make_statistics(minimization: bool = True, n_objectives: int = 1) -> tools.Statistics:
+    """Creates the statistics of fitness values recorded in the logbook
+
+    :param minimization: Minimization and Maximization Flag of the Objective Function (the maximum is recorded as well
+        when maximizing or optimizing several objectives)
+    :type minimization: bool
+    :param n_objectives: Number of objectives (statistics of several objectives are vectors with a value for each of
+        them)
+    :type n_objectives: int
+    :return: Statistics
+    """
+    stats = tools.Statistics(lambda ind: ind.fitness.values)
+    if n_objectives > 1:
+        stats.register('min', np.min, axis=0)
+        stats.register('avg', np.mean, axis=0)
+        stats.register('max', np.max, axis=0)
+        return stats
+
+    stats.register('min', np.min)
+    stats.register('avg', np.mean)
+    if not minimization:
+        stats.register('max', np.max)
+    return stats
+
+
+def _evaluate_serially(evaluate: callable, individuals: list) -> list:
+    return [evaluate(individual) for individual in individuals]
@@ -0,0 +1,77 @@
+import numpy as np
+
+
+class LayoutTemplate:
+    """Layout template shared by all individuals with compact genomes
+
+    The template keeps the initial matrix, its free (None) slots and the permutable elements. An individual is only a
+    permutation of the indexes of permutable elements (genome): the element `permutable_elems[genome[k]]` is placed in
+    the k-th free slot of the matrix. If there are more permutable elements than free slots, the elements at the end
+    of the genome are not placed, if there are fewer, the last free slots stay empty
+
+    :param init_matrix: Initial initialization matrix with elements (permutable and not counted)
+    :type init_matrix: list
+    :param permutable_elems: The set of elements that are rearranged during crossover and mutation
+    :type permutable_elems: list
+    """
+
+    def __init__(self, init_matrix: list, permutable_elems: list):
+        self.init_matrix = init_matrix
+        self.permutable_elems = permutable_elems
+
+        self.row_lengths = [len(row) for row in init_matrix]
+        self.cells = [cell for row in init_matrix for cell in row]
+        self.n_cells = len(self.cells)
+
+        self.free_slots = np.array([i for i, cell in enumerate(self.cells) if cell is None], dtype=int)
+        self.n_genes = len(permutable_elems)
+        self.n_placed = min(len(self.free_slots), self.n_genes)
+        self.free_slots = self.free_slots[:self.n_placed]
+
+        self.genome_dtype = np.int16 if self.n_genes <= np.iinfo(np.int16).max else np.int32
+
+    def random_genome(self, rng: np.random.Generator = None) -> np.array:
+        """Creates a genome with randomly placed elements
+
+        :param rng: Random number generator (the global NumPy generator by default)
+        :type rng: class:`numpy.random.Generator`
+        :return: Random permutation of the indexes of permutable elements
+        """
+        if rng is None:
+            rng = np.random
+        return rng.permutation(self.n_genes).astype(self.genome_dtype)
+
+    def to_matrix(self, genome: np.array) -> list:
+        """Converts the genome to the individual matrix
+
+        :param genome: Permutation of the indexes of permutable elements
+        :type genome: class:`numpy.array`
+        :return: Matrix of the individual
+        """
+        cells = list(self.cells)
+        for slot, elem_id in zip(self.free_slots.tolist(), genome[:self.n_placed].tolist()):
+            cells[slot] = self.permutable_elems[elem_id]
+
+        matrix, start = [], 0
+        for row_length in self.row_lengths:
+            matrix.append(cells[start:start + row_length])
+            start += row_length
+
+        return matrix
+
+
+class MatrixFitness:
+    """Objective function adapter that passes individual matrices to the objective function
+
+    :param fitness_func: Objective function that receives an individual matrix and returns a fitness score
+    :type fitness_func: callable
+    :param template: Layout template of the individuals
+    :type template: class:`LayoutTemplate`
+    """
+
+    def __init__(self, fitness_func: callable, template: LayoutTemplate):
+        self.fitness_func = fitness_func
+        self.template = template
+
+    def __call__(self, individual) -> tuple:
+        return self.fitness_func(self.template.to_matrix(individual.genome))
@@ -0,0 +1,137 @@
+import copyreg
+from copy import deepcopy
+from functools import lru_cache
+
+from deap import base
+
+import numpy as np
+
+
+class FitnessMin(base.Fitness):
+    """Fitness of the minimized objective function"""
+    weights = (-1.0,)
+
+
+class FitnessMax(base.Fitness):
+    """Fitness of the maximized objective function"""
+    weights = (1.0,)
+
+
+class IndividualMin:
+    """Individual with a compact genome evaluated by the minimized objective function
+
+    The individual keeps only the genome (see `LayoutTemplate`), the fitness and the origin. Unlike classes made with
+    `deap.creator.create`, individual classes are defined at the module level, so individuals can be pickled and sent
+    to worker processes. Offspring that have not been evaluated yet keep the fitness values and the genome of their
+    last evaluated ancestor in the `origin` attribute (see `get_origin`)
+
+    :param genome: Permutation of the indexes of permutable elements
+    :type genome: class:`numpy.array`
+    """
+    __slots__ = ('genome', 'fitness', 'origin')
+
+    fitness_class = FitnessMin
+
+    def __init__(self, genome: np.array):
+        self.genome = genome
+        self.fitness = self.fitness_class()
+        self.origin = None
+
+    def __len__(self):
+        return len(self.genome)
+
+    def __eq__(self, other):
+        return np.array_equal(self.genome, other.genome)
+
+    __hash__ = None
+
+    def __deepcopy__(self, memo):
+        individual = type(self).__new__(type(self))
+        individual.genome = self.genome.copy()
+        individual.fitness = deepcopy(self.fitness, memo)
+        individual.origin = self.origin
+        return individual
+
+    def __getstate__(self):
+        return self.genome, self.fitness, self.origin
+
+    def __setstate__(self, state):
+        self.genome, self.fitness, self.origin = state
+
+
+class IndividualMax(IndividualMin):
+    """Individual with a compact genome evaluated by the maximized objective function"""
+    __slots__ = ()
+
+    fitness_class = FitnessMax
+
+
+class _MultiObjectiveType(type):
+    # Metaclass of the classes made for vectors of fitness weights. Such classes are pickled by their weights and are
+    # recreated by `get_multi_objective_class` in other processes
+    pass
+
+
+@lru_cache(maxsize=None)
+def get_multi_objective_class(weights: tuple) -> type:
+    """Makes the individual class with the fitness of several objectives
+
+    Classes are cached, so the same weights always give the same class
+
+    :param weights: Weights of the objectives (negative for minimized objectives, positive for maximized ones)
+    :type weights: tuple
+    :return: Individual class
+    """
+    fitness_class = _MultiObjectiveType('FitnessMulti', (base.Fitness,), {'weights': weights})
+    return _MultiObjectiveType('IndividualMulti', (IndividualMin,), {'__slots__': (), 'fitness_class': fitness_class})
+
+
+def _reduce_multi_objective_class(cls: type) -> tuple:
+    if issubclass(cls, base.Fitness):
+        return _get_multi_objective_fitness_class, (cls.weights,)
+    return get_multi_objective_class, (cls.fitness_class.weights,)
+
+
+def _get_multi_objective_fitness_class(weights: tuple) -> type:
+    return get_multi_objective_class(weights).fitness_class
+
+
+copyreg.pickle(_MultiObjectiveType, _reduce_multi_objective_class)
+
+
+def get_individual_class(minimization: bool, weights: tuple = None) -> type:
+    """Chooses the individual class for the direction of optimization
+
+    :param minimization: Minimization and Maximization Flag of the Objective Function (ignored if weights are given)
+    :type minimization: bool
+    :param weights: Weights of several objectives (None - a single objective)
+    :type weights: tuple
+    :return: Individual class
+    """
+    if weights is not None:
+        return get_multi_objective_class(tuple(float(weight) for weight in weights))
+    return IndividualMin if minimization else IndividualMax
+
+
+def is_multi_objective(individual_class: type) -> bool:
+    """Checks whether individuals of the class are evaluated by several objectives
+
+    :param individual_class: Individual class
+    :type individual_class: type
+    :return: True if the fitness has several weights
+    """
+    return len(individual_class.fitness_class.weights) > 1
+
+
+def get_origin(individual: IndividualMin):
+    """Gets the last evaluated ancestor of the individual
+
+    Fitness of the offspring can be calculated incrementally from the fitness of this ancestor
+
+    :param individual: Individual
+    :type individual: class:`IndividualMin`
+    :return: Tuple of the fitness values and the genome of the ancestor or None if it is unknown
+    """
+    if individual.fitness.valid:
+        return individual.fitness.values, individual.genome
+    return individual.origin
@@ -0,0 +1,164 @@
+import json
+import time
+
+PHASES = ('select', 'vary', 'evaluate', 'refine', 'halloffame', 'stats')
+
+
+class _Phase:
+    # Reusable context manager adding the wall time of a block to the phase
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name: str):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.profiler.times[self.name] += time.perf_counter() - self.start
+        self.profiler.calls[self.name] += 1
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+class NullProfiler:
+    """Profiler used when the instrumentation is turned off, all its methods do nothing"""
+    _phase = _NullPhase()
+
+    def phase(self, name: str) -> _NullPhase:
+        return self._phase
+
+    def get_log_record(self, nevals: int, record: dict) -> dict:
+        return {}
+
+    def write(self, record: dict):
+        pass
+
+    def close(self):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class Profiler:
+    """Measures the wall time and the number of calls of the phases of each generation
+
+    The generation loop wraps its phases (see `PHASES`) in `phase` blocks. After each generation the measurements are
+    added to the logbook record as 'time' (wall time since the previous record), 'time_<phase>' and 'calls_<phase>'
+    fields together with the number of evaluations per second of the evaluation phase ('evals_per_s') and the share
+    of cache hits ('cache_hit_rate', if the record has cache counters). The full records are passed to the sinks
+
+    :param sinks: Callables that receive the logbook record of each generation (e.g. `JsonLinesSink`)
+    :type sinks: list
+    :param log_fields: Add the measurements to the logbook records (otherwise they are passed to the sinks only)
+    :type log_fields: bool
+    """
+
+    def __init__(self, sinks: list = (), log_fields: bool = True):
+        self.sinks = list(sinks)
+        self.log_fields = log_fields
+
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.calls = dict.fromkeys(PHASES, 0)
+        self._phases = {name: _Phase(self, name) for name in PHASES}
+        self._fields = {}
+        self._last_time = time.perf_counter()
+
+    def phase(self, name: str) -> _Phase:
+        """Gets the context manager that measures the block as a part of the phase
+
+        :param name: Name of the phase from `PHASES`
+        :type name: str
+        :return: Context manager
+        """
+        return self._phases[name]
+
+    def get_log_record(self, nevals: int, record: dict) -> dict:
+        """Collects the measurements of the current generation and starts the next one
+
+        :param nevals: Number of evaluated individuals
+        :type nevals: int
+        :param record: Statistics and additional fields of the generation
+        :type record: dict
+        :return: Dictionary with the measurements (empty if they are not added to the logbook)
+        """
+        now = time.perf_counter()
+        fields = {'time': now - self._last_time}
+        for name in PHASES:
+            fields[f'time_{name}'] = self.times[name]
+            fields[f'calls_{name}'] = self.calls[name]
+        fields['evals_per_s'] = nevals / self.times['evaluate'] if self.times['evaluate'] > 0 else 0.0
+
+        if 'cache_hits' in record:
+            n_lookups = record['cache_hits'] + record['cache_misses']
+            fields['cache_hit_rate'] = record['cache_hits'] / n_lookups if n_lookups else 0.0
+
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.calls = dict.fromkeys(PHASES, 0)
+        self._last_time = now
+
+        self._fields = fields
+        return fields if self.log_fields else {}
+
+    def write(self, record: dict):
+        """Passes the logbook record of the generation with the measurements to the sinks
+
+        :param record: Logbook record
+        :type record: dict
+        """
+        if self.sinks:
+            record = {**record, **self._fields}
+            for sink in self.sinks:
+                sink(record)
+
+    def close(self):
+        """Closes the sinks that have a `close` method"""
+        for sink in self.sinks:
+            if hasattr(sink, 'close'):
+                sink.close()
+
+
+def _to_json(value):
+    # Numpy scalars become numbers and statistics of several objectives (numpy vectors) become lists
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+class JsonLinesSink:
+    """Writes records to the file in the JSON Lines format (one JSON object per line)
+
+    :param path: Path to the file (it is overwritten)
+    :type path: str
+    """
+
+    def __init__(self, path: str):
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def __call__(self, record: dict):
+        self.file.write(json.dumps(record, default=_to_json) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def get_profiler(toolbox):
+    """Gets the profiler registered in the toolbox
+
+    :param toolbox: Toolbox with an optional `profiler` attribute
+    :type toolbox: class:`deap.base.Toolbox`
+    :return: Profiler or `NULL_PROFILER` if the instrumentation is turned off
+    """
+    return getattr(toolbox, 'profiler', NULL_PROFILER)
@@ -0,0 +1,358 @@
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from deap import tools
+
+from mlo_optimizer.components.algelitism import ea_simple_elitism
+from mlo_optimizer.components.checkpoint import get_checkpoint_state, restore_checkpoint_state
+from mlo_optimizer.components.genetic_alg import make_statistics, make_toolbox
+from mlo_optimizer.components.genome import LayoutTemplate
+from mlo_optimizer.components.instrumentation import Profiler
+from mlo_optimizer.components.nsga import make_halloffame
+from mlo_optimizer.components.parallel import get_n_jobs
+from mlo_optimizer.components.stopping import StoppingCriteria
+
+import numpy as np
+
+IMPLEMENTED_TOPOLOGIES = ('ring', 'full')
+
+_island_context = None
+
+
+class IslandConfig:
+    """Settings of the genetic algorithm shared by all islands
+
+    :param template: Layout template with the initial matrix and permutable elements
+    :type template: class:`LayoutTemplate`
+    :param individual_class: Class of individuals
+    :type individual_class: type
+    :param evaluate: Picklable objective function that receives an individual and returns a fitness score
+    :type evaluate: callable
+    :param cxpb: Crossbreeding probability
+    :type cxpb: float
+    :param mutpb: Mutation probability
+    :type mutpb: float
+    :param tourn_size: sample size for tournament selection
+    :type tourn_size: int
+    :param hall_of_fame_size: Number of elite individuals of each island
+    :type hall_of_fame_size: int
+    :param fitness_cache_size: Maximum number of fitness values memoized by genome in each process (0 disables the
+        cache)
+    :type fitness_cache_size: int
+    :param local_search_top_k: Number of the best offspring of each island refined by the swap local search in each
+        generation (0 disables the local search)
+    :type local_search_top_k: int
+    :param local_search_max_steps: Maximum number of swaps applied to a refined individual
+    :type local_search_max_steps: int
+    :param profile: Add the measurements of phases of generations to the logbook records of islands
+    :type profile: bool
+    """
+
+    def __init__(self, template: LayoutTemplate, individual_class: type, evaluate: callable, cxpb: float,
+                 mutpb: float, tourn_size: int, hall_of_fame_size: int, fitness_cache_size: int = 0,
+                 local_search_top_k: int = 0, local_search_max_steps: int = 1, profile: bool = False):
+        self.template = template
+        self.individual_class = individual_class
+        self.evaluate = evaluate
+        self.cxpb = cxpb
+        self.mutpb = mutpb
+        self.tourn_size = tourn_size
+        self.hall_of_fame_size = hall_of_fame_size
+        self.fitness_cache_size = fitness_cache_size
+        self.local_search_top_k = local_search_top_k
+        self.local_search_max_steps = local_search_max_steps
+        self.profile = profile
+
+
+class _IslandContext:
+    # Toolbox of a process evolving islands, the state of its random number generator is replaced by the state of
+    # the evolved island
+    def __init__(self, config: IslandConfig):
+        self.config = config
+        self.rng = np.random.default_rng()
+        self.toolbox = make_toolbox(config.template, config.individual_class, config.evaluate, self.rng,
+                                    config.tourn_size, fitness_cache_size=config.fitness_cache_size,
+                                    local_search_top_k=config.local_search_top_k,
+                                    local_search_max_steps=config.local_search_max_steps)
+        if config.profile:
+            self.toolbox.profiler = Profiler()
+        weights = config.individual_class.fitness_class.weights
+        self.stats = make_statistics(minimization=weights[0] < 0, n_objectives=len(weights))
+
+
+def _init_island_worker(config: IslandConfig):
+    global _island_context
+    _island_context = _IslandContext(config)
+
+
+def evolve_island(state: dict, ngen: int, config: IslandConfig = None) -> dict:
+    """Evolves the island up to the generation
+
+    :param state: State of the island (see `get_checkpoint_state`)
+    :type state: dict
+    :param ngen: Number of the last generation of the epoch
+    :type ngen: int
+    :param config: Settings of the genetic algorithm (the settings of the process are used by default)
+    :type config: class:`IslandConfig`
+    :return: State of the island after the epoch
+    """
+    return _evolve(_island_context if config is None else _IslandContext(config), state, ngen)
+
+
+def _evolve(context: _IslandContext, state: dict, ngen: int) -> dict:
+    config = context.config
+
+    hof = make_halloffame(config.individual_class, config.hall_of_fame_size)
+    gen, population, logbook = restore_checkpoint_state(state, config.individual_class, hof, context.rng)
+
+    population, logbook = ea_simple_elitism(population, context.toolbox, cxpb=config.cxpb, mutpb=config.mutpb,
+                                            ngen=ngen, stats=context.stats, halloffame=hof, verbose=False,
+                                            start_gen=gen + 1, logbook=logbook)
+
+    return get_checkpoint_state(ngen, population, hof, logbook, context.rng)
+
+
+def get_migration_sources(n_islands: int, topology: str) -> list:
+    """Finds the islands that send migrants to each island
+
+    :param n_islands: Number of islands
+    :type n_islands: int
+    :param topology: Migration topology ('ring' - each island sends migrants to the next one, 'full' - to all others)
+    :type topology: str
+    :return: List with a list of source islands for each island
+    """
+    if topology == 'ring':
+        return [[(i - 1) % n_islands] for i in range(n_islands)]
+    return [[j for j in range(n_islands) if j != i] for i in range(n_islands)]
+
+
+def migrate(states: list, migration_size: int, topology: str, weights: tuple):
+    """Replaces the worst individuals of each island by copies of the best individuals of its source islands
+
+    :param states: States of islands (changed in place)
+    :type states: list
+    :param migration_size: Number of migrants sent by an island to each of its destinations
+    :type migration_size: int
+    :param topology: Migration topology ('ring' or 'full')
+    :type topology: str
+    :param weights: Weights of the fitness values
+    :type weights: tuple
+    """
+    # Individuals of each island from the worst to the best one
+    orders = [np.lexsort((state['fitness_values'] * weights).T[::-1]) for state in states]
+    emigrant_ids = [order[-migration_size:] for order in orders]
+
+    migrants = [(state['genomes'][ids].copy(), state['fitness_values'][ids].copy())
+                for state, ids in zip(states, emigrant_ids)]
+
+    for state, order, sources in zip(states, orders, get_migration_sources(len(states), topology)):
+        genomes = np.concatenate([migrants[source][0] for source in sources])
+        fitness_values = np.concatenate([migrants[source][1] for source in sources])
+
+        # At most half of the island is replaced
+        n_immigrants = min(len(genomes), len(order) // 2)
+        replaced_ids = order[:n_immigrants]
+        state['genomes'][replaced_ids] = genomes[:n_immigrants]
+        state['fitness_values'][replaced_ids] = fitness_values[:n_immigrants]
+
+
+def merge_log_records(logbooks: list, gens: range) -> list:
+    """Combines the logbook records of islands
+
+    The numbers of evaluations, times and other counters are summed, minimum and maximum are taken over islands,
+    averages and cache hit rates are averaged (separately for each objective if there are several ones)
+
+    :param logbooks: Logbooks of islands
+    :type logbooks: list
+    :param gens: Numbers of the merged generations
+    :type gens: range
+    :return: List of combined records
+    """
+    records = []
+    for gen in gens:
+        island_records = [logbook[gen] for logbook in logbooks]
+        record = {}
+        for key in island_records[0]:
+            values = [island_record[key] for island_record in island_records]
+            if key == 'gen':
+                record[key] = gen
+            elif key == 'min':
+                record[key] = np.min(values, axis=0)
+            elif key == 'max':
+                record[key] = np.max(values, axis=0)
+            elif key in ('avg', 'cache_hit_rate'):
+                record[key] = np.mean(values, axis=0)
+            else:
+                record[key] = sum(values)
+        records.append(record)
+
+    return records
+
+
+class IslandModel:
+    """Island model of the genetic algorithm
+
+    Sub-populations (islands) evolve independently in worker processes. After every epoch of `migration_interval`
+    generations the best individuals of each island migrate along the topology and replace the worst individuals of
+    the destination islands. Each island keeps its own random number generators, so the results do not depend on the
+    number of processes
+
+    :param config: Settings of the genetic algorithm shared by all islands
+    :type config: class:`IslandConfig`
+    :param n_islands: Number of islands
+    :type n_islands: int
+    :param n_jobs: Number of worker processes (-1 means all processors, islands evolve in the current process if it
+        is 1)
+    :type n_jobs: int
+    :param executor: User-supplied executor from `concurrent.futures` (n_jobs is ignored)
+    :type executor: class:`concurrent.futures.Executor`
+    """
+
+    def __init__(self, config: IslandConfig, n_islands: int, n_jobs: int = 1, executor=None):
+        self.config = config
+        self.n_islands = n_islands
+
+        self.executor = executor
+        self.own_executor = False
+        self.context = None
+
+        n_workers = min(get_n_jobs(n_jobs), n_islands)
+        if executor is None and n_workers > 1:
+            self.executor = ProcessPoolExecutor(n_workers, initializer=_init_island_worker, initargs=(config,))
+            self.own_executor = True
+        elif executor is None:
+            self.context = _IslandContext(config)
+
+    def create_states(self, population_size: int, seed: int = None) -> list:
+        """Creates random islands
+
+        :param population_size: Population size of each island
+        :type population_size: int
+        :param seed: Seed of random number generators of islands
+        :type seed: int
+        :return: List of states of islands
+        """
+        states = []
+        for seed_seq in np.random.SeedSequence(seed).spawn(self.n_islands):
+            rng = np.random.default_rng(seed_seq)
+            island_seed = int(seed_seq.generate_state(1)[0])
+            states.append({
+                'gen': 0,
+                'genomes': np.stack([self.config.template.random_genome(rng) for _ in range(population_size)]),
+                'fitness_values': None,
+                'hof_genomes': None,
+                'hof_fitness_values': None,
+                'logbook': None,
+                'random_state': random.Random(island_seed).getstate(),
+                'np_random_state': np.random.RandomState(island_seed).get_state(),
+                'rng_state': rng.bit_generator.state,
+            })
+
+        return states
+
+    def evolve(self, states: list, ngen: int) -> list:
+        """Evolves all islands up to the generation
+
+        :param states: States of islands
+        :type states: list
+        :param ngen: Number of the last generation of the epoch
+        :type ngen: int
+        :return: States of islands after the epoch
+        """
+        if self.executor is None:
+            # Islands change the states of the global random number generators, so they are restored afterwards
+            random_state, np_random_state = random.getstate(), np.random.get_state()
+            try:
+                return [_evolve(self.context, state, ngen) for state in states]
+            finally:
+                random.setstate(random_state)
+                np.random.set_state(np_random_state)
+
+        if self.own_executor:
+            futures = [self.executor.submit(evolve_island, state, ngen) for state in states]
+        else:
+            futures = [self.executor.submit(evolve_island, state, ngen, self.config) for state in states]
+
+        return [future.result() for future in futures]
+
+    def run(self, population_size: int, max_generation: int, migration_interval: int, migration_size: int,
+            topology: str, halloffame, seed: int = None, stopping_criteria: StoppingCriteria = None,
+            verbose: bool = True, metrics_sink: callable = None) -> tools.Logbook:
+        """Runs the optimization
+
+        :param population_size: Population size of each island
+        :type population_size: int
+        :param max_generation: Maximum number of generations
+        :type max_generation: int
+        :param migration_interval: Number of generations between migrations
+        :type migration_interval: int
+        :param migration_size: Number of migrants sent by an island to each of its destinations
+        :type migration_size: int
+        :param topology: Migration topology ('ring' or 'full')
+        :type topology: str
+        :param halloffame: Global hall of fame updated with the best individuals of all islands
+        :type halloffame: class:`deap.tools.HallOfFame`
+        :param seed: Seed of random number generators of islands
+        :type seed: int
+        :param stopping_criteria: Criteria of the early stop checked on the combined records (the run stops at the end
+            of the epoch)
+        :type stopping_criteria: class:`StoppingCriteria`
+        :param verbose: Print the combined logbook records
+        :type verbose: bool
+        :param metrics_sink: Callable that receives each combined logbook record
+        :type metrics_sink: callable
+        :return: Combined logbook
+        """
+        states = self.create_states(population_size, seed)
+        logbook = tools.Logbook()
+        weights = self.config.individual_class.fitness_class.weights
+
+        gen, stop_reason = 0, None
+        while gen < max_generation and stop_reason is None:
+            next_gen = min(gen + migration_interval, max_generation)
+            states = self.evolve(states, next_gen)
+
+            if not logbook.header:
+                logbook.header = list(states[0]['logbook'].header)
+            island_logbooks = [state['logbook'] for state in states]
+            first_record = len(logbook)
+            for record in merge_log_records(island_logbooks, range(first_record, next_gen + 1)):
+                if stopping_criteria is not None:
+                    stop_reason = stop_reason or stopping_criteria.get_stop_reason(record)
+                logbook.record(**record)
+                if verbose:
+                    print(logbook.stream)
+
+            if stop_reason is not None:
+                logbook[-1]['stop_reason'] = stop_reason
+                if verbose and stop_reason != 'max_generation':
+                    print(f'Early stop: {stop_reason}')
+
+            if metrics_sink is not None:
+                for record in logbook[first_record:]:
+                    metrics_sink(record)
+
+            for state in states:
+                elite = []
+                for genome, fitness_values in zip(state['hof_genomes'], state['hof_fitness_values']):
+                    individual = self.config.individual_class(genome)
+                    individual.fitness.values = tuple(fitness_values.tolist())
+                    elite.append(individual)
+                halloffame.update(elite)
+
+            if next_gen < max_generation and stop_reason is None:
+                migrate(states, migration_size, topology, weights)
+            gen = next_gen
+
+        return logbook
+
+    def close(self):
+        """Shuts down the pool of worker processes (a user-supplied executor stays running)"""
+        if self.own_executor:
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,215 @@
+from copy import deepcopy
+
+from mlo_optimizer.components.archive import GenomeArchive
+from mlo_optimizer.components.individual import is_multi_objective
+
+import numpy as np
+
+
+def get_weighted_values(individuals: list) -> np.array:
+    """Collects the weighted fitness values of individuals (greater values are better for every objective)
+
+    :param individuals: Evaluated individuals
+    :type individuals: list
+    :return: Array of shape (number of individuals, number of objectives)
+    """
+    return np.array([individual.fitness.wvalues for individual in individuals], dtype=float).reshape(len(individuals),
+                                                                                                     -1)
+
+
+def get_domination_matrix(wvalues: np.array) -> np.array:
+    """Compares all pairs of individuals at once
+
+    :param wvalues: Weighted fitness values of shape (number of individuals, number of objectives)
+    :type wvalues: class:`numpy.array`
+    :return: Boolean matrix where the element (i, j) is True if the individual i dominates the individual j (it is not
+        worse by any objective and is better by at least one)
+    """
+    not_worse = np.ones((len(wvalues), len(wvalues)), dtype=bool)
+    better = np.zeros((len(wvalues), len(wvalues)), dtype=bool)
+    for values in wvalues.T:
+        not_worse &= values[:, None] >= values[None, :]
+        better |= values[:, None] > values[None, :]
+    return not_worse & better
+
+
+def get_pareto_ranks(wvalues: np.array) -> np.array:
+    """Sorts individuals into non-dominated fronts
+
+    The domination matrix is built once, then the fronts are peeled off by updating the numbers of dominating
+    individuals with vectorized sums instead of the pairwise Python loops of `deap.tools.sortNondominated`
+
+    :param wvalues: Weighted fitness values of shape (number of individuals, number of objectives)
+    :type wvalues: class:`numpy.array`
+    :return: Vector with the index of the front of each individual (0 - the Pareto front)
+    """
+    dominates = get_domination_matrix(wvalues)
+    n_dominators = dominates.sum(axis=0)
+    ranks = np.full(len(wvalues), -1, dtype=int)
+
+    rank = 0
+    front = np.flatnonzero(n_dominators == 0)
+    while len(front):
+        ranks[front] = rank
+        n_dominators -= dominates[front].sum(axis=0)
+        n_dominators[front] = -1
+        front = np.flatnonzero(n_dominators == 0)
+        rank += 1
+
+    return ranks
+
+
+def get_crowding_distances(wvalues: np.array, ranks: np.array) -> np.array:
+    """Calculates the crowding distances of individuals within their fronts
+
+    For each objective the individuals are sorted by the front and the value, so the neighbors of all fronts are found
+    by one sort. Boundary individuals of a front get an infinite distance, the others get the sum over objectives of
+    the distances between their neighbors normalized by the range of the front and the number of objectives (as in
+    `deap.tools.emo.assignCrowdingDist`). Objectives with the same value for the whole front are skipped, so they do
+    not make arbitrary ones of the equal individuals boundary
+
+    :param wvalues: Weighted fitness values of shape (number of individuals, number of objectives)
+    :type wvalues: class:`numpy.array`
+    :param ranks: Indexes of the fronts of individuals
+    :type ranks: class:`numpy.array`
+    :return: Vector of crowding distances
+    """
+    n_individuals = len(wvalues)
+    distances = np.zeros(n_individuals)
+    if not n_individuals:
+        return distances
+
+    for values in wvalues.T:
+        order = np.lexsort((values, ranks))
+        sorted_values, sorted_ranks = values[order], ranks[order]
+
+        first_mask = np.concatenate(([True], sorted_ranks[1:] != sorted_ranks[:-1]))
+        last_mask = np.concatenate((sorted_ranks[1:] != sorted_ranks[:-1], [True]))
+        spans = (sorted_values[last_mask] - sorted_values[first_mask])[np.cumsum(first_mask) - 1]
+
+        gaps = np.zeros(n_individuals)
+        gaps[1:-1] = sorted_values[2:] - sorted_values[:-2]
+        obj_distances = np.divide(gaps, spans * wvalues.shape[1], out=np.zeros(n_individuals), where=spans > 0)
+        obj_distances[(first_mask | last_mask) & (spans > 0)] = np.inf
+
+        distances[order] += obj_distances
+
+    return distances
+
+
+def sel_nsga2(individuals: list, n_selected: int) -> list:
+    """Selects the survivors by the front and the crowding distance (NSGA-II environmental selection)
+
+    :param individuals: Evaluated individuals
+    :type individuals: list
+    :param n_selected: Number of selected individuals
+    :type n_selected: int
+    :return: List of selected individuals from the best one
+    """
+    wvalues = get_weighted_values(individuals)
+    ranks = get_pareto_ranks(wvalues)
+    distances = get_crowding_distances(wvalues, ranks)
+
+    order = np.lexsort((-distances, ranks))[:n_selected]
+    return [individuals[i] for i in order]
+
+
+def sel_crowded_tournament(individuals: list, n_selected: int, rng: np.random.Generator) -> list:
+    """Selects parents by binary tournaments that prefer the lower front and then the greater crowding distance
+
+    :param individuals: Evaluated individuals
+    :type individuals: list
+    :param n_selected: Number of selected individuals
+    :type n_selected: int
+    :param rng: Random number generator
+    :type rng: class:`numpy.random.Generator`
+    :return: List of selected individuals
+    """
+    wvalues = get_weighted_values(individuals)
+    ranks = get_pareto_ranks(wvalues)
+    distances = get_crowding_distances(wvalues, ranks)
+
+    first_ids, second_ids = rng.integers(len(individuals), size=(2, n_selected))
+    first_wins = (ranks[first_ids] < ranks[second_ids]) | \
+        ((ranks[first_ids] == ranks[second_ids]) & (distances[first_ids] >= distances[second_ids]))
+    return [individuals[i] for i in np.where(first_wins, first_ids, second_ids)]
+
+
+class ParetoArchive:
+    """Archive of the non-dominated individuals found during the optimization
+
+    It replaces the hall of fame for several objectives: after each update the archive holds the Pareto front of the
+    previous archive and the new individuals (individuals with the same genome are kept once). If the front is larger
+    than `maxsize`, the most crowded individuals are dropped. Items are sorted by the weighted fitness values from the
+    best one in the lexicographic order
+
+    :param maxsize: Maximum number of kept individuals (None - the whole front is kept)
+    :type maxsize: int
+    """
+
+    def __init__(self, maxsize: int = None):
+        self.maxsize = maxsize
+        self.items = []
+        self.keys = []
+
+    def update(self, population: list):
+        """Adds the non-dominated individuals of the population
+
+        :param population: Evaluated individuals
+        :type population: list
+        """
+        candidates = {}
+        for individual in self.items + list(population):
+            candidates.setdefault(individual.genome.tobytes(), individual)
+        candidates = list(candidates.values())
+        if not candidates:
+            return
+
+        wvalues = get_weighted_values(candidates)
+        front = np.flatnonzero(~get_domination_matrix(wvalues).any(axis=0))
+        if self.maxsize is not None and len(front) > self.maxsize:
+            distances = get_crowding_distances(wvalues[front], np.zeros(len(front), dtype=int))
+            front = front[np.argsort(-distances, kind='stable')[:self.maxsize]]
+        front = front[np.lexsort(wvalues[front].T[::-1])[::-1]]
+
+        archived = {id(individual) for individual in self.items}
+        self.items = [candidates[i] if id(candidates[i]) in archived else deepcopy(candidates[i]) for i in front]
+        self.keys = [individual.fitness for individual in reversed(self.items)]
+
+    def load(self, individuals: list):
+        """Replaces the archived individuals by the individuals sorted from the best one without copying them
+
+        :param individuals: Non-dominated individuals sorted from the best one
+        :type individuals: list
+        """
+        self.items = list(individuals)
+        self.keys = [individual.fitness for individual in reversed(self.items)]
+
+    def clear(self):
+        self.items = []
+        self.keys = []
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, i):
+        return self.items[i]
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+def make_halloffame(individual_class: type, maxsize: int, min_distance: int = 0):
+    """Creates the storage of the best individuals
+
+    :param individual_class: Individual class
+    :type individual_class: type
+    :param maxsize: Maximum number of kept individuals (None keeps the whole Pareto front for several objectives)
+    :type maxsize: int
+    :param min_distance: Minimum Hamming distance between the genomes kept for a single objective
+    :type min_distance: int
+    :return: Pareto archive for several objectives or genome archive for a single objective
+    """
+    if is_multi_objective(individual_class):
+        return ParetoArchive(maxsize)
+    return GenomeArchive(maxsize, min_distance)
@@ -0,0 +1,229 @@
+import math
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from mlo_optimizer.components.shared_memory import SharedArray, SharedObject, has_shared_state
+from mlo_optimizer.config import CHUNKS_PER_JOB
+
+import numpy as np
+
+_worker_evaluate = None
+
+
+def _init_worker(evaluate):
+    global _worker_evaluate
+    # Forked workers receive the wrapper itself instead of the object restored from shared memory (the memory of the
+    # parent process is shared with them anyway)
+    if isinstance(evaluate, SharedObject):
+        evaluate = evaluate.obj
+    _worker_evaluate = evaluate
+
+
+def _evaluate_chunk(individuals: list, evaluate=None) -> list:
+    if evaluate is None:
+        evaluate = _worker_evaluate
+
+    evaluate_population = getattr(evaluate, 'evaluate_population', None)
+    if evaluate_population is not None:
+        return evaluate_population(individuals)
+    return [evaluate(ind) for ind in individuals]
+
+
+def _evaluate_shared_chunk(individual_class: type, genomes: np.array, origin_genomes: np.array,
+                           origin_values: np.array, fitness_values: np.array, start: int, end: int):
+    # Genomes and fitness values of the ancestors are read from shared memory, fitness values are written to it
+    individuals = []
+    for i in range(start, end):
+        individual = individual_class(genomes[i])
+        if not np.isnan(origin_values[i, 0]):
+            individual.origin = tuple(origin_values[i].tolist()), origin_genomes[i]
+        individuals.append(individual)
+
+    fitness_values[start:end] = _evaluate_chunk(individuals)
+
+
+class SharedPopulation:
+    """Blocks of shared memory with the genomes of the evaluated individuals, the genomes and fitness values of their
+    last evaluated ancestors (NaN if the ancestor is unknown) and the calculated fitness values
+
+    Blocks are reused while the population fits into them, larger blocks replace the blocks attached by the workers
+
+    :param capacity: Maximum number of individuals
+    :type capacity: int
+    :param n_genes: Length of genomes
+    :type n_genes: int
+    :param dtype: Type of genes
+    :type dtype: class:`numpy.dtype`
+    :param n_objectives: Number of fitness values of an individual
+    :type n_objectives: int
+    """
+
+    def __init__(self, capacity: int, n_genes: int, dtype, n_objectives: int):
+        # Workers detach the blocks of the previous population when they receive the blocks of the same role
+        self.genomes = SharedArray((capacity, n_genes), dtype, role='genomes')
+        self.origin_genomes = SharedArray((capacity, n_genes), dtype, role='origin_genomes')
+        self.origin_values = SharedArray((capacity, n_objectives), float, role='origin_values')
+        self.fitness_values = SharedArray((capacity, n_objectives), float, role='fitness_values')
+
+    def fits(self, n_individuals: int, n_genes: int, dtype, n_objectives: int) -> bool:
+        """Checks whether the individuals can be placed in the blocks
+
+        :param n_individuals: Number of individuals
+        :type n_individuals: int
+        :param n_genes: Length of genomes
+        :type n_genes: int
+        :param dtype: Type of genes
+        :type dtype: class:`numpy.dtype`
+        :param n_objectives: Number of fitness values of an individual
+        :type n_objectives: int
+        :return: True if the blocks are large enough and have the same types
+        """
+        capacity, genes = self.genomes.array.shape
+        return n_individuals <= capacity and n_genes == genes and self.genomes.array.dtype == dtype and \
+            n_objectives == self.fitness_values.array.shape[1]
+
+    def write(self, individuals: list):
+        """Copies the genomes and the ancestors of individuals to the blocks
+
+        :param individuals: Individuals with compact genomes
+        :type individuals: list
+        """
+        n_individuals = len(individuals)
+        np.stack([individual.genome for individual in individuals], out=self.genomes.array[:n_individuals])
+
+        self.origin_values.array[:n_individuals] = np.nan
+        for i, individual in enumerate(individuals):
+            if individual.origin is not None:
+                values, genome = individual.origin
+                self.origin_values.array[i] = values
+                self.origin_genomes.array[i] = genome
+
+    def get_args(self) -> tuple:
+        """Gets the blocks as arguments of the tasks (they are pickled by their names)
+
+        :return: Tuple of shared arrays
+        """
+        return self.genomes, self.origin_genomes, self.origin_values, self.fitness_values
+
+    def close(self):
+        """Releases and removes the blocks"""
+        for shared_array in self.get_args():
+            shared_array.close()
+
+
+def get_n_jobs(n_jobs: int) -> int:
+    """Converts the number of jobs to the number of worker processes
+
+    :param n_jobs: Number of jobs (-1 means all processors)
+    :type n_jobs: int
+    :return: Number of worker processes
+    """
+    if n_jobs == -1:
+        return os.cpu_count() or 1
+    return n_jobs
+
+
+class ParallelEvaluator:
+    """Evaluates individuals on a pool of worker processes
+
+    The population is split into chunks (several per worker) so that every task carries a batch of individuals.
+    When the pool is created by the evaluator, the objective function (together with bigram probabilities bound to it)
+    is sent to each worker only once, when the worker starts, and its NumPy arrays (e.g. the distance matrix and the
+    bigram arrays of `LayoutEvaluator`) are placed in shared memory, so all workers read the same copy. Genomes of
+    individuals and of their ancestors are written to shared memory as well, tasks carry only the ranges of
+    individuals and the workers write the fitness values back to a shared array, so individuals are not pickled. A
+    user-supplied executor receives the objective function together with each chunk of pickled individuals
+
+    :param evaluate: Picklable objective function that receives an individual and returns a fitness score. If it has
+        `evaluate_population` method, chunks are evaluated by it
+    :type evaluate: callable
+    :param n_jobs: Number of worker processes (-1 means all processors)
+    :type n_jobs: int
+    :param executor: User-supplied executor from `concurrent.futures` (n_jobs is ignored)
+    :type executor: class:`concurrent.futures.Executor`
+    """
+
+    def __init__(self, evaluate: callable, n_jobs: int = 1, executor=None):
+        self.evaluate = evaluate
+        self.shared_evaluate = None
+        self.shared_population = None
+
+        if executor is None:
+            self.n_workers = get_n_jobs(n_jobs)
+            if has_shared_state(evaluate):
+                self.shared_evaluate = SharedObject(evaluate)
+            self.executor = ProcessPoolExecutor(self.n_workers, initializer=_init_worker,
+                                                initargs=(self.shared_evaluate or evaluate,))
+            self.own_executor = True
+        else:
+            self.n_workers = getattr(executor, '_max_workers', None) or get_n_jobs(n_jobs)
+            self.executor = executor
+            self.own_executor = False
+
+    def evaluate_population(self, individuals: list) -> list:
+        """Evaluates individuals in parallel
+
+        :param individuals: Individuals to be evaluated
+        :type individuals: list
+        :return: List of fitness assessments in the order of individuals
+        """
+        chunk_size = math.ceil(len(individuals) / (self.n_workers * CHUNKS_PER_JOB)) or 1
+        bounds = [(start, min(start + chunk_size, len(individuals)))
+                  for start in range(0, len(individuals), chunk_size)]
+
+        if self.own_executor and individuals and hasattr(individuals[0], 'genome'):
+            return self._evaluate_shared(individuals, bounds)
+
+        futures = [self.submit(individuals[start:end]) for start, end in bounds]
+
+        fitnesses = []
+        for future in futures:
+            fitnesses.extend(future.result())
+
+        return fitnesses
+
+    def _evaluate_shared(self, individuals: list, bounds: list) -> list:
+        genome = individuals[0].genome
+        n_objectives = len(individuals[0].fitness.weights)
+        if self.shared_population is None or \
+                not self.shared_population.fits(len(individuals), len(genome), genome.dtype, n_objectives):
+            if self.shared_population is not None:
+                self.shared_population.close()
+            self.shared_population = SharedPopulation(len(individuals), len(genome), genome.dtype, n_objectives)
+
+        self.shared_population.write(individuals)
+        futures = [self.executor.submit(_evaluate_shared_chunk, type(individuals[0]),
+                                        *self.shared_population.get_args(), start, end)
+                   for start, end in bounds]
+        for future in futures:
+            future.result()
+
+        return [tuple(values) for values in self.shared_population.fitness_values.array[:len(individuals)].tolist()]
+
+    def submit(self, individuals: list) -> Future:
+        """Starts the evaluation of individuals in a worker process without waiting for the result
+
+        :param individuals: Individuals to be evaluated in a single task
+        :type individuals: list
+        :return: Future of the list of fitness assessments in the order of individuals
+        """
+        if self.own_executor:
+            return self.executor.submit(_evaluate_chunk, individuals)
+        return self.executor.submit(_evaluate_chunk, individuals, self.evaluate)
+
+    def close(self):
+        """Shuts down the pool of worker processes (a user-supplied executor stays running) and frees shared memory"""
+        if self.own_executor:
+            self.executor.shutdown()
+        if self.shared_population is not None:
+            self.shared_population.close()
+            self.shared_population = None
+        if self.shared_evaluate is not None:
+            self.shared_evaluate.close()
+            self.shared_evaluate = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,141 @@
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+# Blocks attached by the current process: name of the block -> (block, array)
+_attached_arrays = {}
+# Names of the blocks attached for roles: role of the array -> name of the block
+_attached_roles = {}
+
+
+class SharedArray:
+    """NumPy array placed in a block of shared memory
+
+    The array is pickled by the name of the block, its shape and type, so only a few bytes are sent to another
+    process. The process attaches to the block once when it unpickles the array for the first time and reads and
+    writes the same memory without copying. An array with a role replaces the block of the same role attached by the
+    process before (e.g. when the population outgrows its blocks), so the process does not keep stale blocks
+
+    :param shape: Shape of the array
+    :type shape: tuple
+    :param dtype: Type of elements
+    :type dtype: class:`numpy.dtype`
+    :param role: Name of the role of the array in the processes attaching it (None - the block is kept attached)
+    :type role: str
+    """
+
+    def __init__(self, shape: tuple, dtype, role: str = None):
+        dtype = np.dtype(dtype)
+        self.shm = SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf)
+        self.role = role
+
+    @classmethod
+    def from_array(cls, array: np.array) -> 'SharedArray':
+        """Copies the array to a new block of shared memory
+
+        :param array: Copied array
+        :type array: class:`numpy.array`
+        :return: Shared array
+        """
+        shared_array = cls(array.shape, array.dtype)
+        shared_array.array[...] = array
+        return shared_array
+
+    def __reduce__(self):
+        return attach_array, (self.shm.name, self.array.shape, self.array.dtype.str, self.role)
+
+    def close(self):
+        """Releases and removes the block (arrays attached to it in other processes must not be used afterwards)"""
+        if self.array is None:
+            return
+        self.array = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+def attach_array(name: str, shape: tuple, dtype: str, role: str = None) -> np.array:
+    """Gets the array placed in the block of shared memory by another process
+
+    :param name: Name of the block
+    :type name: str
+    :param shape: Shape of the array
+    :type shape: tuple
+    :param dtype: Type of elements
+    :type dtype: str
+    :param role: Role of the array, the block attached for the same role before is detached (None - the block is
+        kept attached)
+    :type role: str
+    :return: Array that uses the memory of the block
+    """
+    if name not in _attached_arrays:
+        if role is not None and role in _attached_roles:
+            detach_array(_attached_roles.pop(role))
+
+        shm = SharedMemory(name=name)
+        _attached_arrays[name] = shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        if role is not None:
+            _attached_roles[role] = name
+    return _attached_arrays[name][1]
+
+
+def detach_array(name: str):
+    """Closes the block attached by `attach_array` in the current process (the block itself is not removed)
+
+    :param name: Name of the block
+    :type name: str
+    """
+    shm, array = _attached_arrays.pop(name)
+    del array
+    try:
+        shm.close()
+    except BufferError:
+        # Views of the array are still alive, the memory is unmapped when they are collected
+        pass
+
+
+class SharedObject:
+    """Wrapper that sends the NumPy array attributes of the object to other processes through shared memory
+
+    The arrays are copied to blocks of shared memory once. When the wrapper is pickled, the other attributes are
+    pickled as usual and the arrays are replaced by the names of their blocks, so the object is restored in another
+    process with arrays that use the shared memory (e.g. the distance matrix and the bigram arrays of
+    `LayoutEvaluator` are kept in memory once for all worker processes)
+
+    :param obj: Object pickled by its attribute dictionary (see `has_shared_state`)
+    """
+
+    def __init__(self, obj):
+        self.obj = obj
+        self.arrays = {name: SharedArray.from_array(value) for name, value in vars(obj).items()
+                       if isinstance(value, np.ndarray) and value.dtype != object}
+
+    def __reduce__(self):
+        state = {name: value for name, value in vars(self.obj).items() if name not in self.arrays}
+        return _restore_object, (type(self.obj), state, self.arrays)
+
+    def close(self):
+        """Releases and removes the blocks of the arrays"""
+        for shared_array in self.arrays.values():
+            shared_array.close()
+
+
+def _restore_object(cls: type, state: dict, arrays: dict):
+    obj = cls.__new__(cls)
+    obj.__dict__.update(state)
+    obj.__dict__.update(arrays)
+    return obj
+
+
+def has_shared_state(obj) -> bool:
+    """Checks whether the NumPy array attributes of the object can be sent through shared memory
+
+    :param obj: Object
+    :return: True if the object is pickled by its attribute dictionary and has NumPy arrays among the attributes
+    """
+    cls = type(obj)
+    default_pickling = cls.__reduce_ex__ is object.__reduce_ex__ and cls.__reduce__ is object.__reduce__ and \
+        getattr(cls, '__getstate__', None) is getattr(object, '__getstate__', None) and \
+        not hasattr(cls, '__setstate__')
+    return default_pickling and hasattr(obj, '__dict__') and \
+        any(isinstance(value, np.ndarray) for value in vars(obj).values())
@@ -0,0 +1,210 @@
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from deap import tools
+
+from mlo_optimizer.components.algelitism import evaluate_individuals, get_log_record, get_stop_reason, \
+    refine_individuals, vary_individuals
+from mlo_optimizer.components.instrumentation import get_profiler
+from mlo_optimizer.config import MAX_BREEDING_ATTEMPTS
+
+
+def _get_key(individual) -> bytes:
+    return individual.genome.tobytes()
+
+
+def breed_offspring(population: list, toolbox, cxpb: float, mutpb: float, excluded_keys: set) -> list:
+    """Breeds offspring of two selected parents
+
+    Offspring that repeat the genome of a parent, of an individual of the population or of a pending individual are
+    dropped, so the workers evaluate only new genomes
+
+    :param population: Evaluated individuals
+    :type population: list
+    :param toolbox: Toolbox with registered selection and variation operators
+    :type toolbox: class:`deap.base.Toolbox`
+    :param cxpb: Crossbreeding probability
+    :type cxpb: float
+    :param mutpb: Mutation probability
+    :type mutpb: float
+    :param excluded_keys: Genome keys of the population and of the pending individuals
+    :type excluded_keys: set
+    :return: List of new offspring (may be empty)
+    """
+    offspring = vary_individuals(toolbox.select(population, 2), toolbox, cxpb, mutpb)
+
+    new_offspring = []
+    for individual in offspring:
+        key = _get_key(individual)
+        if not individual.fitness.valid and key not in excluded_keys:
+            excluded_keys.add(key)
+            new_offspring.append(individual)
+    return new_offspring
+
+
+def get_cached_fitness(individual, toolbox):
+    """Takes the fitness of the offspring from the fitness cache instead of submitting it
+
+    :param individual: Offspring with an invalid fitness
+    :param toolbox: Toolbox with optional `get_cached_fitness` function
+    :type toolbox: class:`deap.base.Toolbox`
+    :return: Fitness assessment or None if it is not cached (or the cache is turned off)
+    """
+    if hasattr(toolbox, 'get_cached_fitness'):
+        return toolbox.get_cached_fitness(individual)
+    return None
+
+
+def replace_worst(population: list, individual, keys: set) -> bool:
+    """Replaces the worst individual of the population if the new one is not worse
+
+    :param population: Evaluated individuals (changed in place)
+    :type population: list
+    :param individual: Evaluated individual
+    :param keys: Genome keys of the population (changed in place)
+    :type keys: set
+    :return: True if the individual entered the population
+    """
+    worst_id = min(range(len(population)), key=lambda i: population[i].fitness)
+    if individual.fitness < population[worst_id].fitness:
+        return False
+
+    keys.discard(_get_key(population[worst_id]))
+    keys.add(_get_key(individual))
+    population[worst_id] = individual
+    return True
+
+
+def ea_steady_state(population, toolbox, cxpb, mutpb, ngen, max_pending, stats=None, halloffame=None,
+                    verbose=__debug__):
+    """Steady-state genetic algorithm with asynchronous evaluation
+
+    There is no generational barrier: up to `max_pending` offspring are evaluated at once by
+    `toolbox.submit_evaluation` (which receives a list of individuals and returns a future of their fitness values).
+    As soon as any evaluation completes, the offspring replaces the worst individual of the population if it is not
+    worse, and new offspring are bred from the current population and submitted, so the workers stay busy even if the
+    evaluation time differs between individuals. The order of replacements depends on the order of completions, so
+    the results are not reproducible by the seed. If the toolbox has a fitness cache (`get_cached_fitness` and
+    `cache_fitness` functions), offspring with cached fitness are not submitted and completed evaluations are cached
+
+    Every len(population) completed evaluations are recorded in the logbook as a generation, the stop criteria of the
+    toolbox are checked after each record
+
+    :param population: Individuals of the initial population
+    :type population: list
+    :param toolbox: Toolbox with registered operators and the `submit_evaluation` function
+    :type toolbox: class:`deap.base.Toolbox`
+    :param cxpb: Crossbreeding probability
+    :type cxpb: float
+    :param mutpb: Mutation probability
+    :type mutpb: float
+    :param ngen: Maximum number of generations (len(population) evaluations each)
+    :type ngen: int
+    :param max_pending: Maximum number of offspring evaluated at once
+    :type max_pending: int
+    :param stats: Statistics of the population recorded in the logbook
+    :type stats: class:`deap.tools.Statistics`
+    :param halloffame: Hall of fame updated with each evaluated offspring
+    :type halloffame: class:`deap.tools.HallOfFame`
+    :param verbose: Print the logbook records
+    :type verbose: bool
+    :return: Final population and logbook
+    """
+    profiler = get_profiler(toolbox)
+    logbook = tools.Logbook()
+    logbook.header = ['gen', 'nevals'] + (stats.fields if stats else [])
+
+    def record_generation(gen, nevals):
+        with profiler.phase('stats'):
+            record = stats.compile(population) if stats else {}
+        record.update(get_log_record(toolbox))
+        record.update(profiler.get_log_record(nevals, record))
+        logbook.header.extend(key for key in record if key not in logbook.header)
+        logbook.record(gen=gen, nevals=nevals, **record)
+        if verbose:
+            print(logbook.stream)
+
+        stop_reason = get_stop_reason(toolbox, logbook)
+        profiler.write(logbook[-1])
+        return stop_reason
+
+    # The initial population is evaluated as a whole
+    invalid_ind = [ind for ind in population if not ind.fitness.valid]
+    with profiler.phase('evaluate'):
+        evaluate_individuals(invalid_ind, toolbox)
+    if halloffame is not None:
+        with profiler.phase('halloffame'):
+            halloffame.update(population)
+
+    stop_reason = record_generation(0, len(invalid_ind))
+
+    keys = {_get_key(individual) for individual in population}
+    pending_keys = set()
+    pending = {}
+    gen, nevals = 0, 0
+    try:
+        while stop_reason is None:
+            # Fill the free workers with new offspring, offspring with cached fitness are not submitted
+            evaluated = []
+            excluded_keys = keys | pending_keys
+            for _ in range(MAX_BREEDING_ATTEMPTS):
+                if len(pending) >= max_pending:
+                    break
+                with profiler.phase('vary'):
+                    offspring = breed_offspring(population, toolbox, cxpb, mutpb, excluded_keys)
+                for individual in offspring:
+                    fitness = get_cached_fitness(individual, toolbox)
+                    if fitness is not None:
+                        individual.fitness.values = fitness
+                        individual.origin = None
+                        evaluated.append(individual)
+                    else:
+                        pending_keys.add(_get_key(individual))
+                        pending[toolbox.submit_evaluation([individual])] = individual
+
+            if not pending and not evaluated:
+                # The population has converged, so no new genomes can be bred
+                stop_reason = 'converged'
+                logbook[-1]['stop_reason'] = stop_reason
+                break
+
+            done = set()
+            if pending:
+                with profiler.phase('evaluate'):
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                individual = pending.pop(future)
+                pending_keys.discard(_get_key(individual))
+                fitness = future.result()[0]
+                individual.fitness.values = fitness
+                individual.origin = None
+                if hasattr(toolbox, 'cache_fitness'):
+                    toolbox.cache_fitness(individual, fitness)
+                evaluated.append(individual)
+            n_evaluated = len(evaluated)
+
+            with profiler.phase('refine'):
+                evaluated = refine_individuals(evaluated, toolbox)
+            if halloffame is not None:
+                with profiler.phase('halloffame'):
+                    halloffame.update(evaluated)
+            with profiler.phase('select'):
+                for individual in evaluated:
+                    if _get_key(individual) not in keys:
+                        replace_worst(population, individual, keys)
+
+            nevals += n_evaluated
+            if nevals >= len(population):
+                gen += 1
+                stop_reason = record_generation(gen, nevals)
+                nevals = 0
+                if verbose and stop_reason is not None and stop_reason != 'max_generation':
+                    print(f'Early stop: {stop_reason}')
+                if gen >= ngen:
+                    break
+    finally:
+        # Evaluations that have not started yet are dropped
+        for future in pending:
+            future.cancel()
+
+    return population, logbook
@@ -0,0 +1,89 @@
+import time
+
+
+class StoppingCriteria:
+    """Criteria of the early stop of the optimization checked on the logbook records of generations
+
+    The best fitness is taken from the statistics of the record ('min' for minimization, 'max' for maximization), the
+    number of evaluations is taken from the 'nevals' field
+
+    :param max_generation: Maximum number of generations
+    :type max_generation: int
+    :param minimization: Minimization and Maximization Flag of the Objective Function
+    :type minimization: bool
+    :param stagnation_window: Number of generations without improvement of the best fitness after which the run stops
+        (None disables the criterion)
+    :type stagnation_window: int
+    :param min_improvement: Minimum relative improvement of the best fitness that resets the stagnation window
+    :type min_improvement: float
+    :param max_time: Wall-clock budget of the run in seconds (None disables the criterion)
+    :type max_time: float
+    :param max_evals: Maximum number of fitness evaluations (None disables the criterion)
+    :type max_evals: int
+    """
+
+    def __init__(self, max_generation: int, minimization: bool = True, stagnation_window: int = None,
+                 min_improvement: float = 0.0, max_time: float = None, max_evals: int = None):
+        self.max_generation = max_generation
+        self.best_key = 'min' if minimization else 'max'
+        self.sign = 1.0 if minimization else -1.0
+        self.stagnation_window = stagnation_window
+        self.min_improvement = min_improvement
+        self.max_time = max_time
+        self.max_evals = max_evals
+
+        self.start_time = time.perf_counter()
+        self.n_evals = 0
+        self.best = None
+        self.best_gen = 0
+
+    def get_state(self) -> dict:
+        """Gets the counters of the criteria, so a resumed run continues with the budgets spent before the interruption
+
+        :return: Dictionary with the elapsed time, the number of evaluations and the best fitness
+        """
+        return {
+            'elapsed_time': time.perf_counter() - self.start_time,
+            'n_evals': self.n_evals,
+            'best': self.best,
+            'best_gen': self.best_gen,
+        }
+
+    def set_state(self, state: dict):
+        """Restores the counters collected by `get_state`
+
+        :param state: Dictionary with the counters
+        :type state: dict
+        """
+        self.start_time = time.perf_counter() - state['elapsed_time']
+        self.n_evals = state['n_evals']
+        self.best = state['best']
+        self.best_gen = state['best_gen']
+
+    def get_stop_reason(self, record: dict):
+        """Checks the criteria after the generation
+
+        :param record: Logbook record of the generation
+        :type record: dict
+        :return: Name of the criterion that stops the run ('stagnation', 'max_time', 'max_evals' or 'max_generation')
+            or None
+        """
+        gen = record['gen']
+        self.n_evals += record.get('nevals', 0)
+
+        # The best fitness is tracked only for the stagnation criterion (statistics of several objectives are vectors)
+        best = record.get(self.best_key) if self.stagnation_window is not None else None
+        if best is not None:
+            best = float(best)
+            if self.best is None or (self.best - best) * self.sign > self.min_improvement * abs(self.best):
+                self.best, self.best_gen = best, gen
+
+        if self.stagnation_window is not None and gen - self.best_gen >= self.stagnation_window:
+            return 'stagnation'
+        if self.max_time is not None and time.perf_counter() - self.start_time >= self.max_time:
+            return 'max_time'
+        if self.max_evals is not None and self.n_evals >= self.max_evals:
+            return 'max_evals'
+        if gen >= self.max_generation:
+            return 'max_generation'
+        return None
@@ -0,0 +1,344 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+from mlo_optimizer.components.genome import LayoutTemplate
+from mlo_optimizer.components.parallel import get_n_jobs
+from mlo_optimizer.keyboards.evaluator import LayoutEvaluator
+from mlo_optimizer.keyboards.local_search import SwapLocalSearch
+
+import numpy as np
+
+IMPLEMENTED_ENGINES = ('ga', 'annealing', 'tabu')
+
+
+class SwapNeighborhood:
+    """Current genome of a single-trajectory search and the fitness changes of swaps of its placed elements
+
+    With a compiled objective function (`LayoutEvaluator`) the change of the fitness for a swap is calculated only
+    from the bigrams of the two moved symbols, so a move costs at most O(size of the alphabet) instead of a full
+    evaluation. Other objective functions evaluate the swapped genome completely
+
+    :param evaluate: Objective function that receives an individual and returns a fitness score
+    :type evaluate: callable
+    :param template: Layout template with the initial matrix and permutable elements
+    :type template: class:`LayoutTemplate`
+    :param individual_class: Class of individuals passed to the objective function
+    :type individual_class: type
+    """
+
+    def __init__(self, evaluate: callable, template: LayoutTemplate, individual_class: type):
+        self.evaluate = evaluate
+        self.template = template
+        self.individual_class = individual_class
+        self.n_placed = template.n_placed
+
+        self.incremental = isinstance(evaluate, LayoutEvaluator) and evaluate.genome_encodable
+        if self.incremental:
+            self.local_search = SwapLocalSearch(evaluate, 1)
+
+        self.genome = None
+        self.slots = None
+        self.score = None
+
+    def reset(self, genome: np.array) -> float:
+        """Makes the genome current
+
+        :param genome: Genome of the individual
+        :type genome: class:`numpy.array`
+        :return: Fitness score of the genome
+        """
+        self.genome = genome.copy()
+        self.score = self.get_score(self.genome)
+        if self.incremental:
+            self.slots = self.evaluate.encode_genomes(self.genome[None])[0]
+            assert (self.slots >= 0).all(), 'Every counted element must be placed in the matrix'
+        return self.score
+
+    def get_score(self, genome: np.array) -> float:
+        """Evaluates the genome completely
+
+        :param genome: Genome of the individual
+        :type genome: class:`numpy.array`
+        :return: Fitness score
+        """
+        individual = self.individual_class(genome)
+        return self.evaluate(individual)[0]
+
+    def get_delta(self, gene_1: int, gene_2: int) -> float:
+        """Calculates the change of the fitness for swapping two placed genes of the current genome
+
+        :param gene_1: Position of the first gene
+        :type gene_1: int
+        :param gene_2: Position of the second gene
+        :type gene_2: int
+        :return: Change of the fitness score
+        """
+        if not self.incremental:
+            genome = self.genome.copy()
+            genome[gene_1], genome[gene_2] = genome[gene_2], genome[gene_1]
+            return self.get_score(genome) - self.score
+
+        symbol_ids = self.evaluate.gene_symbol_ids
+        symbol_1, symbol_2 = symbol_ids[self.genome[gene_1]], symbol_ids[self.genome[gene_2]]
+        moved = [symbol for symbol in (symbol_1, symbol_2) if symbol >= 0]
+        if not moved:
+            return 0.0
+
+        # Bigrams of the moved symbols, a bigram of both symbols is listed for each of them
+        evaluate = self.evaluate
+        ptr = evaluate.symbol_bigram_ptr
+        bigram_ids = np.concatenate([evaluate.symbol_bigram_ids[ptr[symbol]:ptr[symbol + 1]] for symbol in moved])
+        if len(moved) > 1:
+            bigram_ids = np.unique(bigram_ids)
+
+        first_ids, second_ids = evaluate.first_ids[bigram_ids], evaluate.second_ids[bigram_ids]
+        old_first, old_second = self.slots[first_ids], self.slots[second_ids]
+        slot_1, slot_2 = self.template.free_slots[gene_1], self.template.free_slots[gene_2]
+        new_first = np.where(first_ids == symbol_1, slot_2, np.where(first_ids == symbol_2, slot_1, old_first))
+        new_second = np.where(second_ids == symbol_1, slot_2, np.where(second_ids == symbol_2, slot_1, old_second))
+
+        dists = evaluate.dists_matrix
+        return evaluate.bigram_probs_vec[bigram_ids] @ (dists[new_first, new_second] - dists[old_first, old_second])
+
+    def get_deltas(self) -> np.array:
+        """Calculates the changes of the fitness for all swaps of placed genes of the current genome
+
+        :return: Array of shape (number of placed genes, number of placed genes) with the changes of the fitness
+            score
+        """
+        if self.incremental:
+            return self.local_search.get_swap_deltas(self.slots[None])[0]
+
+        deltas = np.zeros((self.n_placed, self.n_placed))
+        for gene_1 in range(self.n_placed):
+            for gene_2 in range(gene_1 + 1, self.n_placed):
+                deltas[gene_1, gene_2] = deltas[gene_2, gene_1] = self.get_delta(gene_1, gene_2)
+        return deltas
+
+    def swap(self, gene_1: int, gene_2: int, delta: float):
+        """Swaps two placed genes of the current genome
+
+        :param gene_1: Position of the first gene
+        :type gene_1: int
+        :param gene_2: Position of the second gene
+        :type gene_2: int
+        :param delta: Change of the fitness score calculated by `get_delta` or `get_deltas`
+        :type delta: float
+        """
+        genome = self.genome
+        if self.incremental:
+            symbol_ids = self.evaluate.gene_symbol_ids
+            symbol_1, symbol_2 = symbol_ids[genome[gene_1]], symbol_ids[genome[gene_2]]
+            if symbol_1 >= 0:
+                self.slots[symbol_1] = self.template.free_slots[gene_2]
+            if symbol_2 >= 0:
+                self.slots[symbol_2] = self.template.free_slots[gene_1]
+
+        genome[gene_1], genome[gene_2] = genome[gene_2], genome[gene_1]
+        self.score += delta
+
+
+def simulated_annealing(neighborhood: SwapNeighborhood, genome: np.array, n_steps: int, rng: np.random.Generator,
+                        minimization: bool = True, initial_temperature: float = None) -> tuple:
+    """Searches the best genome by simulated annealing over swaps of placed elements
+
+    A random swap is accepted if it improves the fitness, and with the probability exp(-worsening / temperature)
+    otherwise. The temperature decreases geometrically down to a thousandth of the initial one
+
+    :param neighborhood: Evaluator of swaps
+    :type neighborhood: class:`SwapNeighborhood`
+    :param genome: Initial genome
+    :type genome: class:`numpy.array`
+    :param n_steps: Number of proposed swaps
+    :type n_steps: int
+    :param rng: Random number generator
+    :type rng: class:`numpy.random.Generator`
+    :param minimization: Minimization and Maximization Flag of the Objective Function
+    :type minimization: bool
+    :param initial_temperature: Initial temperature (by default the mean worsening of random swaps of the initial
+        genome)
+    :type initial_temperature: float
+    :return: Best genome and its fitness score
+    """
+    sign = 1.0 if minimization else -1.0
+    n_placed = neighborhood.n_placed
+    neighborhood.reset(genome)
+    best_genome, best_score = neighborhood.genome.copy(), neighborhood.score
+    if n_placed < 2:
+        # A single placed element cannot be swapped
+        return best_genome, best_score
+
+    genes_1 = rng.integers(n_placed, size=n_steps)
+    genes_2 = (genes_1 + rng.integers(1, n_placed, size=n_steps)) % n_placed
+    thresholds = rng.random(n_steps)
+
+    if initial_temperature is None:
+        samples = [abs(neighborhood.get_delta(gene_1, gene_2)) for gene_1, gene_2 in zip(genes_1[:100], genes_2[:100])]
+        initial_temperature = float(np.mean(samples)) or 1.0
+    cooling = 1e-3 ** (1 / n_steps)
+
+    temperature = initial_temperature
+    for gene_1, gene_2, threshold in zip(genes_1, genes_2, thresholds):
+        delta = neighborhood.get_delta(gene_1, gene_2)
+        if sign * delta <= 0 or threshold < math.exp(-sign * delta / temperature):
+            neighborhood.swap(gene_1, gene_2, delta)
+            if sign * (neighborhood.score - best_score) < 0:
+                best_genome, best_score = neighborhood.genome.copy(), neighborhood.score
+        temperature *= cooling
+
+    return best_genome, neighborhood.get_score(best_genome)
+
+
+def tabu_search(neighborhood: SwapNeighborhood, genome: np.array, n_steps: int, rng: np.random.Generator,
+                minimization: bool = True, tabu_tenure: int = 10) -> tuple:
+    """Searches the best genome by tabu search over swaps of placed elements
+
+    In each step the best swap of the whole neighborhood is applied even if it worsens the fitness. A swap that returns
+    both elements to the positions they left less than `tabu_tenure` steps ago is forbidden unless it gives a genome
+    better than the best one found
+
+    :param neighborhood: Evaluator of swaps
+    :type neighborhood: class:`SwapNeighborhood`
+    :param genome: Initial genome
+    :type genome: class:`numpy.array`
+    :param n_steps: Number of applied swaps
+    :type n_steps: int
+    :param rng: Random number generator breaking ties between swaps
+    :type rng: class:`numpy.random.Generator`
+    :param minimization: Minimization and Maximization Flag of the Objective Function
+    :type minimization: bool
+    :param tabu_tenure: Number of steps during which an element may not return to its position
+    :type tabu_tenure: int
+    :return: Best genome and its fitness score
+    """
+    sign = 1.0 if minimization else -1.0
+    n_placed = neighborhood.n_placed
+    neighborhood.reset(genome)
+    best_genome, best_score = neighborhood.genome.copy(), neighborhood.score
+    if n_placed < 2:
+        # A single placed element cannot be swapped
+        return best_genome, best_score
+
+    # Step until which an element may not return to a position
+    tabu_until = np.zeros((neighborhood.template.n_genes, n_placed), dtype=int)
+    upper_mask = np.triu(np.ones((n_placed, n_placed), dtype=bool), k=1)
+    positions = np.arange(n_placed)
+
+    for step in range(n_steps):
+        deltas = neighborhood.get_deltas()
+        costs = sign * deltas + rng.random(deltas.shape) * 1e-12
+
+        returns = tabu_until[neighborhood.genome[:n_placed][:, None], positions[None, :]] > step
+        allowed = ~(returns & returns.T) | (sign * (neighborhood.score + deltas - best_score) < -1e-12)
+        costs[~(allowed & upper_mask)] = np.inf
+        if np.isinf(costs).all():
+            costs = np.where(upper_mask, sign * deltas, np.inf)
+
+        gene_1, gene_2 = np.unravel_index(np.argmin(costs), costs.shape)
+        tabu_until[neighborhood.genome[gene_1], gene_1] = tabu_until[neighborhood.genome[gene_2], gene_2] = \
+            step + tabu_tenure
+        neighborhood.swap(gene_1, gene_2, deltas[gene_1, gene_2])
+
+        if sign * (neighborhood.score - best_score) < 0:
+            best_genome, best_score = neighborhood.genome.copy(), neighborhood.score
+
+    return best_genome, neighborhood.get_score(best_genome)
+
+
+class TrajectoryConfig:
+    """Settings of single-trajectory search engines
+
+    :param engine: Search engine ('annealing' or 'tabu')
+    :type engine: str
+    :param template: Layout template with the initial matrix and permutable elements
+    :type template: class:`LayoutTemplate`
+    :param individual_class: Class of individuals
+    :type individual_class: type
+    :param evaluate: Picklable objective function that receives an individual and returns a fitness score
+    :type evaluate: callable
+    :param n_steps: Number of steps of each restart
+    :type n_steps: int
+    :param initial_temperature: Initial temperature of simulated annealing (None - estimated from random swaps)
+    :type initial_temperature: float
+    :param tabu_tenure: Number of steps during which an element may not return to its position in tabu search
+    :type tabu_tenure: int
+    """
+
+    def __init__(self, engine: str, template: LayoutTemplate, individual_class: type, evaluate: callable,
+                 n_steps: int, initial_temperature: float = None, tabu_tenure: int = 10):
+        self.engine = engine
+        self.template = template
+        self.individual_class = individual_class
+        self.evaluate = evaluate
+        self.n_steps = n_steps
+        self.initial_temperature = initial_temperature
+        self.tabu_tenure = tabu_tenure
+
+
+def run_restart(config: TrajectoryConfig, seed_seq: np.random.SeedSequence) -> tuple:
+    """Runs the search from a random genome
+
+    :param config: Settings of the search
+    :type config: class:`TrajectoryConfig`
+    :param seed_seq: Seed sequence of the restart
+    :type seed_seq: class:`numpy.random.SeedSequence`
+    :return: Best genome and its fitness score
+    """
+    rng = np.random.default_rng(seed_seq)
+    neighborhood = SwapNeighborhood(config.evaluate, config.template, config.individual_class)
+    minimization = config.individual_class.fitness_class.weights[0] < 0
+    genome = config.template.random_genome(rng)
+
+    if config.engine == 'annealing':
+        return simulated_annealing(neighborhood, genome, config.n_steps, rng, minimization=minimization,
+                                   initial_temperature=config.initial_temperature)
+    return tabu_search(neighborhood, genome, config.n_steps, rng, minimization=minimization,
+                       tabu_tenure=config.tabu_tenure)
+
+
+def run_restarts(config: TrajectoryConfig, n_restarts: int, halloffame, seed: int = None, n_jobs: int = 1,
+                 executor=None, verbose: bool = True) -> list:
+    """Runs independent restarts of the search in worker processes
+
+    Each restart has its own random number generator derived from the seed, so the results do not depend on the
+    number of processes
+
+    :param config: Settings of the search
+    :type config: class:`TrajectoryConfig`
+    :param n_restarts: Number of restarts
+    :type n_restarts: int
+    :param halloffame: Hall of fame updated with the best individuals of restarts
+    :type halloffame: class:`deap.tools.HallOfFame`
+    :param seed: Seed of random number generators of restarts
+    :type seed: int
+    :param n_jobs: Number of worker processes (-1 means all processors, restarts run in the current process if it is
+        1)
+    :type n_jobs: int
+    :param executor: User-supplied executor from `concurrent.futures` (n_jobs is ignored)
+    :type executor: class:`concurrent.futures.Executor`
+    :param verbose: Print the best fitness score of each restart
+    :type verbose: bool
+    :return: List of fitness scores of restarts
+    """
+    seed_seqs = np.random.SeedSequence(seed).spawn(n_restarts)
+
+    n_workers = min(get_n_jobs(n_jobs), n_restarts)
+    if executor is not None:
+        results = [future.result() for future in [executor.submit(run_restart, config, seed_seq)
+                                                  for seed_seq in seed_seqs]]
+    elif n_workers > 1:
+        with ProcessPoolExecutor(n_workers) as pool:
+            results = list(pool.map(run_restart, [config] * n_restarts, seed_seqs))
+    else:
+        results = [run_restart(config, seed_seq) for seed_seq in seed_seqs]
+
+    scores = []
+    for i, (genome, score) in enumerate(results):
+        individual = config.individual_class(genome)
+        individual.fitness.values = (score,)
+        halloffame.update([individual])
+        scores.append(score)
+        if verbose:
+            print(f'restart {i}: {score}')
+
+    return scores
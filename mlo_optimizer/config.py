@@ -1,4 +1,5 @@
 BATCH_SIZE = 128
+READ_CHUNK_SIZE = 1 << 20
 
 A_S_DEFAULT = 0.5
 A_H_DEFAULT = 0.537634
@@ -12,3 +13,21 @@ P_CROSSOVER_DEFAULT = 0.9
 P_MUTATION_DEFAULT = 0.2
 TOURN_SIZE_DEFAULT = 3
 HALL_OF_FAME_SIZE_DEFAULT = 1
+N_JOBS_DEFAULT = 1
+FITNESS_CACHE_SIZE_DEFAULT = 0
+CHECKPOINT_INTERVAL_DEFAULT = 10
+N_ISLANDS_DEFAULT = 1
+MIGRATION_INTERVAL_DEFAULT = 10
+MIGRATION_SIZE_DEFAULT = 2
+TOPOLOGY_DEFAULT = 'ring'
+LOCAL_SEARCH_TOP_K_DEFAULT = 0
+LOCAL_SEARCH_MAX_STEPS_DEFAULT = 20
+ENGINE_DEFAULT = 'ga'
+N_RESTARTS_DEFAULT = 4
+ANNEALING_STEPS_DEFAULT = 20000
+TABU_STEPS_DEFAULT = 1000
+TABU_TENURE_DEFAULT = 10
+
+CHUNKS_PER_JOB = 4
+PENDING_PER_JOB = 2
+MAX_BREEDING_ATTEMPTS = 100
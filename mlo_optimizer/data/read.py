@@ -1,6 +1,8 @@
+import mmap
+import os
 import pathlib
 
-import pandas as pd
+from mlo_optimizer.config import READ_CHUNK_SIZE
 
 
 def read_dir(directory: str, pattern: str = '*.txt'):
@@ -12,15 +14,62 @@ def read_dir(directory: str, pattern: str = '*.txt'):
     :type pattern: str
     :return: Pandas series with read lines
     """
+    # pandas is imported on the first call, so the package (and the processes that only evaluate layouts) do not load it
+    import pandas as pd
+
     path = pathlib.Path(directory)
     assert path.exists(), f'Directory "{directory}" does not exist'
 
-    texts = pd.Series()
+    texts = []
 
     for text_file in path.glob(pattern):
         print(f'Processing {text_file}')
 
-        cur_series = pd.read_csv(text_file, sep='\r\n', header=None, engine='python')[0]
-        texts = pd.concat((texts, cur_series))
+        with open(text_file, encoding='utf-8') as file:
+            lines = (line.strip() for line in file)
+            texts.extend(line for line in lines if line)
+
+    return pd.Series(texts, dtype=object)
+
+
+def iter_text_chunks(text_file: str, chunk_size: int = READ_CHUNK_SIZE, use_mmap: bool = False):
+    """Reads a text file by chunks of lines
+
+    Lines are processed in the same way as in `read_dir`: they are stripped, empty lines are skipped and the remaining
+    lines are concatenated without separators
+
+    :param text_file: Path to text file
+    :type text_file: str
+    :param chunk_size: Approximate number of characters in one chunk
+    :type chunk_size: int
+    :param use_mmap: Read the file through a memory map instead of buffered reads
+    :type use_mmap: bool
+    :return: Generator of strings with concatenated lines
+    """
+    if use_mmap:
+        yield from _iter_text_chunks_mmap(text_file, chunk_size)
+        return
+
+    with open(text_file, encoding='utf-8') as file:
+        while True:
+            lines = file.readlines(chunk_size)
+            if not lines:
+                break
+            yield ''.join(line.strip() for line in lines)
+
+
+def _iter_text_chunks_mmap(text_file: str, chunk_size: int):
+    with open(text_file, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+            start = 0
+            while start < len(mapped_file):
+                # Chunks end at line breaks, so lines and multibyte characters are never split
+                end = mapped_file.find(b'\n', start + chunk_size)
+                end = len(mapped_file) if end == -1 else end + 1
 
-    return texts.reset_index(drop=True)
+                text = mapped_file[start:end].decode('utf-8')
+                yield ''.join(line.strip() for line in text.split('\n'))
+                start = end
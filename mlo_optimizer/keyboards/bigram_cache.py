@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import pathlib
+import time
+
+from mlo_optimizer.config import READ_CHUNK_SIZE
+from mlo_optimizer.keyboards.bigram_counter import BigramCounter, iter_files_bigrams, print_throughput
+
+import numpy as np
+
+BIGRAM_CACHE_VERSION = 2
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def get_file_hash(text_file: str) -> str:
+    """Calculates the hash of the file content
+
+    :param text_file: Path to file
+    :type text_file: str
+    :return: Hexadecimal digest
+    """
+    file_hash = hashlib.blake2b(digest_size=16)
+
+    with open(text_file, 'rb') as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b''):
+            file_hash.update(block)
+
+    return file_hash.hexdigest()
+
+
+class BigramCache:
+    """Persistent on-disk cache of bigram counts
+
+    Counts of each text file are stored in a separate `.npz` file keyed by the hash of the file content and the
+    counted elements, so a warm start reads only the count arrays, and a changed file invalidates only its own entry.
+    Content hashes are remembered together with the size and modification time of files, so unchanged files are not
+    even hashed again
+
+    :param cache_dir: Directory with cached counts
+    :type cache_dir: str
+    """
+    MANIFEST_NAME = 'manifest.json'
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        manifest_path = self.cache_dir / BigramCache.MANIFEST_NAME
+        self.manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+
+    def count_bigrams(self, directory: str, counted_elems: list, pattern: str = '*.txt',
+                      chunk_size: int = READ_CHUNK_SIZE, n_jobs: int = 1, use_mmap: bool = False) -> BigramCounter:
+        """Counts bigrams of all text files in the directory counting only the files missing from the cache
+
+        Results are the same as the ones of `count_bigrams`
+
+        :param directory: Path to directory with text files
+        :type directory: str
+        :param counted_elems: Set of elements taken into account in the objective function
+        :type counted_elems: list
+        :param pattern: File format to read
+        :type pattern: str
+        :param chunk_size: Approximate number of characters read at once
+        :type chunk_size: int
+        :param n_jobs: Number of worker processes counting missing files (-1 means all processors)
+        :type n_jobs: int
+        :param use_mmap: Read files through a memory map instead of buffered reads
+        :type use_mmap: bool
+        :return: Bigram counter
+        """
+        path = pathlib.Path(directory)
+        assert path.exists(), f'Directory "{directory}" does not exist'
+
+        text_files = list(path.glob(pattern))
+        elems_hash = hashlib.blake2b(json.dumps([BIGRAM_CACHE_VERSION, counted_elems]).encode(),
+                                     digest_size=8).hexdigest()
+        entry_paths = [
+            self.cache_dir / f'{self._get_file_hash(text_file)}-{elems_hash}.npz' for text_file in text_files
+        ]
+        self._save_manifest()
+
+        missing_files, missing_entry_paths = [], []
+        for text_file, entry_path in zip(text_files, entry_paths):
+            if not entry_path.exists():
+                missing_files.append(text_file)
+                missing_entry_paths.append(entry_path)
+        print(f'Bigram cache: {len(text_files) - len(missing_files)} of {len(text_files)} files are cached')
+
+        if missing_files:
+            start_time = time.perf_counter()
+            n_bytes = 0
+            file_counters = iter_files_bigrams(missing_files, counted_elems, chunk_size, n_jobs=n_jobs,
+                                               use_mmap=use_mmap)
+            for entry_path, file_counter in zip(missing_entry_paths, file_counters):
+                self._save_entry(entry_path, file_counter)
+                n_bytes += file_counter.n_bytes
+            print_throughput(len(missing_files), n_bytes, time.perf_counter() - start_time)
+
+        counter = BigramCounter(counted_elems)
+        for entry_path in entry_paths:
+            counter.merge(self._load_entry(entry_path, counted_elems))
+
+        return counter
+
+    def _get_file_hash(self, text_file: pathlib.Path) -> str:
+        stat = os.stat(text_file)
+        key = str(text_file.resolve())
+
+        cached = self.manifest.get(key)
+        if cached is not None and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+
+        file_hash = get_file_hash(text_file)
+        self.manifest[key] = [stat.st_size, stat.st_mtime_ns, file_hash]
+        return file_hash
+
+    def _save_manifest(self):
+        manifest_path = self.cache_dir / BigramCache.MANIFEST_NAME
+        tmp_path = manifest_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(self.manifest))
+        os.replace(tmp_path, manifest_path)
+
+    @staticmethod
+    def _save_entry(entry_path: pathlib.Path, counter: BigramCounter):
+        meta = [counter.total, counter.n_bytes]
+
+        tmp_path = entry_path.with_suffix('.tmp.npz')
+        np.savez_compressed(tmp_path, keys=counter.keys, counts=counter.counts, head=counter.head, tail=counter.tail,
+                            meta=np.array(meta, dtype=np.int64))
+        os.replace(tmp_path, entry_path)
+
+    @staticmethod
+    def _load_entry(entry_path: pathlib.Path, counted_elems: list) -> BigramCounter:
+        counter = BigramCounter(counted_elems)
+        with np.load(entry_path) as entry:
+            counter.keys, counter.counts = entry['keys'], entry['counts']
+            counter.head, counter.tail = entry['head'], entry['tail']
+            counter.total, counter.n_bytes = (int(value) for value in entry['meta'])
+
+        return counter
@@ -0,0 +1,286 @@
+import os
+import pathlib
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Tuple
+
+from mlo_optimizer.components.parallel import get_n_jobs
+from mlo_optimizer.config import READ_CHUNK_SIZE
+from mlo_optimizer.data.read import iter_text_chunks
+from mlo_optimizer.keyboards.ngrams import SparseNgrams, add_sparse_counts, decode_ngrams, encode_ngrams
+
+import numpy as np
+
+SYMBOL_ALIASES = {'space': ' ', 'enter': '\n'}
+MAX_CODEPOINT = 0x110000
+
+
+@lru_cache(maxsize=8)
+def _get_symbol_lookup(counted_elems: tuple) -> np.array:
+    lookup = np.full(MAX_CODEPOINT, len(counted_elems), dtype=np.min_scalar_type(len(counted_elems)))
+
+    for symbol_id, elem in enumerate(counted_elems):
+        char = SYMBOL_ALIASES.get(elem, elem)
+        if isinstance(char, str) and len(char) == 1:
+            lookup[ord(char)] = symbol_id
+
+    lookup.flags.writeable = False
+    return lookup
+
+
+def get_symbol_lookup(counted_elems: list) -> np.array:
+    """Builds a table that maps Unicode code points to indexes of counted elements
+
+    Characters are mapped to the counted elements that coincide with them or are their aliases (' ' is 'space' and
+    '\\n' is 'enter'), all other characters are mapped to len(counted_elems)
+
+    :param counted_elems: Set of elements taken into account in the objective function
+    :type counted_elems: list
+    :return: Read-only lookup table indexed by code points (shared by all counters with the same counted elements)
+    """
+    return _get_symbol_lookup(tuple(counted_elems))
+
+
+class NgramCounter:
+    """Streaming n-gram counter with memory proportional to the number of observed n-grams
+
+    Counts are kept as a sparse vector: sorted integer keys of n-grams of counted elements (see `encode_ngrams`) and
+    their counts, n-grams that contain characters that are not counted are only added to the total. Texts are fed in
+    arbitrary chunks, the last order - 1 characters of a chunk are carried over to the next one, so the counts do not
+    depend on the chunk boundaries
+
+    :param counted_elems: Set of elements taken into account in the objective function
+    :type counted_elems: list
+    :param order: Length of n-grams (2 - bigrams, 3 - trigrams)
+    :type order: int
+    """
+
+    def __init__(self, counted_elems: list, order: int = 2):
+        assert order >= 2, 'N-grams must contain at least two symbols'
+
+        self.counted_elems = counted_elems
+        self.order = order
+        self.n_symbols = len(counted_elems)
+        self.lookup = get_symbol_lookup(counted_elems)
+
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.total = 0
+        # The first and the last order - 1 symbols of the counted text
+        self.head = np.zeros(0, dtype=np.int64)
+        self.tail = np.zeros(0, dtype=np.int64)
+        self.n_bytes = 0
+
+    def update(self, text: str):
+        """Counts n-grams of the text continuing the previously counted texts
+
+        :param text: Lowercase text
+        :type text: str
+        """
+        if not text:
+            return
+
+        ids = self.lookup[np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)].astype(np.int64)
+        ids = np.concatenate((self.tail, ids))
+        if len(self.head) < self.order - 1:
+            self.head = ids[:self.order - 1].copy()
+        self.tail = ids[-(self.order - 1):].copy()
+
+        self._add_ngrams(ids)
+
+    def update_file(self, text_file: str, chunk_size: int = READ_CHUNK_SIZE, use_mmap: bool = False):
+        """Counts n-grams of the text file reading it by chunks
+
+        :param text_file: Path to text file
+        :type text_file: str
+        :param chunk_size: Approximate number of characters in one chunk
+        :type chunk_size: int
+        :param use_mmap: Read the file through a memory map instead of buffered reads
+        :type use_mmap: bool
+        """
+        for chunk in iter_text_chunks(text_file, chunk_size, use_mmap=use_mmap):
+            self.update(chunk.lower())
+        self.n_bytes += os.path.getsize(text_file)
+
+    def merge(self, other):
+        """Adds the counts of the text that follows the counted one
+
+        The n-grams that span the end of this text and the beginning of the other text are counted as well, so
+        counting texts separately and merging the counters gives the same result as counting them in a row
+
+        :param other: Counter of the next text with the same counted elements and order
+        :type other: class:`NgramCounter`
+        """
+        assert self.counted_elems == other.counted_elems and self.order == other.order, \
+            'Counters with different counted elements or orders cannot be merged'
+
+        # Both parts of the boundary are shorter than n-grams, so each n-gram of the boundary spans both texts
+        self._add_ngrams(np.concatenate((self.tail, other.head)))
+        self.keys, self.counts = add_sparse_counts(self.keys, self.counts, other.keys, other.counts)
+        self.total += other.total
+        self.n_bytes += other.n_bytes
+
+        if len(self.head) < self.order - 1:
+            self.head = np.concatenate((self.head, other.head))[:self.order - 1]
+        self.tail = np.concatenate((self.tail, other.tail))[-(self.order - 1):]
+
+    def _add_ngrams(self, ids: np.array):
+        n_ngrams = len(ids) - self.order + 1
+        if n_ngrams <= 0:
+            return
+        self.total += n_ngrams
+
+        # Keys of small alphabets are counted by a temporary dense array that is not larger than the chunk
+        keys = encode_ngrams(ids, self.order, self.n_symbols + 1)
+        n_keys = (self.n_symbols + 1) ** self.order
+        if n_keys <= 4 * n_ngrams:
+            counts = np.bincount(keys, minlength=n_keys)
+            keys = np.flatnonzero(counts)
+            counts = counts[keys]
+        else:
+            keys, counts = np.unique(keys, return_counts=True)
+
+        # N-grams with characters that are not counted are skipped
+        counted_mask = (decode_ngrams(keys, self.order, self.n_symbols + 1) < self.n_symbols).all(axis=1)
+        self.keys, self.counts = add_sparse_counts(self.keys, self.counts, keys[counted_mask], counts[counted_mask])
+
+    def __getstate__(self):
+        # The lookup table is large and is rebuilt from counted elements, so it is not sent between processes
+        state = self.__dict__.copy()
+        del state['lookup']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lookup = get_symbol_lookup(self.counted_elems)
+
+    def get_ngrams(self) -> SparseNgrams:
+        """Calculates the probabilities of n-grams of counted elements
+
+        :return: Sparse n-gram probabilities indexed by counted elements
+        """
+        ids = decode_ngrams(self.keys, self.order, self.n_symbols + 1)
+        return SparseNgrams(self.counted_elems, ids, self.counts / max(self.total, 1))
+
+    def get_bigram_probs_with_vec(self) -> Tuple[list, np.array]:
+        """Calculates the probabilities of bigrams of counted elements
+
+        :return: List of bigrams of the form: ((first symbol, next symbol), probability) and bigram vector
+        """
+        assert self.order == 2, 'Bigram probabilities are calculated only by bigram counters'
+        return self.get_ngrams().get_probs_with_vec()
+
+
+class BigramCounter(NgramCounter):
+    """Streaming bigram counter (see `NgramCounter`)
+
+    :param counted_elems: Set of elements taken into account in the objective function
+    :type counted_elems: list
+    """
+
+    def __init__(self, counted_elems: list):
+        super().__init__(counted_elems, order=2)
+
+
+def count_file_bigrams(text_file: str, counted_elems: list, chunk_size: int = READ_CHUNK_SIZE,
+                       use_mmap: bool = False) -> BigramCounter:
+    """Counts bigrams of one text file
+
+    :param text_file: Path to text file
+    :type text_file: str
+    :param counted_elems: Set of elements taken into account in the objective function
+    :type counted_elems: list
+    :param chunk_size: Approximate number of characters read at once
+    :type chunk_size: int
+    :param use_mmap: Read the file through a memory map instead of buffered reads
+    :type use_mmap: bool
+    :return: Bigram counter of the file
+    """
+    counter = BigramCounter(counted_elems)
+    counter.update_file(text_file, chunk_size, use_mmap=use_mmap)
+    return counter
+
+
+def iter_files_bigrams(text_files: list, counted_elems: list, chunk_size: int = READ_CHUNK_SIZE, n_jobs: int = 1,
+                       use_mmap: bool = False):
+    """Counts bigrams of each text file separately
+
+    :param text_files: Paths to text files
+    :type text_files: list
+    :param counted_elems: Set of elements taken into account in the objective function
+    :type counted_elems: list
+    :param chunk_size: Approximate number of characters read at once
+    :type chunk_size: int
+    :param n_jobs: Number of worker processes (-1 means all processors)
+    :type n_jobs: int
+    :param use_mmap: Read files through a memory map instead of buffered reads
+    :type use_mmap: bool
+    :return: Generator of bigram counters in the order of files
+    """
+    n_jobs = min(get_n_jobs(n_jobs), len(text_files))
+
+    if n_jobs > 1:
+        with ProcessPoolExecutor(n_jobs) as executor:
+            # The largest files are submitted first to balance the load, the results are yielded in the files order
+            futures = {}
+            for text_file in sorted(text_files, key=os.path.getsize, reverse=True):
+                futures[text_file] = executor.submit(count_file_bigrams, text_file, counted_elems, chunk_size,
+                                                     use_mmap)
+            for text_file in text_files:
+                print(f'Processing {text_file}')
+                yield futures.pop(text_file).result()
+    else:
+        for text_file in text_files:
+            print(f'Processing {text_file}')
+            yield count_file_bigrams(text_file, counted_elems, chunk_size, use_mmap)
+
+
+def count_bigrams(directory: str, counted_elems: list, pattern: str = '*.txt', chunk_size: int = READ_CHUNK_SIZE,
+                  n_jobs: int = 1, use_mmap: bool = False) -> BigramCounter:
+    """Counts bigrams of all text files in the directory without loading them into memory
+
+    Files are read in the same order and with the same line processing as in `read_dir`. With several jobs each file
+    is counted in a worker process and the counters are merged in the order of files
+
+    :param directory: Path to directory with text files
+    :type directory: str
+    :param counted_elems: Set of elements taken into account in the objective function
+    :type counted_elems: list
+    :param pattern: File format to read
+    :type pattern: str
+    :param chunk_size: Approximate number of characters read at once
+    :type chunk_size: int
+    :param n_jobs: Number of worker processes (-1 means all processors)
+    :type n_jobs: int
+    :param use_mmap: Read files through a memory map instead of buffered reads
+    :type use_mmap: bool
+    :return: Bigram counter
+    """
+    path = pathlib.Path(directory)
+    assert path.exists(), f'Directory "{directory}" does not exist'
+
+    text_files = list(path.glob(pattern))
+    start_time = time.perf_counter()
+
+    counter = BigramCounter(counted_elems)
+    for file_counter in iter_files_bigrams(text_files, counted_elems, chunk_size, n_jobs=n_jobs, use_mmap=use_mmap):
+        counter.merge(file_counter)
+
+    print_throughput(len(text_files), counter.n_bytes, time.perf_counter() - start_time)
+
+    return counter
+
+
+def print_throughput(n_files: int, n_bytes: int, elapsed_time: float):
+    """Prints the amount of processed text and the processing speed
+
+    :param n_files: Number of processed files
+    :type n_files: int
+    :param n_bytes: Size of processed files in bytes
+    :type n_bytes: int
+    :param elapsed_time: Processing time in seconds
+    :type elapsed_time: float
+    """
+    print(f'Processed {n_files} files ({n_bytes / 1e6:.1f} MB) in {elapsed_time:.2f} s: '
+          f'{n_bytes / 1e6 / max(elapsed_time, 1e-9):.1f} MB/s')
@@ -0,0 +1,153 @@
+import json
+import os
+import pathlib
+from typing import Tuple
+
+from mlo_optimizer.keyboards.bigram_cache import BigramCache
+from mlo_optimizer.keyboards.bigram_counter import count_bigrams
+from mlo_optimizer.keyboards.ngrams import SparseNgrams, decode_ngrams
+
+import numpy as np
+
+
+class BigramMixture:
+    """Bigram counts of several corpora over a shared symbol index that are mixed with arbitrary weights
+
+    The counts of each corpus are stored as a row of the table over the union of observed bigram keys (see
+    `encode_ngrams`), so a mixture is a single product of the weight vector and the table of per-corpus probabilities,
+    and the texts are not read again for another ratio of corpora. The probability of a bigram in the mixture is the
+    weighted average of its probabilities in the corpora, so the mixture with one corpus gives the same probabilities
+    as `fit_bigrams` on it
+
+    :param counted_elems: Set of elements taken into account in the objective function
+    :type counted_elems: list
+    :param names: Names of corpora
+    :type names: list
+    :param keys: Sorted unique keys of the bigrams observed in any corpus
+    :type keys: class:`numpy.array`
+    :param counts: Integer array of shape (number of corpora, number of keys) with bigram counts
+    :type counts: class:`numpy.array`
+    :param totals: Total numbers of bigrams (including the ones of characters that are not counted) in the corpora
+    :type totals: class:`numpy.array`
+    """
+
+    def __init__(self, counted_elems: list, names: list, keys: np.array, counts: np.array, totals: np.array):
+        assert counts.shape == (len(names), len(keys)) and len(totals) == len(names), \
+            'Counts must have a row for each corpus and a column for each bigram'
+
+        self.counted_elems = list(counted_elems)
+        self.names = list(names)
+        self.keys = keys
+        self.counts = counts
+        self.totals = totals
+
+        self.ids = decode_ngrams(keys, 2, len(self.counted_elems) + 1)
+        self.probs = counts / np.maximum(totals, 1)[:, np.newaxis]
+
+    @classmethod
+    def from_counters(cls, counters: dict) -> 'BigramMixture':
+        """Collects the counts of corpora into a table
+
+        :param counters: Dictionary: name of corpus -> bigram counter of the corpus (all with the same counted
+            elements)
+        :type counters: dict
+        :return: Bigram mixture
+        """
+        assert counters, 'At least one corpus is required'
+        counted_elems = next(iter(counters.values())).counted_elems
+        assert all(counter.counted_elems == counted_elems for counter in counters.values()), \
+            'Corpora must be counted over the same counted elements'
+
+        keys = np.unique(np.concatenate([counter.keys for counter in counters.values()]))
+        counts = np.zeros((len(counters), len(keys)), dtype=np.int64)
+        for row, counter in zip(counts, counters.values()):
+            row[np.searchsorted(keys, counter.keys)] = counter.counts
+        totals = np.array([counter.total for counter in counters.values()], dtype=np.int64)
+
+        return cls(counted_elems, list(counters), keys, counts, totals)
+
+    @classmethod
+    def from_dirs(cls, lang_part_dirs: dict, counted_elems: list, n_jobs: int = 1, use_mmap: bool = False,
+                  cache_dir: str = None) -> 'BigramMixture':
+        """Counts bigrams of the text files of each corpus
+
+        :param lang_part_dirs: Dictionary: name of corpus -> folder with text files
+        :type lang_part_dirs: dict
+        :param counted_elems: Set of elements taken into account in the objective function
+        :type counted_elems: list
+        :param n_jobs: Number of worker processes (-1 means all processors)
+        :type n_jobs: int
+        :param use_mmap: Read files through a memory map instead of buffered reads
+        :type use_mmap: bool
+        :param cache_dir: Directory of the persistent cache of bigram counts
+        :type cache_dir: str
+        :return: Bigram mixture
+        """
+        counters = {}
+        for name, lang_part_dir in lang_part_dirs.items():
+            if cache_dir is not None:
+                counters[name] = BigramCache(cache_dir).count_bigrams(lang_part_dir, counted_elems, n_jobs=n_jobs,
+                                                                      use_mmap=use_mmap)
+            else:
+                counters[name] = count_bigrams(lang_part_dir, counted_elems, n_jobs=n_jobs, use_mmap=use_mmap)
+
+        return cls.from_counters(counters)
+
+    def get_weights_vec(self, weights: dict) -> np.array:
+        """Converts the weights of corpora to the normalized weight vector
+
+        :param weights: Dictionary: name of corpus -> non-negative weight (missing corpora have zero weight)
+        :type weights: dict
+        :return: Weights in the order of corpora with the sum equal to 1
+        """
+        unknown_names = set(weights) - set(self.names)
+        assert not unknown_names, f'Unknown corpora: {", ".join(map(str, sorted(unknown_names)))}'
+
+        weights_vec = np.array([weights.get(name, 0) for name in self.names], dtype=float)
+        assert (weights_vec >= 0).all() and weights_vec.sum() > 0, \
+            'Weights must be non-negative and at least one of them must be positive'
+        return weights_vec / weights_vec.sum()
+
+    def mix(self, weights: dict) -> SparseNgrams:
+        """Calculates the bigram probabilities of the mixture of corpora
+
+        :param weights: Dictionary: name of corpus -> non-negative weight (missing corpora have zero weight)
+        :type weights: dict
+        :return: Sparse bigram probabilities of the bigrams observed in the corpora with positive weights
+        """
+        probs = self.get_weights_vec(weights) @ self.probs
+        nonzero_ids = np.flatnonzero(probs)
+        return SparseNgrams(self.counted_elems, self.ids[nonzero_ids], probs[nonzero_ids])
+
+    def mix_bigram_probs(self, weights: dict) -> Tuple[list, np.array]:
+        """Calculates the bigram probabilities of the mixture of corpora in the format of `Optimizer`
+
+        :param weights: Dictionary: name of corpus -> non-negative weight (missing corpora have zero weight)
+        :type weights: dict
+        :return: List of bigrams of the form: ((first symbol, next symbol), probability) and bigram vector
+        """
+        return self.mix(weights).get_probs_with_vec()
+
+    def save(self, path: str):
+        """Writes the count table to a `.npz` file
+
+        :param path: Path to the file
+        :type path: str
+        """
+        path = pathlib.Path(path)
+        tmp_path = path.with_suffix('.tmp.npz')
+        np.savez_compressed(tmp_path, keys=self.keys, counts=self.counts, totals=self.totals,
+                            meta=np.array(json.dumps({'counted_elems': self.counted_elems, 'names': self.names})))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'BigramMixture':
+        """Reads the count table written by `save`
+
+        :param path: Path to the file
+        :type path: str
+        :return: Bigram mixture
+        """
+        with np.load(path) as table:
+            meta = json.loads(str(table['meta']))
+            return cls(meta['counted_elems'], meta['names'], table['keys'], table['counts'], table['totals'])
@@ -1,23 +1,28 @@
-from typing import Tuple
+from typing import TYPE_CHECKING, Tuple
 
 from mlo_optimizer.config import BATCH_SIZE
-
-import nltk
+from mlo_optimizer.keyboards.bigram_counter import BigramCounter, SYMBOL_ALIASES
 
 import numpy as np
 
-import pandas as pd
+if TYPE_CHECKING:
+    import pandas as pd
 
-from tqdm import tqdm
+# Names of counted elements for characters
+CHAR_ALIASES = {char: elem for elem, char in SYMBOL_ALIASES.items()}
 
 
-def tokenize_by_letters(texts: pd.Series) -> list:
+def tokenize_by_letters(texts: 'pd.Series') -> list:
     """Separates texts by character
 
     :param texts: Series with strings from text files
     :type texts: class:`pandas.Series`
     :return: List of all characters
     """
+    # Corpus processing dependencies (nltk, pandas and tqdm) are imported by the functions that use them, so importing
+    # the module does not load them
+    from tqdm import tqdm
+
     tokenized_text = []
 
     print('Tokenization...')
@@ -38,6 +43,9 @@ def get_bigram_probs(tokenized_text: list) -> list:
     :type tokenized_text: list
     :return: List of bigrams of the form: ((first symbol, next symbol), probability)
     """
+    import nltk
+    from tqdm import tqdm
+
     print('Getting bigrams...')
     bigrams = nltk.bigrams(tokenized_text)
     print('Calculation of bigram frequencies...')
@@ -62,22 +70,16 @@ def filter_bigram_probs(bigram_probs: list, counted_elems: list) -> list:
     :type counted_elems: list
     :return: List of filtered bigrams
     """
+    from tqdm import tqdm
+
+    counted_set = set(counted_elems)
     filtered_bigram_probs = []
 
     print('Bigram filtering...')
-    for bigram in tqdm(bigram_probs):
-        new_bigram = [bigram[0][0], bigram[0][1]]
-
-        if bigram[0][0] == ' ':
-            new_bigram[0] = 'space'
-        if bigram[0][1] == ' ':
-            new_bigram[1] = 'space'
-        if bigram[0][0] == '\n':
-            new_bigram[0] = 'enter'
-        if bigram[0][1] == '\n':
-            new_bigram[1] = 'enter'
-        if new_bigram[0] in counted_elems and new_bigram[1] in counted_elems:
-            filtered_bigram_probs.append(((new_bigram[0], new_bigram[1]), bigram[1]))
+    for (first, second), prob in tqdm(bigram_probs):
+        first, second = CHAR_ALIASES.get(first, first), CHAR_ALIASES.get(second, second)
+        if first in counted_set and second in counted_set:
+            filtered_bigram_probs.append(((first, second), prob))
 
     return filtered_bigram_probs
 
@@ -93,18 +95,25 @@ def get_bigram_probs_vec(bigram_probs: list) -> np.array:
         return np.array([elem[1] for elem in bigram_probs])
 
 
-def get_bigram_probs_with_vec(texts: pd.Series, counted_elems: list) -> Tuple[list, np.array]:
+def get_bigram_probs_with_vec(texts: 'pd.Series', counted_elems: list) -> Tuple[list, np.array]:
     """Launches a full pipeline with the calculation of lists of probabilities of bigrams
 
-    :param texts: Separates texts by character
+    Bigrams are counted in batches of texts by `BigramCounter`, so characters are never stored in a list. The
+    probabilities are the same as the ones obtained by `tokenize_by_letters`, `get_bigram_probs` and
+    `filter_bigram_probs`
+
+    :param texts: Series with strings from text files
     :type texts: class:`pandas.Series`
     :param counted_elems: Set of elements taken into account in the objective function
     :type counted_elems: list
     :return: List of filtered bigrams and bigram vector
     """
-    tokenized_text = tokenize_by_letters(texts)
-    bigram_probs = get_bigram_probs(tokenized_text)
-    filtered_bigram_probs = filter_bigram_probs(bigram_probs, counted_elems)
-    filtered_bigram_probs_vec = get_bigram_probs_vec(filtered_bigram_probs)
+    from tqdm import tqdm
+
+    counter = BigramCounter(counted_elems)
+
+    print('Counting bigrams...')
+    for i in tqdm(range(0, len(texts), BATCH_SIZE)):
+        counter.update(''.join(str(sentence).lower() for sentence in texts[i:i + BATCH_SIZE]))
 
-    return filtered_bigram_probs, filtered_bigram_probs_vec
+    return counter.get_bigram_probs_with_vec()
@@ -48,7 +48,7 @@ def key_index(key: str, keyboard_matrix: list) -> np.array:
 
     for i in range(len(keyboard_matrix)):
         for i_1 in range(len(keyboard_matrix[i])):
-            if isinstance(keyboard_matrix[i][i_1], list):
+            if not isinstance(keyboard_matrix[i][i_1], list):
                 if keyboard_matrix[i][i_1] == key:
                     indexes.append((i, i_1))
             else:
@@ -100,3 +100,50 @@ def get_dists_vec(bigram_probs: list, keyboard_matrix: list, dist_func: str = 's
             exit(1)
 
     return np.array(result_vec)
+
+
+def get_slot_coords(keyboard_matrix: list) -> np.array:
+    """Enumerates the slots (cells) of the keyboard matrix in row-major order
+
+    :param keyboard_matrix: Matrix with keys
+    :type keyboard_matrix: list
+    :return: Array of shape (number of slots, 2) with the coordinates of each slot
+    """
+    coords = [(i, i_1) for i in range(len(keyboard_matrix)) for i_1 in range(len(keyboard_matrix[i]))]
+    return np.array(coords, dtype=int).reshape(-1, 2)
+
+
+def get_slot_dists_matrix(keyboard_matrix: list, dist_func: str = 'square', a_s: float = A_S_DEFAULT,
+                          a_h: float = A_H_DEFAULT, b_h: float = B_H_DEFAULT) -> np.array:
+    """Calculates the distances between every pair of slots of the keyboard matrix
+
+    Distances depend only on the slot coordinates, so the matrix is computed once for a keyboard geometry and reused
+    for every individual
+
+    :param keyboard_matrix: Matrix with keys
+    :type keyboard_matrix: list
+    :param dist_func: Function to calculate the distance between two keys ('square' or 'hex')
+    :type dist_func: str
+    :param a_s: Half side of square button (when fitness_func='square')
+    :type a_s: float
+    :param a_h: Distance from the middle of a hexagonal key to the middle of its side (when fitness_func='hex')
+    :type a_h: float
+    :param b_h: Distance from the middle of the hexagonal key to the middle of the side of the bottom key (when
+    fitness_func='hex')
+    :type b_h: float
+    :return: Matrix of shape (number of slots, number of slots) with distances between slots
+    """
+    assert dist_func in ('square', 'hex'), f'Unknown distance function "{dist_func}"'
+
+    coords = get_slot_coords(keyboard_matrix)
+    # Differences of the coordinates of every pair of slots
+    row_diffs = coords[:, np.newaxis, 0] - coords[np.newaxis, :, 0]
+    col_diffs = coords[:, np.newaxis, 1] - coords[np.newaxis, :, 1]
+
+    if dist_func == 'square':
+        return a_s * np.sqrt(row_diffs ** 2 + col_diffs ** 2)
+
+    # Same formula as `hex_dist`: odd rows are shifted by half a key
+    parities = coords[:, 0] % 2
+    h_dists = 2 * col_diffs - (parities[:, np.newaxis] - parities[np.newaxis, :])
+    return np.sqrt((a_h * h_dists) ** 2 + (b_h * row_diffs) ** 2)
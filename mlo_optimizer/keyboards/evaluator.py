@@ -0,0 +1,359 @@
+from copy import copy
+
+from mlo_optimizer.components.genome import LayoutTemplate
+from mlo_optimizer.config import A_H_DEFAULT, A_S_DEFAULT, B_H_DEFAULT
+from mlo_optimizer.keyboards.distances import get_slot_dists_matrix
+from mlo_optimizer.keyboards.ngrams import SparseNgrams
+
+import numpy as np
+
+
+class LayoutEvaluator:
+    """Compiled version of the weighted average fitness function
+
+    Bigrams are converted to pairs of integer symbol indices and the distances between all slots of the keyboard are
+    computed once, so the evaluation of an individual is reduced to mapping each symbol to its slot and a
+    gather-and-dot over the precomputed distance matrix. Scores are identical to the ones of
+    `weighted_average_fitness_func`
+
+    :param keyboard_matrix: Any matrix with the geometry of the evaluated individuals (e.g. the initial matrix)
+    :type keyboard_matrix: list
+    :param bigram_probs: List of bigrams of the form: ((first symbol, next symbol), probability) or sparse bigram
+        probabilities (see `NgramCounter.get_ngrams`)
+    :type bigram_probs: list or class:`SparseNgrams`
+    :param bigram_probs_vec: Bigram probability vector (ignored for sparse bigram probabilities)
+    :type bigram_probs_vec: class:`numpy.array`
+    :param dist_func: Function to calculate the distance between two keys ('square' or 'hex')
+    :type dist_func: str
+    :param a_s: Half side of square button (when fitness_func='square')
+    :type a_s: float
+    :param a_h: Distance from the middle of a hexagonal key to the middle of its side (when fitness_func='hex')
+    :type a_h: float
+    :param b_h: Distance from the middle of the hexagonal key to the middle of the side of the bottom key (when
+    fitness_func='hex')
+    :type b_h: float
+    :param template: Layout template of individuals with compact genomes (required to evaluate them)
+    :type template: class:`LayoutTemplate`
+    """
+
+    def __init__(self, keyboard_matrix: list, bigram_probs: list, bigram_probs_vec: np.array,
+                 dist_func: str = 'square', a_s: float = A_S_DEFAULT, a_h: float = A_H_DEFAULT,
+                 b_h: float = B_H_DEFAULT, template: LayoutTemplate = None):
+        self.dists_matrix = get_slot_dists_matrix(keyboard_matrix, dist_func=dist_func, a_s=a_s, a_h=a_h, b_h=b_h)
+        self.n_slots = len(self.dists_matrix)
+
+        if isinstance(bigram_probs, SparseNgrams):
+            assert bigram_probs.order == 2, 'The objective function is calculated over bigrams'
+            # Only the symbols of observed bigrams must be placed on the keyboard
+            symbol_ids, bigram_ids = np.unique(bigram_probs.ids, return_inverse=True)
+            self.symbols = [bigram_probs.symbols[symbol_id] for symbol_id in symbol_ids]
+            self.symbol_ids = {symbol: symbol_id for symbol_id, symbol in enumerate(self.symbols)}
+            first_ids, second_ids = bigram_ids.reshape(-1, 2).T
+            bigram_probs_vec = bigram_probs.probs
+        else:
+            self.symbols = []
+            self.symbol_ids = {}
+            first_ids, second_ids = [], []
+            for bigram in bigram_probs:
+                for symbol in bigram[0]:
+                    if symbol not in self.symbol_ids:
+                        self.symbol_ids[symbol] = len(self.symbols)
+                        self.symbols.append(symbol)
+                first_ids.append(self.symbol_ids[bigram[0][0]])
+                second_ids.append(self.symbol_ids[bigram[0][1]])
+
+        self.first_ids = np.array(first_ids, dtype=int)
+        self.second_ids = np.array(second_ids, dtype=int)
+        self.bigram_probs_vec = np.asarray(bigram_probs_vec)
+        self._index_bigrams()
+
+        # Maximum difference between the score and the score over all bigrams (see `truncate`)
+        self.error_bound = 0.0
+
+        self.template = template
+        if template is not None:
+            self._compile_template()
+
+    def encode(self, individual: list) -> list:
+        """Maps each symbol to the slots of the individual where it is placed
+
+        :param individual: Individual
+        :type individual: list
+        :return: List with a list of slot indexes for each symbol
+        """
+        symbol_slots = [[] for _ in self.symbols]
+
+        slot = 0
+        for row in individual:
+            for cell in row:
+                keys = cell if isinstance(cell, list) else (cell,)
+                for key in keys:
+                    symbol_id = self.symbol_ids.get(key)
+                    if symbol_id is not None:
+                        symbol_slots[symbol_id].append(slot)
+                slot += 1
+
+        return symbol_slots
+
+    def get_dists_vec(self, individual: list) -> np.array:
+        """Calculates the distance vector for each pair of keys from the bigram vector
+
+        :param individual: Individual
+        :type individual: list
+        :return: Distance vector between each bigram from bigram vector
+        """
+        symbol_slots = self.encode(individual)
+        self._check_symbols(symbol_slots)
+
+        if all(len(slots) == 1 for slots in symbol_slots):
+            slots = np.array([slots[0] for slots in symbol_slots], dtype=int)
+            return self.dists_matrix[slots[self.first_ids], slots[self.second_ids]]
+
+        # Keys placed in several slots: the distance of a bigram is the minimum over all pairs of their slots
+        symbol_dists = np.array([
+            [self.dists_matrix[np.ix_(slots_1, slots_2)].min() for slots_2 in symbol_slots]
+            for slots_1 in symbol_slots
+        ])
+        return symbol_dists[self.first_ids, self.second_ids]
+
+    def evaluate(self, individual) -> tuple:
+        """Calculates the fitness score for the current individual
+
+        :param individual: Individual matrix or individual with a compact genome
+        :return: Fitness assessment
+        """
+        if hasattr(individual, 'genome'):
+            return self.evaluate_genomes([individual])[0]
+        return (self.bigram_probs_vec @ self.get_dists_vec(individual),)
+
+    __call__ = evaluate
+
+    def encode_genomes(self, genomes: np.array) -> np.array:
+        """Maps each symbol to its slot for every genome
+
+        :param genomes: Integer array of shape (number of individuals, number of genes) with genomes
+        :type genomes: class:`numpy.array`
+        :return: Integer array of shape (number of individuals, number of symbols) with the slot of each symbol (-1
+            for symbols that are not placed)
+        """
+        slots = np.tile(self.fixed_slots, (len(genomes), 1))
+
+        symbol_ids = self.gene_symbol_ids[genomes[:, :self.template.n_placed]]
+        rows, genes = np.nonzero(symbol_ids >= 0)
+        slots[rows, symbol_ids[rows, genes]] = self.template.free_slots[genes]
+
+        return slots
+
+    def encode_population(self, population: list) -> tuple:
+        """Maps each symbol to its slot for every individual matrix of the population
+
+        :param population: List of individual matrices
+        :type population: list
+        :return: Integer array of shape (population size, number of symbols) with the slot of each symbol and boolean
+            mask of the individuals in which every symbol is placed in exactly one slot (the other rows are undefined)
+        """
+        n_symbols = len(self.symbols)
+        cell_ids = np.full((len(population), self.n_slots), -1, dtype=int)
+        single_slot_mask = np.ones(len(population), dtype=bool)
+
+        for i, individual in enumerate(population):
+            try:
+                cell_ids[i] = [self.symbol_ids.get(cell, -1) for row in individual for cell in row]
+            except TypeError:
+                # Cells with lists of keys are not hashable
+                single_slot_mask[i] = False
+
+        rows, cur_slots = np.nonzero(cell_ids >= 0)
+        symbol_ids = cell_ids[rows, cur_slots]
+
+        counts = np.bincount(rows * n_symbols + symbol_ids, minlength=len(population) * n_symbols)
+        single_slot_mask &= (counts.reshape(len(population), n_symbols) == 1).all(axis=1)
+
+        slots = np.zeros((len(population), n_symbols), dtype=int)
+        slots[rows, symbol_ids] = cur_slots
+
+        return slots, single_slot_mask
+
+    def evaluate_slots(self, slots: np.array) -> np.array:
+        """Calculates the fitness scores of encoded individuals with a single gather over the distance matrix
+
+        Each score is summed by the same row loop whatever the number of individuals (a BLAS product may round
+        differently for other batch sizes), so chunks evaluated by parallel workers get the same scores as the whole
+        population
+
+        :param slots: Integer array of shape (number of individuals, number of symbols) with the slot of each symbol
+        :type slots: class:`numpy.array`
+        :return: Vector of fitness scores
+        """
+        flat_ids = np.take(slots, self.first_ids, axis=1) * self.n_slots + np.take(slots, self.second_ids, axis=1)
+        return np.einsum('ij,j->i', np.take(self.dists_matrix, flat_ids), self.bigram_probs_vec)
+
+    def evaluate_deltas(self, slots: np.array, parent_slots: np.array, parent_scores: np.array) -> np.array:
+        """Calculates the fitness scores of encoded individuals from the scores of their parents
+
+        Only the bigrams that contain the symbols that changed their slots are taken into account, so the work is
+        proportional to the number of moved symbols multiplied by the size of the alphabet instead of the number of
+        bigrams. Scores match the full evaluation up to floating point rounding
+
+        :param slots: Integer array of shape (number of individuals, number of symbols) with the slot of each symbol
+        :type slots: class:`numpy.array`
+        :param parent_slots: Slots of symbols in the parents of the same shape
+        :type parent_slots: class:`numpy.array`
+        :param parent_scores: Vector of fitness scores of the parents
+        :type parent_scores: class:`numpy.array`
+        :return: Vector of fitness scores
+        """
+        moved_mask = slots != parent_slots
+        rows, moved_symbols = np.nonzero(moved_mask)
+
+        lengths = self.symbol_bigram_counts[moved_symbols]
+        starts = np.repeat(self.symbol_bigram_ptr[moved_symbols] - np.cumsum(lengths) + lengths, lengths)
+        bigram_ids = self.symbol_bigram_ids[starts + np.arange(lengths.sum())]
+        rows, moved_symbols = np.repeat(rows, lengths), np.repeat(moved_symbols, lengths)
+
+        # A bigram of two moved symbols is taken only from the list of its first symbol
+        first_ids, second_ids = self.first_ids[bigram_ids], self.second_ids[bigram_ids]
+        other_ids = np.where(first_ids == moved_symbols, second_ids, first_ids)
+        unique_mask = (first_ids == moved_symbols) | ~moved_mask[rows, other_ids]
+        rows, bigram_ids = rows[unique_mask], bigram_ids[unique_mask]
+        first_ids, second_ids = first_ids[unique_mask], second_ids[unique_mask]
+
+        new_dists = np.take(self.dists_matrix, slots[rows, first_ids] * self.n_slots + slots[rows, second_ids])
+        old_dists = np.take(self.dists_matrix, parent_slots[rows, first_ids] * self.n_slots +
+                            parent_slots[rows, second_ids])
+
+        deltas = np.bincount(rows, weights=self.bigram_probs_vec[bigram_ids] * (new_dists - old_dists),
+                             minlength=len(slots))
+        return parent_scores + deltas
+
+    def evaluate_population(self, population: list) -> list:
+        """Calculates the fitness scores of the whole population at once
+
+        Scores may differ from the ones of `evaluate` by floating point rounding. Individual matrices with keys placed
+        in several slots (or with missing keys) are evaluated one by one, individuals with compact genomes are
+        evaluated by `evaluate_genomes`
+
+        :param population: List of individual matrices or individuals with compact genomes
+        :type population: list
+        :return: List of fitness assessments
+        """
+        if population and hasattr(population[0], 'genome'):
+            return self.evaluate_genomes(population)
+
+        slots, single_slot_mask = self.encode_population(population)
+        scores = iter(self.evaluate_slots(slots[single_slot_mask]))
+
+        return [(next(scores),) if is_single_slot else self.evaluate(individual)
+                for individual, is_single_slot in zip(population, single_slot_mask)]
+
+    def evaluate_genomes(self, population: list) -> list:
+        """Calculates the fitness scores of individuals with compact genomes
+
+        Offspring whose last evaluated ancestor is known (see `get_origin`) and differ from it by a few moved symbols
+        are evaluated incrementally by `evaluate_deltas`, the others by a single gather over the distance matrix
+
+        :param population: List of individuals with compact genomes
+        :type population: list
+        :return: List of fitness assessments
+        """
+        assert self.template is not None, 'The layout template is required to evaluate genomes'
+
+        if not self.genome_encodable:
+            return [self.evaluate(self.template.to_matrix(individual.genome)) for individual in population]
+
+        slots = self.encode_genomes(np.stack([individual.genome for individual in population]))
+        valid_mask = (slots >= 0).all(axis=1)
+        scores = np.zeros(len(population))
+
+        delta_ids = np.array([i for i, individual in enumerate(population)
+                              if individual.origin is not None and valid_mask[i]], dtype=int)
+        if len(delta_ids):
+            parent_slots = self.encode_genomes(np.stack([population[i].origin[1] for i in delta_ids]))
+            # The incremental evaluation is used only if it touches fewer bigrams than the full one
+            moved_counts = (slots[delta_ids] != parent_slots) * self.symbol_bigram_counts
+            delta_mask = moved_counts.sum(axis=1) < len(self.first_ids)
+
+            delta_ids, parent_slots = delta_ids[delta_mask], parent_slots[delta_mask]
+            parent_scores = np.array([population[i].origin[0][0] for i in delta_ids], dtype=float)
+            scores[delta_ids] = self.evaluate_deltas(slots[delta_ids], parent_slots, parent_scores)
+
+        full_mask = valid_mask.copy()
+        full_mask[delta_ids] = False
+        scores[full_mask] = self.evaluate_slots(slots[full_mask])
+
+        # Genomes with missing keys are evaluated as matrices to report the error
+        return [(score,) if is_valid else self.evaluate(self.template.to_matrix(individual.genome))
+                for individual, is_valid, score in zip(population, valid_mask, scores)]
+
+    def truncate(self, mass: float) -> 'LayoutEvaluator':
+        """Makes the approximate evaluator over the most probable bigrams
+
+        The long tail of rare bigrams is dropped: the approximate evaluator keeps the smallest set of the most
+        probable bigrams that covers the share of the probability mass. Distances are non-negative, so the
+        approximate score S' of an individual and its exact score S satisfy S' <= S <= S' + error_bound, where
+        error_bound is the dropped probability mass multiplied by the maximum distance between slots
+
+        :param mass: Share of the probability mass covered by the kept bigrams (from 0 to 1)
+        :type mass: float
+        :return: Evaluator with the `error_bound` attribute
+        """
+        probs = self.bigram_probs_vec
+        if not len(probs):
+            return self
+
+        order = np.argsort(-probs, kind='stable')
+        cum_probs = np.cumsum(probs[order])
+        n_kept = min(int(np.searchsorted(cum_probs, mass * cum_probs[-1])) + 1, len(order))
+        # Bigrams keep their original order
+        kept_ids = np.sort(order[:n_kept])
+
+        evaluator = copy(self)
+        evaluator.first_ids, evaluator.second_ids = self.first_ids[kept_ids], self.second_ids[kept_ids]
+        evaluator.bigram_probs_vec = probs[kept_ids]
+        evaluator._index_bigrams()
+        evaluator.error_bound = self.error_bound + \
+            max(float(probs.sum() - evaluator.bigram_probs_vec.sum()), 0.0) * float(self.dists_matrix.max())
+
+        return evaluator
+
+    def _index_bigrams(self):
+        # Indexes of bigrams that contain each symbol in CSR format: bigrams of the symbol s are
+        # symbol_bigram_ids[symbol_bigram_ptr[s]:symbol_bigram_ptr[s + 1]]
+        bigram_ids = np.arange(len(self.first_ids))
+        not_doubled = self.first_ids != self.second_ids
+        incident_symbols = np.concatenate((self.first_ids, self.second_ids[not_doubled]))
+        incident_bigrams = np.concatenate((bigram_ids, bigram_ids[not_doubled]))
+        order = np.argsort(incident_symbols, kind='stable')
+        self.symbol_bigram_ids = incident_bigrams[order]
+        self.symbol_bigram_counts = np.bincount(incident_symbols, minlength=len(self.symbols))
+        self.symbol_bigram_ptr = np.concatenate(([0], np.cumsum(self.symbol_bigram_counts)))
+
+    def _compile_template(self):
+        # Slots of the symbols fixed in the initial matrix and symbols of the genes. Genomes are encoded directly
+        # only if no symbol can be placed in several slots
+        self.fixed_slots = np.full(len(self.symbols), -1, dtype=int)
+        self.genome_encodable = True
+
+        for slot, cell in enumerate(self.template.cells):
+            keys = cell if isinstance(cell, list) else (cell,)
+            for key in keys:
+                symbol_id = self.symbol_ids.get(key)
+                if symbol_id is not None:
+                    self.genome_encodable &= bool(self.fixed_slots[symbol_id] == -1)
+                    self.fixed_slots[symbol_id] = slot
+
+        self.gene_symbol_ids = np.array([self.symbol_ids.get(elem, -1) for elem in self.template.permutable_elems],
+                                        dtype=int)
+        placed_ids = self.gene_symbol_ids[self.gene_symbol_ids >= 0]
+        self.genome_encodable &= len(np.unique(placed_ids)) == len(placed_ids)
+        self.genome_encodable &= bool((self.fixed_slots[placed_ids] == -1).all())
+
+    def _check_symbols(self, symbol_slots: list):
+        if all(symbol_slots):
+            return
+
+        for first_id, second_id in zip(self.first_ids, self.second_ids):
+            if not symbol_slots[first_id] or not symbol_slots[second_id]:
+                print(f'ValueError: At least one element of the counted elements: \'{self.symbols[first_id]}\' or '
+                      f'\'{self.symbols[second_id]}\' does not match the element in the keyboard')
+                exit(1)
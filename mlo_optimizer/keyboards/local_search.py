@@ -0,0 +1,146 @@
+from mlo_optimizer.keyboards.evaluator import LayoutEvaluator
+
+import numpy as np
+
+
+class SwapLocalSearch:
+    """Steepest descent over swaps of placed permutable elements
+
+    The fitness is a quadratic assignment cost: sum of F[s, t] * D[s, t] over pairs of slots, where F[s, t] is the
+    probability of the bigram of the keys placed in the slots s and t, and D is the precomputed distance matrix. The
+    change of the cost for swapping the contents of every pair of free slots is obtained at once from the products
+    F @ D.T and F.T @ D, so each step scores the whole swap neighborhood of all refined individuals in a few
+    vectorized operations and applies the best swap
+
+    :param evaluator: Compiled fitness function with a layout template
+    :type evaluator: class:`LayoutEvaluator`
+    :param max_steps: Maximum number of swaps applied to an individual
+    :type max_steps: int
+    :param minimization: Minimization and Maximization Flag of the Objective Function
+    :type minimization: bool
+    """
+
+    def __init__(self, evaluator: LayoutEvaluator, max_steps: int, minimization: bool = True):
+        assert evaluator.template is not None and evaluator.genome_encodable, \
+            'Local search requires the layout template where each key is placed in one slot'
+
+        self.evaluator = evaluator
+        self.max_steps = max_steps
+        self.sign = 1.0 if minimization else -1.0
+
+        free_slots = evaluator.template.free_slots
+        self.n_placed = len(free_slots)
+        self.dists = evaluator.dists_matrix
+        self.free_dists = self.dists[np.ix_(free_slots, free_slots)]
+        self.free_dists_diag = np.diag(self.free_dists)
+
+    def get_swap_deltas(self, slots: np.array) -> np.array:
+        """Calculates the change of the fitness for swapping the contents of each pair of free slots
+
+        :param slots: Integer array of shape (number of individuals, number of symbols) with the slot of each symbol
+        :type slots: class:`numpy.array`
+        :return: Array of shape (number of individuals, number of placed genes, number of placed genes) with the
+            changes of the fitness
+        """
+        evaluator = self.evaluator
+        n_individuals, n_slots = len(slots), evaluator.n_slots
+        free_slots = evaluator.template.free_slots
+
+        # Probabilities of bigrams between the slots
+        flat_ids = np.take(slots, evaluator.first_ids, axis=1) * n_slots + np.take(slots, evaluator.second_ids, axis=1)
+        flat_ids += np.arange(n_individuals)[:, None] * n_slots * n_slots
+        flows = np.bincount(flat_ids.ravel(), weights=np.tile(evaluator.bigram_probs_vec, n_individuals),
+                            minlength=n_individuals * n_slots * n_slots).reshape(n_individuals, n_slots, n_slots)
+
+        # The change of the cost sum(F[s, t] * (D[t(s), t(t)] - D[s, t])) for the transposition t of the slots u and v
+        rows_flows = flows[:, free_slots, :]
+        cols_flows = flows[:, :, free_slots].transpose(0, 2, 1)
+        out_products = rows_flows @ self.dists[free_slots].T
+        in_products = cols_flows @ self.dists[:, free_slots]
+
+        free_flows = rows_flows[:, :, free_slots]
+        free_flows_t = free_flows.transpose(0, 2, 1)
+        flows_diag = np.diagonal(free_flows, axis1=1, axis2=2)
+        dists, dists_t, dists_diag = self.free_dists, self.free_dists.T, self.free_dists_diag
+
+        def get_cross_terms(products):
+            diag = np.diagonal(products, axis1=1, axis2=2)
+            return products + products.transpose(0, 2, 1) - diag[:, :, None] - diag[:, None, :]
+
+        flows_u, flows_v = flows_diag[:, :, None], flows_diag[:, None, :]
+        dists_u, dists_v = dists_diag[:, None], dists_diag[None, :]
+
+        # Terms of the pairs of slots u and v themselves are excluded from the products and added separately
+        out_corrections = (flows_u - free_flows_t) * (dists_t - dists_u) + (free_flows - flows_v) * (dists_v - dists)
+        in_corrections = (flows_u - free_flows) * (dists - dists_u) + (free_flows_t - flows_v) * (dists_v - dists_t)
+        pair_terms = (flows_u - flows_v) * (dists_v - dists_u) + (free_flows - free_flows_t) * (dists_t - dists)
+
+        return (get_cross_terms(out_products) - out_corrections + get_cross_terms(in_products) - in_corrections +
+                pair_terms)
+
+    def refine_genomes(self, genomes: np.array) -> np.array:
+        """Applies the best swap to each genome while it improves the fitness
+
+        :param genomes: Integer array of shape (number of individuals, number of genes) with genomes
+        :type genomes: class:`numpy.array`
+        :return: Refined genomes
+        """
+        genomes = genomes.copy()
+        active_ids = np.arange(len(genomes))
+
+        for _ in range(self.max_steps):
+            deltas = self.get_swap_deltas(self.evaluator.encode_genomes(genomes[active_ids])) * self.sign
+            best_moves = deltas.reshape(len(active_ids), -1).argmin(axis=1)
+            best_deltas = deltas.reshape(len(active_ids), -1)[np.arange(len(active_ids)), best_moves]
+
+            # Moves that do not improve the fitness beyond rounding errors stop the descent
+            improving_mask = best_deltas < -1e-12
+            active_ids, best_moves = active_ids[improving_mask], best_moves[improving_mask]
+            if not len(active_ids):
+                break
+
+            genes_1, genes_2 = np.divmod(best_moves, self.n_placed)
+            genomes[active_ids, genes_1], genomes[active_ids, genes_2] = \
+                genomes[active_ids, genes_2], genomes[active_ids, genes_1]
+
+        return genomes
+
+    def refine(self, individuals: list) -> list:
+        """Refines evaluated individuals
+
+        :param individuals: Evaluated individuals with compact genomes
+        :type individuals: list
+        :return: List of individuals, improved individuals are replaced by new ones with valid fitness
+        """
+        if not individuals:
+            return []
+
+        genomes = np.stack([individual.genome for individual in individuals])
+        refined_genomes = self.refine_genomes(genomes)
+        changed_ids = np.flatnonzero((refined_genomes != genomes).any(axis=1))
+        scores = self.evaluator.evaluate_slots(self.evaluator.encode_genomes(refined_genomes[changed_ids]))
+
+        refined = list(individuals)
+        for i, score in zip(changed_ids, scores):
+            individual = type(individuals[i])(refined_genomes[i])
+            individual.fitness.values = (score,)
+            refined[i] = individual
+
+        return refined
+
+    def refine_best(self, population: list, top_k: int) -> list:
+        """Refines the best individuals of the evaluated population
+
+        :param population: Evaluated population
+        :type population: list
+        :param top_k: Number of refined individuals
+        :type top_k: int
+        :return: Population where the best individuals are replaced by the refined ones
+        """
+        best_ids = sorted(range(len(population)), key=lambda i: population[i].fitness, reverse=True)[:top_k]
+
+        population = list(population)
+        for i, individual in zip(best_ids, self.refine([population[i] for i in best_ids])):
+            population[i] = individual
+
+        return population
@@ -0,0 +1,116 @@
+from typing import Tuple
+
+import numpy as np
+
+
+def encode_ngrams(ids: np.array, order: int, base: int) -> np.array:
+    """Encodes all n-grams of the sequence of symbol indexes as integer keys
+
+    The key of the n-gram (s_1, ..., s_n) is the number with digits s_1, ..., s_n in the base, so the order of keys
+    is the lexicographic order of n-grams
+
+    :param ids: Sequence of symbol indexes
+    :type ids: class:`numpy.array`
+    :param order: Length of n-grams
+    :type order: int
+    :param base: Number of distinct symbol indexes
+    :type base: int
+    :return: Vector of keys of the len(ids) - order + 1 n-grams
+    """
+    n_ngrams = max(len(ids) - order + 1, 0)
+    keys = ids[:n_ngrams].astype(np.int64)
+    for i in range(1, order):
+        keys *= base
+        keys += ids[i:i + n_ngrams]
+    return keys
+
+
+def decode_ngrams(keys: np.array, order: int, base: int) -> np.array:
+    """Converts n-gram keys back to symbol indexes
+
+    :param keys: Vector of keys built by `encode_ngrams`
+    :type keys: class:`numpy.array`
+    :param order: Length of n-grams
+    :type order: int
+    :param base: Number of distinct symbol indexes
+    :type base: int
+    :return: Integer array of shape (number of n-grams, order) with symbol indexes
+    """
+    ids = np.empty((len(keys), order), dtype=np.int64)
+    for i in range(order - 1, -1, -1):
+        keys, ids[:, i] = np.divmod(keys, base)
+    return ids
+
+
+def add_sparse_counts(keys: np.array, counts: np.array, other_keys: np.array, other_counts: np.array) -> tuple:
+    """Adds two sparse vectors of counts given by sorted unique keys
+
+    :param keys: Sorted unique keys of the first vector
+    :type keys: class:`numpy.array`
+    :param counts: Counts of the first vector
+    :type counts: class:`numpy.array`
+    :param other_keys: Keys of the second vector (not necessarily sorted or unique)
+    :type other_keys: class:`numpy.array`
+    :param other_counts: Counts of the second vector
+    :type other_counts: class:`numpy.array`
+    :return: Sorted unique keys and counts of the sum
+    """
+    all_keys, inverse = np.unique(np.concatenate((keys, other_keys)), return_inverse=True)
+    all_counts = np.bincount(inverse, weights=np.concatenate((counts, other_counts)), minlength=len(all_keys))
+    return all_keys, all_counts.astype(np.int64)
+
+
+class SparseNgrams:
+    """Probabilities of n-grams over integer symbol indexes stored in the sparse format
+
+    Only observed n-grams are stored: `ids` holds the symbol indexes of each n-gram (COO format) sorted
+    lexicographically, so the n-grams that start with the symbol s are the rows indptr[s]:indptr[s + 1] (CSR format by
+    the first symbol). The memory grows with the number of observed n-grams, not with the size of the alphabet raised
+    to the order
+
+    :param symbols: Symbols indexed by the n-grams
+    :type symbols: list
+    :param ids: Integer array of shape (number of n-grams, order) with symbol indexes sorted lexicographically
+    :type ids: class:`numpy.array`
+    :param probs: Probabilities of the n-grams
+    :type probs: class:`numpy.array`
+    """
+
+    def __init__(self, symbols: list, ids: np.array, probs: np.array):
+        self.symbols = symbols
+        self.ids = ids
+        self.probs = probs
+        self.indptr = np.searchsorted(ids[:, 0], np.arange(len(symbols) + 1)) if len(ids) else \
+            np.zeros(len(symbols) + 1, dtype=np.int64)
+
+    @property
+    def order(self) -> int:
+        return self.ids.shape[1]
+
+    def __len__(self) -> int:
+        return len(self.probs)
+
+    def get_row(self, symbol_id: int) -> Tuple[np.array, np.array]:
+        """Gets the n-grams that start with the symbol
+
+        :param symbol_id: Index of the first symbol
+        :type symbol_id: int
+        :return: Symbol indexes and probabilities of the n-grams
+        """
+        start, end = self.indptr[symbol_id], self.indptr[symbol_id + 1]
+        return self.ids[start:end], self.probs[start:end]
+
+    def get_probs(self) -> list:
+        """Converts the n-grams to the list format
+
+        :return: List of n-grams of the form: ((first symbol, ..., last symbol), probability)
+        """
+        return [(tuple(self.symbols[symbol_id] for symbol_id in ngram), prob)
+                for ngram, prob in zip(self.ids.tolist(), self.probs.tolist())]
+
+    def get_probs_with_vec(self) -> Tuple[list, np.array]:
+        """Converts the n-grams to the list format used by the objective functions
+
+        :return: List of n-grams of the form: ((first symbol, ..., last symbol), probability) and probability vector
+        """
+        return self.get_probs(), self.probs
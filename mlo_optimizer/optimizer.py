@@ -1,20 +1,36 @@
 import pathlib
-
-from deap import base, creator, tools
+import random
+from functools import partial
 
 from mlo_optimizer.components.algelitism import ea_simple_elitism
-from mlo_optimizer.components.genetic_alg import mate_matrix, mutate_matrix, random_matrix
-from mlo_optimizer.config import A_H_DEFAULT, A_S_DEFAULT, B_H_DEFAULT, FITNESS_FUNC_DEFAULT, \
-    HALL_OF_FAME_SIZE_DEFAULT, MAX_GENERATION_DEFAULT, MINIMIZATION_DEFAULT, POPULATION_SIZE_DEFAULT, \
-    P_CROSSOVER_DEFAULT, P_MUTATION_DEFAULT, TOURN_SIZE_DEFAULT
-from mlo_optimizer.data.read import read_dir
+from mlo_optimizer.components.approximation import RescoredHallOfFame, rescore_halloffame
+from mlo_optimizer.components.archive import GenomeArchive
+from mlo_optimizer.components.checkpoint import Checkpointer, read_checkpoint, restore_checkpoint_state
+from mlo_optimizer.components.genetic_alg import make_statistics, make_toolbox
+from mlo_optimizer.components.genome import LayoutTemplate, MatrixFitness
+from mlo_optimizer.components.individual import get_individual_class, is_multi_objective
+from mlo_optimizer.components.instrumentation import JsonLinesSink, Profiler
+from mlo_optimizer.components.islands import IMPLEMENTED_TOPOLOGIES, IslandConfig, IslandModel
+from mlo_optimizer.components.nsga import make_halloffame
+from mlo_optimizer.components.parallel import ParallelEvaluator, get_n_jobs
+from mlo_optimizer.components.steady_state import ea_steady_state
+from mlo_optimizer.components.stopping import StoppingCriteria
+from mlo_optimizer.components.trajectory import IMPLEMENTED_ENGINES, TrajectoryConfig, run_restarts
+from mlo_optimizer.config import ANNEALING_STEPS_DEFAULT, A_H_DEFAULT, A_S_DEFAULT, B_H_DEFAULT, \
+    CHECKPOINT_INTERVAL_DEFAULT, ENGINE_DEFAULT, FITNESS_CACHE_SIZE_DEFAULT, FITNESS_FUNC_DEFAULT, \
+    HALL_OF_FAME_SIZE_DEFAULT, LOCAL_SEARCH_MAX_STEPS_DEFAULT, LOCAL_SEARCH_TOP_K_DEFAULT, MAX_GENERATION_DEFAULT, \
+    MIGRATION_INTERVAL_DEFAULT, MIGRATION_SIZE_DEFAULT, MINIMIZATION_DEFAULT, N_ISLANDS_DEFAULT, N_JOBS_DEFAULT, \
+    N_RESTARTS_DEFAULT, PENDING_PER_JOB, POPULATION_SIZE_DEFAULT, P_CROSSOVER_DEFAULT, P_MUTATION_DEFAULT, \
+    TABU_STEPS_DEFAULT, TABU_TENURE_DEFAULT, TOPOLOGY_DEFAULT, TOURN_SIZE_DEFAULT
 from mlo_optimizer.descriptors.bigram_probs_descriptor import BigramProbsDescriptor
 from mlo_optimizer.descriptors.coef_descriptor import CoefficientDescriptor
 from mlo_optimizer.descriptors.list_descriptor import ListDescriptor
 from mlo_optimizer.descriptors.probability_descriptor import ProbabilityDescriptor
 from mlo_optimizer.descriptors.size_descriptor import SizeDescriptor
-from mlo_optimizer.keyboards.bigrams import get_bigram_probs_with_vec
-from mlo_optimizer.keyboards.fitness import weighted_average_fitness_func
+from mlo_optimizer.keyboards.bigram_cache import BigramCache
+from mlo_optimizer.keyboards.bigram_counter import count_bigrams
+from mlo_optimizer.keyboards.bigram_mixture import BigramMixture
+from mlo_optimizer.keyboards.evaluator import LayoutEvaluator
 
 import numpy as np
 
@@ -36,6 +52,12 @@ class Optimizer:
     :type fitness_func_kwargs: dict
     :param minimization: Minimization and Maximization Flag of the Objective Function
     :type minimization: bool
+    :param fitness_weights: Weights of several objectives returned by the objective function (negative for minimized
+        objectives, positive for maximized ones). With several weights the population is evolved by NSGA-II and the
+        Pareto front is kept instead of the hall of fame (None - a single objective optimized according to
+        minimization). Built-in objective functions return a single score, so several weights require a custom
+        fitness_func
+    :type fitness_weights: tuple
     :param a_s: Half side of square button (when fitness_func='square')
     :type a_s: float
     :param a_h: Distance from the middle of a hexagonal key to the middle of its side (when fitness_func='hex')
@@ -53,8 +75,85 @@ class Optimizer:
     :type max_generation: int
     :param tourn_size: sample size for tournament selection
     :type tourn_size: int
-    :param hall_of_fame_size: Number of best individuals obtained after the completion of the optimization
+    :param hall_of_fame_size: Number of best individuals obtained after the completion of the optimization (for a
+        single objective)
     :type hall_of_fame_size: int
+    :param n_jobs: Number of worker processes evaluating the population (-1 means all processors)
+    :type n_jobs: int
+    :param executor: User-supplied executor from `concurrent.futures` evaluating the population (n_jobs is ignored)
+    :type executor: class:`concurrent.futures.Executor`
+    :param seed: Seed of the random generators creating the initial population, selecting and varying individuals (the
+        global generators of `random` and `numpy.random` are seeded as well), so runs with the same seed give the same
+        results (except for the steady-state mode)
+    :type seed: int
+    :param fitness_cache_size: Maximum number of fitness values memoized by genome (0 disables the cache)
+    :type fitness_cache_size: int
+    :param pure_fitness_func: Flag that the custom objective function depends on the individual only, so its values
+        can be memoized
+    :type pure_fitness_func: bool
+    :param checkpoint_path: Path to the file with the checkpoint of the optimization (None disables checkpoints)
+    :type checkpoint_path: str
+    :param checkpoint_interval: Number of generations between checkpoints
+    :type checkpoint_interval: int
+    :param n_islands: Number of sub-populations (islands) of population_size individuals evolving in n_jobs worker
+        processes with migrations between them (1 disables the island model)
+    :type n_islands: int
+    :param migration_interval: Number of generations between migrations
+    :type migration_interval: int
+    :param migration_size: Number of the best individuals sent by an island to each of its destinations
+    :type migration_size: int
+    :param topology: Migration topology ('ring' - each island sends migrants to the next one, 'full' - to all others)
+    :type topology: str
+    :param stagnation_window: Number of generations without improvement of the best fitness after which the run stops
+        (None disables the criterion)
+    :type stagnation_window: int
+    :param min_improvement: Minimum relative improvement of the best fitness that resets the stagnation window
+    :type min_improvement: float
+    :param max_time: Wall-clock budget of the run in seconds (None disables the criterion)
+    :type max_time: float
+    :param max_evals: Maximum number of fitness evaluations (None disables the criterion)
+    :type max_evals: int
+    :param local_search_top_k: Number of the best offspring refined by the steepest descent over swaps of permutable
+        elements in each generation (0 disables the local search, requires a built-in objective function)
+    :type local_search_top_k: int
+    :param local_search_max_steps: Maximum number of swaps applied to a refined individual
+    :type local_search_max_steps: int
+    :param engine: Search engine ('ga' - genetic algorithm, 'annealing' - simulated annealing, 'tabu' - tabu search).
+        Simulated annealing and tabu search move a single layout by swaps of permutable elements
+    :type engine: str
+    :param n_restarts: Number of independent runs of simulated annealing or tabu search from random layouts in n_jobs
+        worker processes
+    :type n_restarts: int
+    :param n_steps: Number of steps of each run of simulated annealing or tabu search (None - 20000 swaps proposed by
+        simulated annealing or 1000 swaps applied by tabu search)
+    :type n_steps: int
+    :param initial_temperature: Initial temperature of simulated annealing (None - the mean worsening of random swaps
+        of the initial layout)
+    :type initial_temperature: float
+    :param tabu_tenure: Number of steps during which an element may not return to its position in tabu search
+    :type tabu_tenure: int
+    :param profile: Add the wall time and the number of calls of each phase of the generation, evaluations per
+        second and the cache hit rate to the logbook
+    :type profile: bool
+    :param metrics_sink: Path to the JSON Lines file or a callable that receives the logbook record of each generation
+        together with the measurements of phases (None - the records are not exported)
+    :type metrics_sink: str or callable
+    :param approximate_mass: Share of the probability mass of the most probable bigrams used to evaluate individuals
+        by built-in objective functions (None - all bigrams are used). The error of the approximate score is bounded
+        by the dropped mass multiplied by the maximum distance between keys, individuals that may enter the hall of
+        fame are evaluated exactly, so the returned matrices are ranked by exact scores
+    :type approximate_mass: float
+    :param steady_state: Evolve the population without generations: each offspring is evaluated asynchronously in
+        n_jobs worker processes and replaces the worst individual as soon as its evaluation completes, new offspring
+        are submitted to the workers that become free (for objective functions with a varying evaluation time)
+    :type steady_state: bool
+    :param hall_of_fame_min_distance: Minimum number of positions in which the layouts of the hall of fame differ (0 -
+        only equal layouts are not kept twice). A layout close to kept ones enters the hall of fame only if it is
+        better than all of them and replaces them
+    :type hall_of_fame_min_distance: int
+    :param pareto_front_size: Maximum number of layouts of the Pareto front kept for several objectives (None - the
+        whole front is kept). If the front is larger, the most crowded layouts are dropped
+    :type pareto_front_size: int
     """
     IMPLEMENTED_FITNESS_FUNCS = ('square', 'hex')
 
@@ -68,6 +167,13 @@ class Optimizer:
     max_generation = SizeDescriptor()
     tourn_size = SizeDescriptor()
     hall_of_fame_size = SizeDescriptor()
+    checkpoint_interval = SizeDescriptor()
+    n_islands = SizeDescriptor()
+    migration_interval = SizeDescriptor()
+    migration_size = SizeDescriptor()
+    local_search_max_steps = SizeDescriptor()
+    n_restarts = SizeDescriptor()
+    tabu_tenure = SizeDescriptor()
     p_crossover = ProbabilityDescriptor()
     p_mutation = ProbabilityDescriptor()
 
@@ -81,6 +187,7 @@ class Optimizer:
                  fitness_func: callable = FITNESS_FUNC_DEFAULT,
                  fitness_func_kwargs: dict = None,
                  minimization: bool = MINIMIZATION_DEFAULT,
+                 fitness_weights: tuple = None,
                  a_s: float = A_S_DEFAULT,
                  a_h: float = A_H_DEFAULT,
                  b_h: float = B_H_DEFAULT,
@@ -89,7 +196,35 @@ class Optimizer:
                  p_crossover: float = P_CROSSOVER_DEFAULT,
                  p_mutation: float = P_MUTATION_DEFAULT,
                  tourn_size: int = TOURN_SIZE_DEFAULT,
-                 hall_of_fame_size: int = HALL_OF_FAME_SIZE_DEFAULT):
+                 hall_of_fame_size: int = HALL_OF_FAME_SIZE_DEFAULT,
+                 n_jobs: int = N_JOBS_DEFAULT,
+                 executor=None,
+                 seed: int = None,
+                 fitness_cache_size: int = FITNESS_CACHE_SIZE_DEFAULT,
+                 pure_fitness_func: bool = False,
+                 checkpoint_path: str = None,
+                 checkpoint_interval: int = CHECKPOINT_INTERVAL_DEFAULT,
+                 n_islands: int = N_ISLANDS_DEFAULT,
+                 migration_interval: int = MIGRATION_INTERVAL_DEFAULT,
+                 migration_size: int = MIGRATION_SIZE_DEFAULT,
+                 topology: str = TOPOLOGY_DEFAULT,
+                 stagnation_window: int = None,
+                 min_improvement: float = 0.0,
+                 max_time: float = None,
+                 max_evals: int = None,
+                 local_search_top_k: int = LOCAL_SEARCH_TOP_K_DEFAULT,
+                 local_search_max_steps: int = LOCAL_SEARCH_MAX_STEPS_DEFAULT,
+                 engine: str = ENGINE_DEFAULT,
+                 n_restarts: int = N_RESTARTS_DEFAULT,
+                 n_steps: int = None,
+                 initial_temperature: float = None,
+                 tabu_tenure: int = TABU_TENURE_DEFAULT,
+                 profile: bool = False,
+                 metrics_sink=None,
+                 steady_state: bool = False,
+                 approximate_mass: float = None,
+                 hall_of_fame_min_distance: int = 0,
+                 pareto_front_size: int = None):
 
         self.init_matrix = init_matrix
         self.counted_elems = counted_elems
@@ -97,6 +232,7 @@ class Optimizer:
         self.fitness_func = fitness_func
         self.fitness_func_kwargs = fitness_func_kwargs
         self.minimization = minimization
+        self.fitness_weights = fitness_weights
         self.a_s = a_s
         self.a_h = a_h
         self.b_h = b_h
@@ -106,78 +242,330 @@ class Optimizer:
         self.p_mutation = p_mutation
         self.tourn_size = tourn_size
         self.hall_of_fame_size = hall_of_fame_size
+        self.n_jobs = n_jobs
+        self.executor = executor
+        self.seed = seed
+        self.fitness_cache_size = fitness_cache_size
+        self.pure_fitness_func = pure_fitness_func
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self.n_islands = n_islands
+        self.migration_interval = migration_interval
+        self.migration_size = migration_size
+        self.topology = topology
+        self.stagnation_window = stagnation_window
+        self.min_improvement = min_improvement
+        self.max_time = max_time
+        self.max_evals = max_evals
+        self.local_search_top_k = local_search_top_k
+        self.local_search_max_steps = local_search_max_steps
+        self.engine = engine
+        self.n_restarts = n_restarts
+        self.n_steps = n_steps
+        self.initial_temperature = initial_temperature
+        self.tabu_tenure = tabu_tenure
+        self.profile = profile
+        self.metrics_sink = metrics_sink
+        self.steady_state = steady_state
+        self.approximate_mass = approximate_mass
+        self.hall_of_fame_min_distance = hall_of_fame_min_distance
+        self.pareto_front_size = pareto_front_size
 
         self.bigram_probs = None
         self.bigram_probs_vec = None
+        self.bigram_mixture = None
 
-    def fit_bigrams(self, lang_part_dir: str):
+    def fit_bigrams(self, lang_part_dir: str, use_mmap: bool = False, cache_dir: str = None):
         """Reads text files and construct bigram probability vectors from them
 
+        Files are read by chunks, so the memory consumption does not depend on the size of the corpus. With n_jobs > 1
+        files are counted in parallel processes
+
         :param lang_part_dir: Folder with text files
         :type lang_part_dir: str
+        :param use_mmap: Read files through a memory map instead of buffered reads
+        :type use_mmap: bool
+        :param cache_dir: Directory of the persistent cache of bigram counts (files whose counts are cached are not
+            read again)
+        :type cache_dir: str
         """
-        texts = read_dir(lang_part_dir)
-        self.bigram_probs, self.bigram_probs_vec = get_bigram_probs_with_vec(texts, self.counted_elems)
+        if cache_dir is not None:
+            counter = BigramCache(cache_dir).count_bigrams(lang_part_dir, self.counted_elems, n_jobs=self.n_jobs,
+                                                           use_mmap=use_mmap)
+        else:
+            counter = count_bigrams(lang_part_dir, self.counted_elems, n_jobs=self.n_jobs, use_mmap=use_mmap)
+        self.bigram_probs, self.bigram_probs_vec = counter.get_bigram_probs_with_vec()
+
+    def fit_bigram_mixture(self, lang_part_dirs: dict, use_mmap: bool = False, cache_dir: str = None):
+        """Counts bigrams of several corpora separately, so they can be mixed with any weights by `mix_bigrams`
+
+        :param lang_part_dirs: Dictionary: name of corpus -> folder with text files
+        :type lang_part_dirs: dict
+        :param use_mmap: Read files through a memory map instead of buffered reads
+        :type use_mmap: bool
+        :param cache_dir: Directory of the persistent cache of bigram counts (files whose counts are cached are not
+            read again)
+        :type cache_dir: str
+        """
+        self.bigram_mixture = BigramMixture.from_dirs(lang_part_dirs, self.counted_elems, n_jobs=self.n_jobs,
+                                                      use_mmap=use_mmap, cache_dir=cache_dir)
 
-    def optimize(self):
-        """Collects all components and runs optimization
+    def mix_bigrams(self, weights: dict):
+        """Sets the bigram probabilities of the mixture of corpora counted by `fit_bigram_mixture` (texts are not read
+        again)
 
-        :return: Matrices of the best individuals (quantity depends on the parameter hall_of_fame_size)
+        :param weights: Dictionary: name of corpus -> non-negative weight (missing corpora have zero weight)
+        :type weights: dict
         """
-        if self.__minimization:
-            weight = -1.0
-        else:
-            weight = 1.0
+        assert self.bigram_mixture is not None, 'Corpora must be counted by "fit_bigram_mixture" before mixing'
+        assert self.bigram_mixture.counted_elems == list(self.counted_elems), \
+            'Corpora must be counted over the counted elements of the optimizer'
 
-        creator.create('FitnessMin', base.Fitness, weights=(weight,))
-        creator.create('Individual', list, fitness=creator.FitnessMin)
+        self.bigram_probs, self.bigram_probs_vec = self.bigram_mixture.mix_bigram_probs(weights)
 
-        toolbox = base.Toolbox()
-        toolbox.register('randomMatrix', random_matrix, self.init_matrix, self.permutable_elems)
-        toolbox.register('populationCreator', tools.initRepeat, list, toolbox.randomMatrix)
+    def optimize(self, resume_from: str = None, top_k: int = None):
+        """Collects all components and runs optimization
 
-        population = toolbox.populationCreator(n=self.population_size)
+        :param resume_from: Path to the checkpoint file of the interrupted run to continue (the run continues with the
+            saved population, hall of fame, logbook and states of random number generators). A run stopped early by a
+            stopping criterion is not continued, its saved hall of fame is returned
+        :type resume_from: str
+        :param top_k: Number of the best individuals of the hall of fame returned together with their fitness scores
+            (at most hall_of_fame_size or pareto_front_size, None - only matrices are returned)
+        :type top_k: int
+        :return: Matrix of the best individual or list of matrices of the Pareto front (at most pareto_front_size
+            ones) for several objectives. With top_k - list of pairs (matrix, fitness score) from the best one, the
+            score is a tuple of values for several objectives
+        """
+        template = LayoutTemplate(self.init_matrix, self.permutable_elems)
+        individual_class = get_individual_class(self.__minimization, self.fitness_weights)
+        halloffame_size = self._get_halloffame_size(individual_class)
+        assert top_k is None or isinstance(top_k, int) and 0 < top_k and \
+            (halloffame_size is None or top_k <= halloffame_size), \
+            'top_k must be a positive int not greater than hall_of_fame_size (pareto_front_size for several objectives)'
+
+        evaluate = exact_evaluate = self._get_evaluate(template)
+
+        if self.approximate_mass is not None:
+            # Candidates are evaluated over the most probable bigrams, the best individuals are rescored exactly
+            assert isinstance(evaluate, LayoutEvaluator), \
+                'The approximate evaluation is supported only for built-in objective functions'
+            evaluate = exact_evaluate.truncate(self.approximate_mass)
+            print(f'Approximate evaluation: {len(evaluate.first_ids)} of {len(exact_evaluate.first_ids)} bigrams, '
+                  f'error bound {evaluate.error_bound:.6g}')
+
+        if is_multi_objective(individual_class):
+            assert self.engine == 'ga', 'Several objectives are supported only by the genetic algorithm'
+            assert not self.local_search_top_k and self.stagnation_window is None, \
+                'The local search and the stagnation criterion are supported only for a single objective'
+
+        # Built-in objective functions are pure, custom ones are memoized only if they are declared pure
+        fitness_cache_size = self.fitness_cache_size
+        if not isinstance(evaluate, LayoutEvaluator) and not self.pure_fitness_func:
+            fitness_cache_size = 0
+
+        if self.engine != 'ga':
+            assert resume_from is None and self.checkpoint_path is None, \
+                'Checkpoints are supported only by the genetic algorithm'
+            return self._optimize_trajectory(template, individual_class, evaluate, exact_evaluate, top_k)
+
+        # The local search relies on the distance matrix of the compiled objective function
+        assert not self.local_search_top_k or isinstance(evaluate, LayoutEvaluator), \
+            'The local search is supported only for built-in objective functions'
+
+        if self.steady_state:
+            assert self.n_islands == 1 and not is_multi_objective(individual_class), \
+                'The steady-state mode is supported only for a single population and a single objective'
+            assert resume_from is None and self.checkpoint_path is None, \
+                'Checkpoints are not supported in the steady-state mode'
+
+        if self.n_islands > 1:
+            assert resume_from is None and self.checkpoint_path is None, \
+                'Checkpoints are not supported in the island model'
+            return self._optimize_islands(template, individual_class, evaluate, exact_evaluate, fitness_cache_size,
+                                          top_k)
+
+        rng = np.random.default_rng(self.seed)
+        if self.seed is not None:
+            # Tournament selection and the operators of single individuals use the global generators
+            random.seed(self.seed)
+            np.random.seed(self.seed)
+
+        if evaluate is not exact_evaluate:
+            hof = RescoredHallOfFame(self.hall_of_fame_size, exact_evaluate.evaluate_population, evaluate.error_bound,
+                                     minimization=self.__minimization, min_distance=self.hall_of_fame_min_distance,
+                                     approximate_evaluate_population=evaluate.evaluate_population)
+        else:
+            hof = make_halloffame(individual_class, halloffame_size, self.hall_of_fame_min_distance)
+
+        parallel_evaluator, evaluate_population = None, None
+        if self.steady_state or self.executor is not None or get_n_jobs(self.n_jobs) > 1:
+            parallel_evaluator = ParallelEvaluator(evaluate, n_jobs=self.n_jobs, executor=self.executor)
+            evaluate_population = parallel_evaluator.evaluate_population
+
+        toolbox = make_toolbox(template, individual_class, evaluate, rng, self.tourn_size,
+                               evaluate_population=evaluate_population, fitness_cache_size=fitness_cache_size,
+                               local_search_top_k=self.local_search_top_k,
+                               local_search_max_steps=self.local_search_max_steps)
+        stopping_criteria = self._get_stopping_criteria()
+        toolbox.register('get_stop_reason', stopping_criteria.get_stop_reason)
+        if self.steady_state:
+            toolbox.register('submit_evaluation', parallel_evaluator.submit)
+
+        if resume_from is not None:
+            state = read_checkpoint(resume_from)
+            assert state['genomes'].shape[1] == template.n_genes, \
+                'The checkpoint was saved for a different set of permutable elements'
+            last_gen, population, logbook = restore_checkpoint_state(state, individual_class, hof, rng,
+                                                                     stopping_criteria)
+        else:
+            last_gen, logbook = 0, None
+            population = toolbox.populationCreator(n=self.population_size)
+
+        checkpointer = None
+        if self.checkpoint_path is not None:
+            checkpointer = Checkpointer(self.checkpoint_path, self.checkpoint_interval, self.max_generation, rng,
+                                        stopping_criteria)
+            toolbox.register('checkpoint', checkpointer.checkpoint)
+
+        if self.profile or self.metrics_sink is not None:
+            toolbox.profiler = Profiler(self._get_metrics_sinks(), log_fields=self.profile)
+
+        stats = make_statistics(self.__minimization, n_objectives=len(individual_class.fitness_class.weights))
+        try:
+            if self.steady_state:
+                ea_steady_state(
+                    population,
+                    toolbox,
+                    cxpb=self.p_crossover,
+                    mutpb=self.p_mutation,
+                    ngen=self.max_generation,
+                    max_pending=parallel_evaluator.n_workers * PENDING_PER_JOB,
+                    halloffame=hof,
+                    stats=stats,
+                    verbose=True)
+            else:
+                ea_simple_elitism(
+                    population,
+                    toolbox,
+                    cxpb=self.p_crossover,
+                    mutpb=self.p_mutation,
+                    ngen=self.max_generation,
+                    halloffame=hof,
+                    stats=stats,
+                    verbose=True,
+                    start_gen=last_gen + 1,
+                    logbook=logbook)
+        finally:
+            if parallel_evaluator is not None:
+                parallel_evaluator.close()
+            if checkpointer is not None:
+                checkpointer.close()
+            if hasattr(toolbox, 'profiler'):
+                toolbox.profiler.close()
+
+        if isinstance(hof, RescoredHallOfFame):
+            print(f'Exact evaluations: {hof.n_exact_evals}')
+
+        return self._get_best_matrices(template, hof, top_k)
+
+    def _optimize_islands(self, template: LayoutTemplate, individual_class: type, evaluate: callable,
+                          exact_evaluate: callable, fitness_cache_size: int, top_k: int = None) -> list:
+        config = IslandConfig(template, individual_class, evaluate, self.p_crossover, self.p_mutation,
+                              self.tourn_size, self._get_halloffame_size(individual_class),
+                              fitness_cache_size=fitness_cache_size, local_search_top_k=self.local_search_top_k,
+                              local_search_max_steps=self.local_search_max_steps,
+                              profile=self.profile or self.metrics_sink is not None)
+        hof = make_halloffame(individual_class, config.hall_of_fame_size, self.hall_of_fame_min_distance)
+
+        # Measurements of islands are combined and exported by the main process
+        profiler = Profiler(self._get_metrics_sinks())
+        try:
+            with IslandModel(config, self.n_islands, n_jobs=self.n_jobs, executor=self.executor) as island_model:
+                island_model.run(self.population_size, self.max_generation, self.migration_interval,
+                                 self.migration_size, self.topology, hof, seed=self.seed,
+                                 stopping_criteria=self._get_stopping_criteria(), metrics_sink=profiler.write)
+        finally:
+            profiler.close()
+
+        if evaluate is not exact_evaluate:
+            hof = rescore_halloffame(hof, exact_evaluate.evaluate_population)
+
+        return self._get_best_matrices(template, hof, top_k)
+
+    def _optimize_trajectory(self, template: LayoutTemplate, individual_class: type, evaluate: callable,
+                             exact_evaluate: callable, top_k: int = None) -> list:
+        n_steps = self.n_steps
+        if n_steps is None:
+            n_steps = ANNEALING_STEPS_DEFAULT if self.engine == 'annealing' else TABU_STEPS_DEFAULT
+
+        config = TrajectoryConfig(self.engine, template, individual_class, evaluate, n_steps,
+                                  initial_temperature=self.initial_temperature, tabu_tenure=self.tabu_tenure)
+        hof = make_halloffame(individual_class, self.hall_of_fame_size, self.hall_of_fame_min_distance)
+        run_restarts(config, self.n_restarts, hof, seed=self.seed, n_jobs=self.n_jobs, executor=self.executor)
+
+        if evaluate is not exact_evaluate:
+            hof = rescore_halloffame(hof, exact_evaluate.evaluate_population)
+
+        return self._get_best_matrices(template, hof, top_k)
+
+    @staticmethod
+    def _get_best_matrices(template: LayoutTemplate, halloffame, top_k: int = None) -> list:
+        if top_k is not None:
+            return [(template.to_matrix(individual.genome), Optimizer._get_score(individual))
+                    for individual in halloffame.items[:top_k]]
+        if isinstance(halloffame, GenomeArchive):
+            return template.to_matrix(halloffame.items[0].genome)
+        return [template.to_matrix(individual.genome) for individual in halloffame]
+
+    @staticmethod
+    def _get_score(individual):
+        values = tuple(float(value) for value in individual.fitness.values)
+        return values if len(values) > 1 else values[0]
+
+    def _get_metrics_sinks(self) -> list:
+        if self.metrics_sink is None:
+            return []
+        if isinstance(self.metrics_sink, str):
+            return [JsonLinesSink(self.metrics_sink)]
+        return [self.metrics_sink]
+
+    def _get_halloffame_size(self, individual_class: type):
+        # The Pareto front of several objectives is limited separately from the hall of fame
+        if is_multi_objective(individual_class):
+            return self.pareto_front_size
+        return self.hall_of_fame_size
+
+    def _get_stopping_criteria(self) -> StoppingCriteria:
+        return StoppingCriteria(self.max_generation, minimization=self.__minimization,
+                                stagnation_window=self.stagnation_window, min_improvement=self.min_improvement,
+                                max_time=self.max_time, max_evals=self.max_evals)
+
+    def _get_evaluate(self, template: LayoutTemplate):
+        if self.fitness_func in Optimizer.IMPLEMENTED_FITNESS_FUNCS:
+            assert self.fitness_weights is None or len(self.fitness_weights) == 1, \
+                'Built-in objective functions return a single score, several fitness_weights require a custom ' \
+                'fitness_func'
 
         if self.fitness_func == Optimizer.IMPLEMENTED_FITNESS_FUNCS[0]:
             assert self.bigram_probs is not None and self.bigram_probs_vec is not None, \
                 'Before optimization using the "square" function, it is necessary to determine the weights of the ' \
                 'bigram using the "fit_bigrams" function'
-            toolbox.register('evaluate', weighted_average_fitness_func, bigram_probs=self.bigram_probs,
-                             bigram_probs_vec=self.bigram_probs_vec, dist_func='square', a_s=self.a_s)
+            evaluate = LayoutEvaluator(self.init_matrix, self.bigram_probs, self.bigram_probs_vec, dist_func='square',
+                                       a_s=self.a_s, template=template)
         elif self.__fitness_func == Optimizer.IMPLEMENTED_FITNESS_FUNCS[1]:
             assert self.bigram_probs is not None and self.bigram_probs_vec is not None, \
                 'Before optimization using the "hex" function, it is necessary to determine the weights of the ' \
                 'bigram using the "fit_bigrams" function'
-            toolbox.register('evaluate', weighted_average_fitness_func, bigram_probs=self.bigram_probs,
-                             bigram_probs_vec=self.bigram_probs_vec, dist_func='hex', a_h=self.a_h, b_h=self.b_h)
+            evaluate = LayoutEvaluator(self.init_matrix, self.bigram_probs, self.bigram_probs_vec, dist_func='hex',
+                                       a_h=self.a_h, b_h=self.b_h, template=template)
         else:
-            toolbox.register('evaluate', self.__fitness_func, bigram_probs=self.bigram_probs,
-                             bigram_probs_vec=self.bigram_probs_vec, dist_func='hex', a_h=self.a_h, b_h=self.b_h,
-                             **self.__fitness_func_kwargs)
+            # Custom objective functions receive individual matrices
+            evaluate = MatrixFitness(partial(self.__fitness_func, bigram_probs=self.bigram_probs,
+                                             bigram_probs_vec=self.bigram_probs_vec, dist_func='hex', a_h=self.a_h,
+                                             b_h=self.b_h, **self.__fitness_func_kwargs), template)
 
-        toolbox.register('select', tools.selTournament, tournsize=self.tourn_size)
-        toolbox.register('mate', mate_matrix, permutable_elems=self.permutable_elems)
-        toolbox.register('mutate', mutate_matrix, permutable_elems=self.permutable_elems)
-
-        stats = tools.Statistics(lambda ind: ind.fitness.values)
-        stats.register('min', np.min)
-        stats.register('avg', np.mean)
-
-        hof = tools.HallOfFame(self.hall_of_fame_size)
-
-        ea_simple_elitism(
-            population,
-            toolbox,
-            cxpb=self.p_crossover,
-            mutpb=self.p_mutation,
-            ngen=self.max_generation,
-            halloffame=hof,
-            stats=stats,
-            verbose=True)
-
-        best_matrices = hof.items[0]
-
-        return best_matrices
+        return evaluate
 
     @property
     def fitness_func(self):
@@ -198,17 +586,218 @@ class Optimizer:
     def fitness_func_kwargs(self, value):
         if value is None:
             self.__fitness_func_kwargs = {}
-        elif isinstance(value, dict):
+        elif not isinstance(value, dict):
             raise TypeError('Attribute "fitness_func_kwargs" must be represented as Python dict')
         else:
             self.__fitness_func_kwargs = value
 
+    @property
+    def n_jobs(self):
+        return self.__n_jobs
+
+    @n_jobs.setter
+    def n_jobs(self, value):
+        if not isinstance(value, int) or (value <= 0 and value != -1):
+            raise TypeError('Attribute "n_jobs" must be a positive int or -1')
+        self.__n_jobs = value
+
+    @property
+    def seed(self):
+        return self.__seed
+
+    @seed.setter
+    def seed(self, value):
+        if value is not None and (not isinstance(value, int) or value < 0):
+            raise TypeError('Attribute "seed" must be a non-negative int or None')
+        self.__seed = value
+
+    @property
+    def fitness_cache_size(self):
+        return self.__fitness_cache_size
+
+    @fitness_cache_size.setter
+    def fitness_cache_size(self, value):
+        if not isinstance(value, int) or value < 0:
+            raise TypeError('Attribute "fitness_cache_size" must be a non-negative int')
+        self.__fitness_cache_size = value
+
+    @property
+    def pure_fitness_func(self):
+        return self.__pure_fitness_func
+
+    @pure_fitness_func.setter
+    def pure_fitness_func(self, value):
+        if not isinstance(value, bool):
+            raise TypeError('Attribute "pure_fitness_func" must be represented as boolean')
+        self.__pure_fitness_func = value
+
+    @property
+    def topology(self):
+        return self.__topology
+
+    @topology.setter
+    def topology(self, value):
+        if value not in IMPLEMENTED_TOPOLOGIES:
+            raise TypeError(f'The migration topology must be {", ".join(IMPLEMENTED_TOPOLOGIES)}')
+        self.__topology = value
+
+    @property
+    def stagnation_window(self):
+        return self.__stagnation_window
+
+    @stagnation_window.setter
+    def stagnation_window(self, value):
+        if value is not None and (not isinstance(value, int) or value <= 0):
+            raise TypeError('Attribute "stagnation_window" must be a positive int or None')
+        self.__stagnation_window = value
+
+    @property
+    def min_improvement(self):
+        return self.__min_improvement
+
+    @min_improvement.setter
+    def min_improvement(self, value):
+        if not isinstance(value, (int, float)) or value < 0:
+            raise TypeError('Attribute "min_improvement" must be a non-negative number')
+        self.__min_improvement = value
+
+    @property
+    def max_time(self):
+        return self.__max_time
+
+    @max_time.setter
+    def max_time(self, value):
+        if value is not None and (not isinstance(value, (int, float)) or value <= 0):
+            raise TypeError('Attribute "max_time" must be a positive number or None')
+        self.__max_time = value
+
+    @property
+    def max_evals(self):
+        return self.__max_evals
+
+    @max_evals.setter
+    def max_evals(self, value):
+        if value is not None and (not isinstance(value, int) or value <= 0):
+            raise TypeError('Attribute "max_evals" must be a positive int or None')
+        self.__max_evals = value
+
+    @property
+    def local_search_top_k(self):
+        return self.__local_search_top_k
+
+    @local_search_top_k.setter
+    def local_search_top_k(self, value):
+        if not isinstance(value, int) or value < 0:
+            raise TypeError('Attribute "local_search_top_k" must be a non-negative int')
+        self.__local_search_top_k = value
+
+    @property
+    def engine(self):
+        return self.__engine
+
+    @engine.setter
+    def engine(self, value):
+        if value not in IMPLEMENTED_ENGINES:
+            raise TypeError(f'The search engine must be {", ".join(IMPLEMENTED_ENGINES)}')
+        self.__engine = value
+
+    @property
+    def n_steps(self):
+        return self.__n_steps
+
+    @n_steps.setter
+    def n_steps(self, value):
+        if value is not None and (not isinstance(value, int) or value <= 0):
+            raise TypeError('Attribute "n_steps" must be a positive int or None')
+        self.__n_steps = value
+
+    @property
+    def initial_temperature(self):
+        return self.__initial_temperature
+
+    @initial_temperature.setter
+    def initial_temperature(self, value):
+        if value is not None and (not isinstance(value, (int, float)) or value <= 0):
+            raise TypeError('Attribute "initial_temperature" must be a positive number or None')
+        self.__initial_temperature = value
+
+    @property
+    def profile(self):
+        return self.__profile
+
+    @profile.setter
+    def profile(self, value):
+        if not isinstance(value, bool):
+            raise TypeError('Attribute "profile" must be represented as boolean')
+        self.__profile = value
+
+    @property
+    def metrics_sink(self):
+        return self.__metrics_sink
+
+    @metrics_sink.setter
+    def metrics_sink(self, value):
+        if value is not None and not isinstance(value, str) and not callable(value):
+            raise TypeError('Attribute "metrics_sink" must be a path to file, a callable or None')
+        self.__metrics_sink = value
+
+    @property
+    def fitness_weights(self):
+        return self.__fitness_weights
+
+    @fitness_weights.setter
+    def fitness_weights(self, value):
+        if value is not None and (not isinstance(value, (tuple, list)) or not value or
+                                  any(not isinstance(weight, (int, float)) or weight == 0 for weight in value)):
+            raise TypeError('Attribute "fitness_weights" must be a non-empty tuple of non-zero numbers or None')
+        self.__fitness_weights = value
+
+    @property
+    def steady_state(self):
+        return self.__steady_state
+
+    @steady_state.setter
+    def steady_state(self, value):
+        if not isinstance(value, bool):
+            raise TypeError('Attribute "steady_state" must be represented as boolean')
+        self.__steady_state = value
+
+    @property
+    def approximate_mass(self):
+        return self.__approximate_mass
+
+    @approximate_mass.setter
+    def approximate_mass(self, value):
+        if value is not None and (not isinstance(value, (int, float)) or not 0 < value <= 1):
+            raise TypeError('Attribute "approximate_mass" must be a number from 0 (exclusive) to 1 or None')
+        self.__approximate_mass = value
+
+    @property
+    def hall_of_fame_min_distance(self):
+        return self.__hall_of_fame_min_distance
+
+    @hall_of_fame_min_distance.setter
+    def hall_of_fame_min_distance(self, value):
+        if not isinstance(value, int) or value < 0:
+            raise TypeError('Attribute "hall_of_fame_min_distance" must be a non-negative int')
+        self.__hall_of_fame_min_distance = value
+
+    @property
+    def pareto_front_size(self):
+        return self.__pareto_front_size
+
+    @pareto_front_size.setter
+    def pareto_front_size(self, value):
+        if value is not None and (not isinstance(value, int) or value <= 0):
+            raise TypeError('Attribute "pareto_front_size" must be a positive int or None')
+        self.__pareto_front_size = value
+
     @property
     def minimization(self):
         return self.__minimization
 
     @minimization.setter
     def minimization(self, value):
-        if isinstance(value, bool):
+        if not isinstance(value, bool):
             raise TypeError('Attribute "minimization" must be represented as boolean')
         self.__minimization = value
@@ -0,0 +1,47 @@
+from mlo_optimizer.components.genome import LayoutTemplate
+from mlo_optimizer.keyboards.bigram_counter import BigramCounter
+
+import numpy as np
+
+import pytest
+
+PERMUTABLE_ELEMS = [chr(i) for i in range(ord('a'), ord('z') + 1)] + ['.', ',', '!', '?', '-', ':', ';', '(', ')']
+COUNTED_ELEMS = [chr(i) for i in range(ord('a'), ord('z') + 1)] + ['space', 'enter'] + \
+    ['.', ',', '!', '?', '-', ':', ';', '(', ')']
+INIT_MATRIX = [
+    ['inv', 'inv', 'lang', None, None, None, None, '?123', 'inv'],
+    ['inv', 'settings', None, None, None, None, None, 'backspace', 'inv'],
+    ['inv', 'inv', None, None, None, None, None, None, 'inv'],
+    ['inv', None, None, None, 'space', None, None, 'enter', 'inv'],
+    ['inv', 'inv', None, None, None, None, None, None, 'inv'],
+    ['inv', 'move', None, None, None, None, None, 'capslock', 'inv'],
+    ['inv', 'inv', 'exit', None, None, None, None, 'shift', 'inv'],
+]
+TEXT = 'The quick brown fox jumps over the lazy dog! Is it (really) lazy? Yes: it sleeps; the fox - runs, jumps.\n' \
+    'Pack my box with five dozen liquor jugs. Sphinx of black quartz, judge my vow!\n'
+
+
+def make_text(n_lines: int, seed: int = 0) -> str:
+    """Builds a pseudo-random text from the words of the sample text
+
+    :param n_lines: Number of lines
+    :type n_lines: int
+    :param seed: Seed of the random number generator
+    :type seed: int
+    :return: Text
+    """
+    rng = np.random.default_rng(seed)
+    words = TEXT.split()
+    return ''.join(' '.join(rng.choice(words, size=rng.integers(3, 12)).tolist()) + '\n' for _ in range(n_lines))
+
+
+@pytest.fixture
+def template() -> LayoutTemplate:
+    return LayoutTemplate(INIT_MATRIX, PERMUTABLE_ELEMS)
+
+
+@pytest.fixture
+def bigrams() -> tuple:
+    counter = BigramCounter(COUNTED_ELEMS)
+    counter.update(make_text(200).lower())
+    return counter.get_bigram_probs_with_vec()
@@ -0,0 +1,63 @@
+from mlo_optimizer.components.algelitism import ea_simple_elitism
+from mlo_optimizer.components.approximation import RescoredHallOfFame
+from mlo_optimizer.components.genetic_alg import make_toolbox
+from mlo_optimizer.components.individual import IndividualMin
+from mlo_optimizer.keyboards.evaluator import LayoutEvaluator
+
+import numpy as np
+
+import pytest
+
+from tests.conftest import INIT_MATRIX
+
+
+def test_approximate_run_keeps_exact_hall_of_fame(template, bigrams):
+    bigram_probs, bigram_probs_vec = bigrams
+    exact_evaluate = LayoutEvaluator(INIT_MATRIX, bigram_probs, bigram_probs_vec, template=template)
+    evaluate = exact_evaluate.truncate(0.8)
+    assert evaluate.error_bound > 0
+
+    toolbox = make_toolbox(template, IndividualMin, evaluate, np.random.default_rng(0), tourn_size=3)
+    evaluated_genomes = {}
+
+    def evaluate_population(individuals):
+        for individual in individuals:
+            evaluated_genomes[individual.genome.tobytes()] = individual.genome.copy()
+        return evaluate.evaluate_population(individuals)
+
+    toolbox.register('evaluate_population', evaluate_population)
+    halloffame = RescoredHallOfFame(5, exact_evaluate.evaluate_population, evaluate.error_bound,
+                                    approximate_evaluate_population=evaluate.evaluate_population)
+    population, _ = ea_simple_elitism(toolbox.populationCreator(n=30), toolbox, cxpb=0.9, mutpb=0.5, ngen=15,
+                                      halloffame=halloffame, verbose=False)
+
+    # The population (elites included) has only approximate scores
+    approximate_scores = [fitness[0] for fitness in
+                          evaluate.evaluate_population([IndividualMin(ind.genome) for ind in population])]
+    assert [ind.fitness.values[0] for ind in population] == pytest.approx(approximate_scores, rel=1e-9)
+
+    # The hall of fame is the same as the best individuals of all evaluated ones by the exact scores
+    candidates = [IndividualMin(genome) for genome in evaluated_genomes.values()]
+    exact_scores = [fitness[0] for fitness in exact_evaluate.evaluate_population(candidates)]
+    best_scores = np.sort(exact_scores)[:5].tolist()
+    assert [ind.fitness.values[0] for ind in halloffame] == pytest.approx(best_scores, rel=1e-9)
+
+
+def test_loaded_elites_get_approximate_scores(template, bigrams):
+    bigram_probs, bigram_probs_vec = bigrams
+    exact_evaluate = LayoutEvaluator(INIT_MATRIX, bigram_probs, bigram_probs_vec, template=template)
+    evaluate = exact_evaluate.truncate(0.8)
+
+    individuals = [IndividualMin(template.random_genome(np.random.default_rng(seed))) for seed in range(3)]
+    for individual, fitness in zip(individuals, exact_evaluate.evaluate_population(individuals)):
+        individual.fitness.values = fitness
+    individuals.sort(key=lambda individual: individual.fitness, reverse=True)
+
+    halloffame = RescoredHallOfFame(3, exact_evaluate.evaluate_population, evaluate.error_bound,
+                                    approximate_evaluate_population=evaluate.evaluate_population)
+    halloffame.load(individuals)
+
+    elites = halloffame.get_elites()
+    approximate_scores = [fitness[0] for fitness in evaluate.evaluate_population(individuals)]
+    assert [elite.fitness.values[0] for elite in elites] == pytest.approx(approximate_scores, rel=1e-12)
+    assert [item.fitness.values for item in halloffame] == [individual.fitness.values for individual in individuals]
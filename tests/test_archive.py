@@ -0,0 +1,88 @@
+from deap import tools
+
+from mlo_optimizer.components.algelitism import ea_simple_elitism
+from mlo_optimizer.components.archive import GenomeArchive
+from mlo_optimizer.components.genetic_alg import make_toolbox
+from mlo_optimizer.components.individual import IndividualMin
+from mlo_optimizer.keyboards.evaluator import LayoutEvaluator
+
+import numpy as np
+
+import pytest
+
+from tests.conftest import INIT_MATRIX
+
+
+def make_evaluated_individuals(template, evaluator, n_individuals: int, seed: int) -> list:
+    rng = np.random.default_rng(seed)
+    individuals = [IndividualMin(template.random_genome(rng)) for _ in range(n_individuals)]
+    # Repeated genomes must be kept once
+    individuals += [IndividualMin(individual.genome.copy()) for individual in individuals[:n_individuals // 5]]
+    for individual, fitness in zip(individuals, evaluator.evaluate_population(individuals)):
+        individual.fitness.values = fitness
+    return individuals
+
+
+def check_invariants(archive: GenomeArchive):
+    assert len(archive) <= archive.maxsize
+    assert [key.values for key in archive.keys] == [item.fitness.values for item in reversed(archive.items)]
+    assert all(not worse.fitness > better.fitness for better, worse in zip(archive.items, archive.items[1:]))
+    assert {item.genome.tobytes(): item for item in archive.items} == archive.index
+
+    if archive.min_distance > 0:
+        genomes = np.stack([item.genome for item in archive.items])
+        distances = np.count_nonzero(genomes[:, np.newaxis] != genomes[np.newaxis, :], axis=2)
+        assert (distances[~np.eye(len(genomes), dtype=bool)] >= archive.min_distance).all()
+        assert set(archive.rows) == set(archive.index)
+        for key, row in archive.rows.items():
+            assert archive.row_items[row] is archive.index[key]
+            assert archive.genomes[row].tobytes() == key
+
+
+@pytest.fixture
+def evaluator(template, bigrams) -> LayoutEvaluator:
+    bigram_probs, bigram_probs_vec = bigrams
+    return LayoutEvaluator(INIT_MATRIX, bigram_probs, bigram_probs_vec, template=template)
+
+
+def test_archive_matches_deap_hall_of_fame(template, evaluator):
+    archive = GenomeArchive(10)
+    halloffame = tools.HallOfFame(10, similar=lambda first, second: first == second)
+    for seed in range(5):
+        individuals = make_evaluated_individuals(template, evaluator, 30, seed)
+        archive.update(individuals)
+        halloffame.update(individuals)
+        check_invariants(archive)
+
+    assert [item.fitness.values for item in archive] == [item.fitness.values for item in halloffame]
+    assert all(item == expected for item, expected in zip(archive, halloffame))
+
+
+@pytest.mark.parametrize('min_distance', [5, 20, 33])
+def test_archive_keeps_distant_genomes(template, evaluator, min_distance):
+    archive = GenomeArchive(10, min_distance)
+    for seed in range(5):
+        archive.update(make_evaluated_individuals(template, evaluator, 30, seed))
+        check_invariants(archive)
+
+    archive.remove(0)
+    check_invariants(archive)
+    assert archive.items[0] not in archive.items[1:]
+
+
+def test_population_size_is_kept_when_archive_shrinks(template, evaluator):
+    toolbox = make_toolbox(template, IndividualMin, evaluator, np.random.default_rng(0), tourn_size=3)
+    archive = GenomeArchive(10, min_distance=33)
+    population_sizes, archive_sizes = [], []
+    population = toolbox.populationCreator(n=40)
+
+    def record_sizes():
+        population_sizes.append(len(population))
+        archive_sizes.append(len(archive))
+
+    ea_simple_elitism(population, toolbox, cxpb=0.9, mutpb=0.5, ngen=20, halloffame=archive, verbose=False,
+                      callback=(record_sizes, ()))
+
+    # The diversity filter removes kept individuals close to a better one
+    assert min(archive_sizes) < 10
+    assert population_sizes == [40] * 20
@@ -0,0 +1,73 @@
+import random
+
+from mlo_optimizer.components.genetic_alg import _ordered_crossover, mate_population, mutate_population, \
+    random_matrix, vary_population
+from mlo_optimizer.optimizer import Optimizer
+
+import numpy as np
+
+import pytest
+
+from tests.conftest import COUNTED_ELEMS, INIT_MATRIX, PERMUTABLE_ELEMS
+
+
+@pytest.fixture
+def genomes(template):
+    rng = np.random.default_rng(0)
+    return np.stack([template.random_genome(rng) for _ in range(60)])
+
+
+def test_mate_population_matches_ordered_crossover(genomes):
+    rng = np.random.default_rng(1)
+    children_1, children_2 = mate_population(genomes[::2], genomes[1::2], rng)
+
+    # The same cut points are drawn again to cross the pairs one by one
+    rng = np.random.default_rng(1)
+    n_pairs, size = genomes[::2].shape
+    first_cuts, second_cuts = rng.integers(0, size, n_pairs), rng.integers(0, size - 1, n_pairs)
+    second_cuts += second_cuts >= first_cuts
+    starts, ends = np.minimum(first_cuts, second_cuts), np.maximum(first_cuts, second_cuts)
+
+    for pair_id, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+        genome_1, genome_2 = genomes[2 * pair_id], genomes[2 * pair_id + 1]
+        assert children_1[pair_id].tolist() == _ordered_crossover(genome_1, genome_2, start, end).tolist()
+        assert children_2[pair_id].tolist() == _ordered_crossover(genome_2, genome_1, start, end).tolist()
+
+
+def test_batch_operators_give_permutations(template, genomes):
+    rng = np.random.default_rng(2)
+    children_1, children_2 = mate_population(genomes[::2], genomes[1::2], rng)
+    mutants = mutate_population(genomes, template, rng)
+
+    for genome in np.concatenate((children_1, children_2, mutants)):
+        assert sorted(genome.tolist()) == list(range(len(PERMUTABLE_ELEMS)))
+    assert (mutants[:, template.n_placed:] == genomes[:, template.n_placed:]).all()
+
+
+def test_vary_population_keeps_unchanged_individuals(template):
+    rng = np.random.default_rng(3)
+    population = [random_matrix(template, rng=rng) for _ in range(20)]
+    for individual in population:
+        individual.fitness.values = (1.0,)
+
+    offspring = vary_population(population, 0.0, 0.0, template, rng)
+    assert all(child.fitness.valid and child is not parent for child, parent in zip(offspring, population))
+
+    offspring = vary_population(population, 1.0, 1.0, template, rng)
+    for child, parent in zip(offspring, population):
+        assert not child.fitness.valid
+        assert child.origin[1] is parent.genome
+
+
+def test_same_seed_gives_same_results(bigrams):
+    results = []
+    for disturbance in range(2):
+        # Global generators in different states before the run
+        random.seed(disturbance)
+        np.random.seed(disturbance)
+        optimizer = Optimizer(INIT_MATRIX, COUNTED_ELEMS, PERMUTABLE_ELEMS, fitness_func='hex', population_size=20,
+                              max_generation=5, hall_of_fame_size=3, seed=7)
+        optimizer.bigram_probs, optimizer.bigram_probs_vec = bigrams
+        results.append(optimizer.optimize(top_k=3))
+
+    assert results[0] == results[1]
@@ -0,0 +1,95 @@
+from mlo_optimizer.data.read import read_dir
+from mlo_optimizer.keyboards.bigram_cache import BigramCache
+from mlo_optimizer.keyboards.bigram_counter import BigramCounter, NgramCounter, count_bigrams
+from mlo_optimizer.keyboards.bigrams import filter_bigram_probs, get_bigram_probs, tokenize_by_letters
+
+import pytest
+
+from tests.conftest import COUNTED_ELEMS, make_text
+
+
+@pytest.fixture
+def corpus_dir(tmp_path):
+    for i in range(3):
+        (tmp_path / f'part_{i}.txt').write_text(make_text(50 + 30 * i, seed=i), encoding='utf-8')
+    return tmp_path
+
+
+def get_baseline_probs(corpus_dir) -> dict:
+    bigram_probs = filter_bigram_probs(get_bigram_probs(tokenize_by_letters(read_dir(str(corpus_dir)))), COUNTED_ELEMS)
+    return dict(bigram_probs)
+
+
+def assert_same_probs(bigram_probs: list, expected: dict):
+    assert dict(bigram_probs).keys() == expected.keys()
+    for bigram, prob in bigram_probs:
+        assert prob == pytest.approx(expected[bigram], rel=1e-12)
+
+
+def test_streaming_counts_match_baseline(corpus_dir):
+    bigram_probs, _ = count_bigrams(str(corpus_dir), COUNTED_ELEMS).get_bigram_probs_with_vec()
+    assert_same_probs(bigram_probs, get_baseline_probs(corpus_dir))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 1000])
+def test_counts_do_not_depend_on_chunks(corpus_dir, chunk_size):
+    expected = count_bigrams(str(corpus_dir), COUNTED_ELEMS)
+    counter = count_bigrams(str(corpus_dir), COUNTED_ELEMS, chunk_size=chunk_size)
+
+    assert counter.keys.tolist() == expected.keys.tolist()
+    assert counter.counts.tolist() == expected.counts.tolist()
+    assert counter.total == expected.total
+
+
+def test_merged_counters_match_counting_in_a_row():
+    text = make_text(40)
+    expected = BigramCounter(COUNTED_ELEMS)
+    expected.update(text)
+
+    counter = BigramCounter(COUNTED_ELEMS)
+    for start in range(0, len(text), 97):
+        part = BigramCounter(COUNTED_ELEMS)
+        part.update(text[start:start + 97])
+        counter.merge(part)
+
+    assert counter.keys.tolist() == expected.keys.tolist()
+    assert counter.counts.tolist() == expected.counts.tolist()
+    assert counter.total == expected.total
+
+
+def test_parallel_counts_match_serial(corpus_dir):
+    serial = count_bigrams(str(corpus_dir), COUNTED_ELEMS)
+    parallel = count_bigrams(str(corpus_dir), COUNTED_ELEMS, n_jobs=2)
+
+    assert parallel.keys.tolist() == serial.keys.tolist()
+    assert parallel.counts.tolist() == serial.counts.tolist()
+    assert parallel.total == serial.total
+
+
+def test_cached_counts_match_serial(corpus_dir, tmp_path_factory):
+    cache_dir = tmp_path_factory.mktemp('cache')
+    serial = count_bigrams(str(corpus_dir), COUNTED_ELEMS)
+
+    cold = BigramCache(str(cache_dir)).count_bigrams(str(corpus_dir), COUNTED_ELEMS)
+    warm = BigramCache(str(cache_dir)).count_bigrams(str(corpus_dir), COUNTED_ELEMS)
+    (corpus_dir / 'part_1.txt').write_text(make_text(10, seed=10), encoding='utf-8')
+    changed = BigramCache(str(cache_dir)).count_bigrams(str(corpus_dir), COUNTED_ELEMS)
+
+    for counter in (cold, warm):
+        assert counter.keys.tolist() == serial.keys.tolist()
+        assert counter.counts.tolist() == serial.counts.tolist()
+        assert counter.total == serial.total
+    assert_same_probs(changed.get_bigram_probs_with_vec()[0], get_baseline_probs(corpus_dir))
+
+
+def test_sparse_trigram_counts():
+    text = 'abcab cab.'
+    counter = NgramCounter(COUNTED_ELEMS, order=3)
+    counter.update(text)
+    trigrams = dict(counter.get_ngrams().get_probs())
+
+    expected_counts = {}
+    for i in range(len(text) - 2):
+        trigram = tuple({' ': 'space'}.get(char, char) for char in text[i:i + 3])
+        expected_counts[trigram] = expected_counts.get(trigram, 0) + 1
+    assert trigrams == pytest.approx({trigram: count / (len(text) - 2) for trigram, count in expected_counts.items()})
@@ -0,0 +1,69 @@
+from mlo_optimizer.keyboards.bigram_mixture import BigramMixture
+from mlo_optimizer.optimizer import Optimizer
+
+import numpy as np
+
+import pytest
+
+from tests.conftest import COUNTED_ELEMS, INIT_MATRIX, PERMUTABLE_ELEMS, make_text
+
+
+@pytest.fixture
+def corpus_dirs(tmp_path) -> dict:
+    corpus_dirs = {}
+    for name, seed in (('en', 0), ('ru', 10)):
+        corpus_dir = tmp_path / name
+        corpus_dir.mkdir()
+        for i in range(2):
+            (corpus_dir / f'part_{i}.txt').write_text(make_text(40 + 20 * i, seed=seed + i), encoding='utf-8')
+        corpus_dirs[name] = str(corpus_dir)
+    return corpus_dirs
+
+
+def make_optimizer() -> Optimizer:
+    return Optimizer(INIT_MATRIX, COUNTED_ELEMS, PERMUTABLE_ELEMS)
+
+
+def test_single_corpus_matches_fit_bigrams(corpus_dirs):
+    mixed = make_optimizer()
+    mixed.fit_bigram_mixture(corpus_dirs)
+
+    for name, corpus_dir in corpus_dirs.items():
+        fitted = make_optimizer()
+        fitted.fit_bigrams(corpus_dir)
+        mixed.mix_bigrams({name: 2.0})
+
+        assert dict(mixed.bigram_probs) == pytest.approx(dict(fitted.bigram_probs), rel=1e-12)
+        assert sorted(mixed.bigram_probs_vec) == pytest.approx(sorted(fitted.bigram_probs_vec), rel=1e-12)
+
+
+def test_mixture_averages_corpora(corpus_dirs):
+    mixture = BigramMixture.from_dirs(corpus_dirs, COUNTED_ELEMS)
+    en_probs = dict(mixture.mix_bigram_probs({'en': 1})[0])
+    ru_probs = dict(mixture.mix_bigram_probs({'ru': 1})[0])
+
+    bigram_probs, bigram_probs_vec = mixture.mix_bigram_probs({'en': 1, 'ru': 3})
+    expected = {bigram: 0.25 * en_probs.get(bigram, 0) + 0.75 * ru_probs.get(bigram, 0)
+                for bigram in set(en_probs) | set(ru_probs)}
+    assert dict(bigram_probs) == pytest.approx(expected, rel=1e-12)
+    np.testing.assert_array_equal(bigram_probs_vec, [prob for _, prob in bigram_probs])
+
+
+def test_saved_mixture_is_loaded(corpus_dirs, tmp_path):
+    mixture = BigramMixture.from_dirs(corpus_dirs, COUNTED_ELEMS)
+    path = str(tmp_path / 'mixture.npz')
+    mixture.save(path)
+    loaded = BigramMixture.load(path)
+
+    assert loaded.counted_elems == mixture.counted_elems
+    assert loaded.names == mixture.names
+    for name in ('keys', 'counts', 'totals'):
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(mixture, name))
+    assert loaded.mix_bigram_probs({'en': 1, 'ru': 1})[0] == mixture.mix_bigram_probs({'en': 1, 'ru': 1})[0]
+
+
+@pytest.mark.parametrize('weights', [{'de': 1}, {'en': -1, 'ru': 2}, {'en': 0, 'ru': 0}, {}])
+def test_invalid_weights_are_rejected(corpus_dirs, weights):
+    mixture = BigramMixture.from_dirs(corpus_dirs, COUNTED_ELEMS)
+    with pytest.raises(AssertionError):
+        mixture.mix_bigram_probs(weights)
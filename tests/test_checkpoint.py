@@ -0,0 +1,70 @@
+from mlo_optimizer.components import checkpoint
+from mlo_optimizer.components.checkpoint import read_checkpoint
+from mlo_optimizer.optimizer import Optimizer
+
+import pytest
+
+from tests.conftest import COUNTED_ELEMS, INIT_MATRIX, PERMUTABLE_ELEMS
+
+
+def make_optimizer(bigrams, **kwargs) -> Optimizer:
+    optimizer = Optimizer(INIT_MATRIX, COUNTED_ELEMS, PERMUTABLE_ELEMS, fitness_func='square', population_size=20,
+                          hall_of_fame_size=3, seed=7, **kwargs)
+    optimizer.bigram_probs, optimizer.bigram_probs_vec = bigrams
+    return optimizer
+
+
+def test_resumed_run_matches_uninterrupted_run(bigrams, tmp_path):
+    checkpoint_path = str(tmp_path / 'checkpoint.pkl')
+    make_optimizer(bigrams, max_generation=3, checkpoint_path=checkpoint_path).optimize()
+    assert read_checkpoint(checkpoint_path)['gen'] == 3
+
+    resumed = make_optimizer(bigrams, max_generation=6).optimize(resume_from=checkpoint_path, top_k=3)
+    uninterrupted = make_optimizer(bigrams, max_generation=6).optimize(top_k=3)
+
+    assert resumed == uninterrupted
+
+
+def test_resumed_run_keeps_stopping_counters(bigrams, tmp_path):
+    checkpoint_path = str(tmp_path / 'checkpoint.pkl')
+    make_optimizer(bigrams, max_generation=3, checkpoint_path=checkpoint_path).optimize()
+    state = read_checkpoint(checkpoint_path)
+    n_evals = sum(record['nevals'] for record in state['logbook'])
+    assert state['stopping_state']['n_evals'] == n_evals
+
+    # The budget is almost spent before the interruption, so the resumed run stops after one generation
+    resumed_path = str(tmp_path / 'resumed.pkl')
+    make_optimizer(bigrams, max_generation=10, max_evals=n_evals + 1,
+                   checkpoint_path=resumed_path).optimize(resume_from=checkpoint_path)
+    last_record = read_checkpoint(resumed_path)['logbook'][-1]
+
+    assert last_record['gen'] == 4
+    assert last_record['stop_reason'] == 'max_evals'
+
+
+def test_run_stopped_early_is_not_continued(bigrams, tmp_path):
+    checkpoint_path = str(tmp_path / 'checkpoint.pkl')
+    stopped = make_optimizer(bigrams, max_generation=10, max_evals=50,
+                             checkpoint_path=checkpoint_path).optimize(top_k=3)
+    state = read_checkpoint(checkpoint_path)
+    assert state['logbook'][-1]['stop_reason'] == 'max_evals'
+
+    # The evaluation budget is not set again, but the stop is kept
+    records = []
+    resumed = make_optimizer(bigrams, max_generation=10, metrics_sink=records.append).optimize(
+        resume_from=checkpoint_path, top_k=3)
+
+    assert resumed == stopped
+    assert records == []
+
+
+def test_writer_error_stops_run(bigrams, tmp_path, monkeypatch):
+    def write_checkpoint(path, state):
+        raise ValueError('state cannot be written')
+
+    monkeypatch.setattr(checkpoint, 'write_checkpoint', write_checkpoint)
+    optimizer = make_optimizer(bigrams, max_generation=5, checkpoint_path=str(tmp_path / 'checkpoint.pkl'),
+                               checkpoint_interval=1)
+
+    with pytest.raises(ValueError, match='state cannot be written'):
+        optimizer.optimize()
@@ -0,0 +1,76 @@
+from mlo_optimizer.components.genetic_alg import random_matrix
+from mlo_optimizer.components.individual import get_origin
+from mlo_optimizer.keyboards.distances import get_slot_coords, get_slot_dists_matrix, hex_dist, square_dist
+from mlo_optimizer.keyboards.evaluator import LayoutEvaluator
+from mlo_optimizer.keyboards.fitness import weighted_average_fitness_func
+
+import numpy as np
+
+import pytest
+
+from tests.conftest import INIT_MATRIX
+
+
+@pytest.mark.parametrize('dist_func', ['square', 'hex'])
+def test_slot_dists_matrix_matches_pairwise_distances(dist_func):
+    coords = get_slot_coords(INIT_MATRIX)
+    dists_matrix = get_slot_dists_matrix(INIT_MATRIX, dist_func)
+
+    for slot_1, slot_2 in np.random.default_rng(0).integers(len(coords), size=(200, 2)).tolist():
+        if dist_func == 'square':
+            expected = square_dist(coords[slot_1], coords[slot_2])
+        else:
+            expected = hex_dist(coords[slot_1], coords[slot_2])
+        assert dists_matrix[slot_1, slot_2] == pytest.approx(expected, abs=1e-12)
+
+
+@pytest.mark.parametrize('dist_func', ['square', 'hex'])
+def test_evaluator_matches_fitness_func(template, bigrams, dist_func):
+    bigram_probs, bigram_probs_vec = bigrams
+    evaluator = LayoutEvaluator(INIT_MATRIX, bigram_probs, bigram_probs_vec, dist_func=dist_func, template=template)
+    rng = np.random.default_rng(0)
+    population = [random_matrix(template, rng=rng) for _ in range(20)]
+    matrices = [template.to_matrix(individual.genome) for individual in population]
+
+    expected = [weighted_average_fitness_func(matrix, bigram_probs, bigram_probs_vec, dist_func=dist_func)[0]
+                for matrix in matrices]
+    assert [evaluator.evaluate(matrix)[0] for matrix in matrices] == pytest.approx(expected, rel=1e-12)
+    assert [fitness[0] for fitness in evaluator.evaluate_population(matrices)] == pytest.approx(expected, rel=1e-12)
+    assert [fitness[0] for fitness in evaluator.evaluate_population(population)] == pytest.approx(expected, rel=1e-12)
+
+
+@pytest.mark.parametrize('dist_func', ['square', 'hex'])
+def test_delta_evaluation_matches_full_evaluation(template, bigrams, dist_func):
+    bigram_probs, bigram_probs_vec = bigrams
+    evaluator = LayoutEvaluator(INIT_MATRIX, bigram_probs, bigram_probs_vec, dist_func=dist_func, template=template)
+    rng = np.random.default_rng(1)
+    parents = [random_matrix(template, rng=rng) for _ in range(40)]
+    for parent, fitness in zip(parents, evaluator.evaluate_population(parents)):
+        parent.fitness.values = fitness
+
+    # Offspring differ from their parents by one to three swaps
+    offspring = []
+    for parent in parents:
+        genome = parent.genome.copy()
+        for _ in range(rng.integers(1, 4)):
+            slot_1, slot_2 = rng.choice(template.n_placed, size=2, replace=False)
+            genome[[slot_1, slot_2]] = genome[[slot_2, slot_1]]
+        child = type(parent)(genome)
+        child.origin = get_origin(parent)
+        offspring.append(child)
+
+    evaluate_deltas = evaluator.evaluate_deltas
+    n_delta_evals = []
+
+    def count_delta_evals(slots, parent_slots, parent_scores):
+        n_delta_evals.append(len(slots))
+        return evaluate_deltas(slots, parent_slots, parent_scores)
+
+    evaluator.evaluate_deltas = count_delta_evals
+    delta_scores = [fitness[0] for fitness in evaluator.evaluate_population(offspring)]
+    assert sum(n_delta_evals) > 0
+    for child in offspring:
+        child.origin = None
+    full_scores = [fitness[0] for fitness in evaluator.evaluate_population(offspring)]
+
+    assert delta_scores == pytest.approx(full_scores, rel=1e-12, abs=1e-12)
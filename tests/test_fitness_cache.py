@@ -0,0 +1,98 @@
+from mlo_optimizer.components.fitness_cache import FitnessCache
+from mlo_optimizer.components.genome import LayoutTemplate
+from mlo_optimizer.components.individual import IndividualMin
+from mlo_optimizer.optimizer import Optimizer
+
+import numpy as np
+
+import pytest
+
+from tests.conftest import COUNTED_ELEMS, INIT_MATRIX, PERMUTABLE_ELEMS
+
+# Two of the four elements are placed, so genomes that differ only in the last two genes give the same matrix
+TEMPLATE = LayoutTemplate([['inv', None, None]], ['a', 'b', 'c', 'd'])
+
+
+def make_individuals(*genomes) -> list:
+    return [IndividualMin(np.array(genome, dtype=TEMPLATE.genome_dtype)) for genome in genomes]
+
+
+class CountingEvaluate:
+    def __init__(self):
+        self.evaluated = []
+
+    def __call__(self, individuals: list) -> list:
+        self.evaluated.extend(tuple(individual.genome.tolist()) for individual in individuals)
+        return [(float(individual.genome[0] * 10 + individual.genome[1]),) for individual in individuals]
+
+
+def test_cache_evaluates_each_matrix_once():
+    evaluate = CountingEvaluate()
+    cache = FitnessCache(evaluate, TEMPLATE, maxsize=10)
+
+    fitnesses = cache.evaluate_population(make_individuals([0, 1, 2, 3], [0, 1, 3, 2], [1, 0, 2, 3]))
+    assert fitnesses == [(1.0,), (1.0,), (10.0,)]
+    assert evaluate.evaluated == [(0, 1, 2, 3), (1, 0, 2, 3)]
+    assert cache.get_log_record() == {'cache_hits': 1, 'cache_misses': 2}
+
+    assert cache.evaluate_population(make_individuals([1, 0, 3, 2], [2, 3, 0, 1])) == [(10.0,), (23.0,)]
+    assert len(evaluate.evaluated) == 3
+    # Counters are reset by each log record
+    assert cache.get_log_record() == {'cache_hits': 1, 'cache_misses': 1}
+    assert cache.get_log_record() == {'cache_hits': 0, 'cache_misses': 0}
+
+
+def test_least_recently_used_values_are_evicted():
+    evaluate = CountingEvaluate()
+    cache = FitnessCache(evaluate, TEMPLATE, maxsize=2)
+    first, second, third = make_individuals([0, 1, 2, 3], [1, 2, 0, 3], [2, 3, 0, 1])
+
+    cache.evaluate_population([first, second])
+    # The hit makes the first value the most recently used one, so the second one is evicted
+    cache.evaluate_population([first])
+    cache.evaluate_population([third])
+    assert len(cache.values) == 2
+
+    assert cache.get(first) == (1.0,)
+    assert cache.get(second) is None
+    assert cache.get(third) == (23.0,)
+    assert cache.get_log_record() == {'cache_hits': 3, 'cache_misses': 4}
+
+
+def test_put_stores_asynchronously_evaluated_values():
+    cache = FitnessCache(CountingEvaluate(), TEMPLATE, maxsize=1)
+    first, second = make_individuals([0, 1, 2, 3], [1, 2, 0, 3])
+
+    assert cache.get(first) is None
+    cache.put(first, (5.0,))
+    assert cache.get(first) == (5.0,)
+    cache.put(second, (7.0,))
+    assert cache.get(first) is None
+    assert cache.evaluate_population([second]) == [(7.0,)]
+
+
+def count_vowel_rows(matrix, **kwargs) -> tuple:
+    return (float(sum(i for i, row in enumerate(matrix) for elem in row if elem in 'aeiou')),)
+
+
+@pytest.mark.parametrize('pure_fitness_func', [False, True])
+def test_custom_function_is_cached_only_if_pure(pure_fitness_func):
+    records = []
+    optimizer = Optimizer(INIT_MATRIX, COUNTED_ELEMS, PERMUTABLE_ELEMS, fitness_func=count_vowel_rows,
+                          population_size=20, max_generation=3, fitness_cache_size=100,
+                          pure_fitness_func=pure_fitness_func, metrics_sink=records.append, seed=0)
+    optimizer.optimize()
+
+    assert len(records) == 4
+    assert all(('cache_hits' in record) == pure_fitness_func for record in records)
+
+
+def test_built_in_function_is_cached(bigrams):
+    records = []
+    optimizer = Optimizer(INIT_MATRIX, COUNTED_ELEMS, PERMUTABLE_ELEMS, fitness_func='square', population_size=20,
+                          max_generation=3, fitness_cache_size=100, metrics_sink=records.append, seed=0)
+    optimizer.bigram_probs, optimizer.bigram_probs_vec = bigrams
+    optimizer.optimize()
+
+    assert len(records) == 4
+    assert all('cache_hits' in record for record in records)
@@ -0,0 +1,19 @@
+import json
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+ROOT_DIR = pathlib.Path(__file__).resolve().parent.parent
+LAZY_MODULES = ('nltk', 'pandas', 'tqdm')
+
+
+@pytest.mark.parametrize('module', ['mlo_optimizer.optimizer', 'mlo_optimizer.keyboards.evaluator'])
+def test_import_does_not_load_corpus_dependencies(module):
+    # A fresh interpreter is needed, the test session may have imported the dependencies already
+    code = f'import json, sys; import {module}; print(json.dumps(sorted(sys.modules)))'
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    loaded_modules = json.loads(result.stdout)
+
+    assert not [name for name in loaded_modules if name.split('.')[0] in LAZY_MODULES]
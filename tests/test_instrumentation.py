@@ -0,0 +1,29 @@
+import json
+
+from mlo_optimizer.components.instrumentation import JsonLinesSink
+
+import numpy as np
+
+
+def test_json_lines_sink_writes_single_objective_records(tmp_path):
+    path = tmp_path / 'metrics.jsonl'
+    sink = JsonLinesSink(str(path))
+    sink({'gen': 0, 'nevals': np.int64(20), 'min': np.float64(1.5), 'avg': 2.25})
+    sink({'gen': 1, 'nevals': 10, 'min': np.float32(1.25), 'avg': np.float64(2.0)})
+    sink.close()
+
+    assert [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()] == [
+        {'gen': 0, 'nevals': 20, 'min': 1.5, 'avg': 2.25},
+        {'gen': 1, 'nevals': 10, 'min': 1.25, 'avg': 2.0},
+    ]
+
+
+def test_json_lines_sink_writes_multi_objective_records(tmp_path):
+    path = tmp_path / 'metrics.jsonl'
+    sink = JsonLinesSink(str(path))
+    # Statistics of several objectives are vectors
+    sink({'gen': 0, 'nevals': 20, 'min': np.array([1.5, 0.25]), 'max': np.array([3.0, 0.5])})
+    sink.close()
+
+    record = json.loads(path.read_text(encoding='utf-8'))
+    assert record == {'gen': 0, 'nevals': 20, 'min': [1.5, 0.25], 'max': [3.0, 0.5]}
@@ -0,0 +1,100 @@
+from mlo_optimizer.components import islands
+from mlo_optimizer.components.individual import IndividualMin
+from mlo_optimizer.components.islands import IslandConfig, IslandModel, migrate
+from mlo_optimizer.components.nsga import make_halloffame
+from mlo_optimizer.keyboards.evaluator import LayoutEvaluator
+from mlo_optimizer.optimizer import Optimizer
+
+import numpy as np
+
+import pytest
+
+from tests.conftest import COUNTED_ELEMS, INIT_MATRIX, PERMUTABLE_ELEMS
+
+WEIGHTS = (-1.0,)
+
+
+def make_states(n_islands: int, population_size: int, seed: int) -> list:
+    # The genome of an individual holds the numbers of its island and of its position
+    rng = np.random.default_rng(seed)
+    return [{
+        'genomes': np.array([[island, i] for i in range(population_size)]),
+        'fitness_values': rng.permutation(population_size).astype(float)[:, np.newaxis],
+    } for island in range(n_islands)]
+
+
+def get_ids_from_best(state: dict) -> list:
+    return np.argsort(state['fitness_values'][:, 0], kind='stable').tolist()
+
+
+def get_genomes(state: dict, ids: list) -> set:
+    return {tuple(state['genomes'][i].tolist()) for i in ids}
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_ring_migrants_replace_worst_individuals(seed):
+    states = make_states(4, 10, seed)
+    old_states = make_states(4, 10, seed)
+    migrate(states, 3, 'ring', WEIGHTS)
+
+    for island, (state, old_state) in enumerate(zip(states, old_states)):
+        source = old_states[island - 1]
+        ids = get_ids_from_best(old_state)
+        assert get_genomes(state, ids[-3:]) == get_genomes(source, get_ids_from_best(source)[:3])
+        assert get_genomes(state, ids[:-3]) == get_genomes(old_state, ids[:-3])
+        # Migrants keep their fitness values
+        assert sorted(state['fitness_values'][ids[-3:], 0]) == [0.0, 1.0, 2.0]
+
+
+def test_full_migrants_replace_at_most_half_of_island():
+    states = make_states(4, 10, 0)
+    old_states = make_states(4, 10, 0)
+    migrate(states, 2, 'full', WEIGHTS)
+
+    for island, (state, old_state) in enumerate(zip(states, old_states)):
+        ids = get_ids_from_best(old_state)
+        # Six migrants come from the other islands, but only the worst half of the island is replaced
+        assert {genome[0] for genome in get_genomes(state, ids[-5:])} <= set(range(4)) - {island}
+        assert get_genomes(state, ids[:5]) == get_genomes(old_state, ids[:5])
+        for source in set(range(4)) - {island}:
+            assert get_genomes(state, ids[-5:]) & get_genomes(old_states[source], get_ids_from_best(old_states[source]))
+
+
+@pytest.fixture
+def config(template, bigrams) -> IslandConfig:
+    bigram_probs, bigram_probs_vec = bigrams
+    evaluate = LayoutEvaluator(INIT_MATRIX, bigram_probs, bigram_probs_vec, template=template)
+    return IslandConfig(template, IndividualMin, evaluate, cxpb=0.9, mutpb=0.2, tourn_size=3, hall_of_fame_size=2)
+
+
+def test_islands_migrate_every_interval(config, monkeypatch):
+    migration_gens = []
+
+    def record_migration(states, *args):
+        migration_gens.append([state['gen'] for state in states])
+        migrate(states, *args)
+
+    monkeypatch.setattr(islands, 'migrate', record_migration)
+    with IslandModel(config, n_islands=3) as island_model:
+        logbook = island_model.run(10, max_generation=7, migration_interval=3, migration_size=1, topology='ring',
+                                   halloffame=make_halloffame(IndividualMin, 2), seed=0, verbose=False)
+
+    # No migration follows the last epoch
+    assert migration_gens == [[3, 3, 3], [6, 6, 6]]
+    assert logbook.select('gen') == list(range(8))
+
+
+def make_optimizer(bigrams, **kwargs) -> Optimizer:
+    optimizer = Optimizer(INIT_MATRIX, COUNTED_ELEMS, PERMUTABLE_ELEMS, fitness_func='square', population_size=10,
+                          max_generation=6, hall_of_fame_size=3, n_islands=3, migration_interval=2, seed=5, **kwargs)
+    optimizer.bigram_probs, optimizer.bigram_probs_vec = bigrams
+    return optimizer
+
+
+@pytest.mark.parametrize('topology', ['ring', 'full'])
+def test_seeded_islands_are_reproducible(bigrams, topology):
+    result = make_optimizer(bigrams, topology=topology).optimize(top_k=3)
+
+    assert make_optimizer(bigrams, topology=topology).optimize(top_k=3) == result
+    # Islands keep their own random number generators, so the number of processes doesn't matter
+    assert make_optimizer(bigrams, topology=topology, n_jobs=2).optimize(top_k=3) == result
@@ -0,0 +1,57 @@
+from mlo_optimizer.components.individual import IndividualMax, IndividualMin
+from mlo_optimizer.keyboards.evaluator import LayoutEvaluator
+from mlo_optimizer.keyboards.local_search import SwapLocalSearch
+
+import numpy as np
+
+import pytest
+
+from tests.conftest import INIT_MATRIX
+
+
+def make_evaluator(template, bigrams, dist_func: str) -> LayoutEvaluator:
+    bigram_probs, bigram_probs_vec = bigrams
+    return LayoutEvaluator(INIT_MATRIX, bigram_probs, bigram_probs_vec, dist_func=dist_func, template=template)
+
+
+@pytest.mark.parametrize('dist_func', ['square', 'hex'])
+def test_swap_deltas_match_rescoring(template, bigrams, dist_func):
+    evaluator = make_evaluator(template, bigrams, dist_func)
+    local_search = SwapLocalSearch(evaluator, max_steps=1)
+    rng = np.random.default_rng(0)
+    genomes = np.stack([template.random_genome(rng) for _ in range(3)])
+
+    deltas = local_search.get_swap_deltas(evaluator.encode_genomes(genomes))
+    scores = evaluator.evaluate_slots(evaluator.encode_genomes(genomes))
+
+    n_placed = local_search.n_placed
+    assert deltas.shape == (len(genomes), n_placed, n_placed)
+    expected = np.zeros_like(deltas)
+    for gene_1 in range(n_placed):
+        for gene_2 in range(n_placed):
+            swapped = genomes.copy()
+            swapped[:, [gene_1, gene_2]] = swapped[:, [gene_2, gene_1]]
+            expected[:, gene_1, gene_2] = evaluator.evaluate_slots(evaluator.encode_genomes(swapped)) - scores
+
+    np.testing.assert_allclose(deltas, expected, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize('minimization', [True, False])
+def test_refined_offspring_are_not_worse(template, bigrams, minimization):
+    evaluator = make_evaluator(template, bigrams, 'square')
+    local_search = SwapLocalSearch(evaluator, max_steps=3, minimization=minimization)
+    individual_class = IndividualMin if minimization else IndividualMax
+    rng = np.random.default_rng(1)
+    population = [individual_class(template.random_genome(rng)) for _ in range(20)]
+    for individual, fitness in zip(population, evaluator.evaluate_population(population)):
+        individual.fitness.values = fitness
+
+    refined = local_search.refine_best(population, top_k=8)
+
+    assert len(refined) == len(population)
+    n_changed = 0
+    for old, new, fitness in zip(population, refined, evaluator.evaluate_population(refined)):
+        assert not new.fitness < old.fitness
+        assert new.fitness.values == pytest.approx(fitness, rel=1e-12)
+        n_changed += new is not old
+    assert 0 < n_changed <= 8
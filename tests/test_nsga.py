@@ -0,0 +1,127 @@
+from deap import tools
+
+from mlo_optimizer.components.individual import get_multi_objective_class
+from mlo_optimizer.components.nsga import ParetoArchive, get_crowding_distances, get_pareto_ranks, \
+    get_weighted_values, sel_nsga2
+from mlo_optimizer.optimizer import Optimizer
+
+import numpy as np
+
+import pytest
+
+from tests.conftest import COUNTED_ELEMS, INIT_MATRIX, PERMUTABLE_ELEMS
+
+WEIGHTS = (-1.0, 1.0)
+
+
+def make_individuals(values: np.array) -> list:
+    individual_class = get_multi_objective_class(WEIGHTS)
+    individuals = []
+    for i, fitness_values in enumerate(values.tolist()):
+        individual = individual_class(np.array([i]))
+        individual.fitness.values = tuple(fitness_values)
+        individuals.append(individual)
+    return individuals
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_pareto_ranks_match_sort_nondominated(seed):
+    # Few distinct values give many equal and weakly dominated individuals
+    individuals = make_individuals(np.random.default_rng(seed).integers(5, size=(60, 2)))
+    ranks = get_pareto_ranks(get_weighted_values(individuals))
+
+    fronts = tools.sortNondominated(individuals, len(individuals))
+    assert ranks.max() + 1 == len(fronts)
+    for rank, front in enumerate(fronts):
+        assert sorted(int(individual.genome[0]) for individual in front) == np.flatnonzero(ranks == rank).tolist()
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_crowding_distances_match_deap(seed):
+    individuals = make_individuals(np.random.default_rng(seed).random((40, 2)))
+    wvalues = get_weighted_values(individuals)
+    ranks = get_pareto_ranks(wvalues)
+    distances = get_crowding_distances(wvalues, ranks)
+
+    for rank in range(ranks.max() + 1):
+        front_ids = np.flatnonzero(ranks == rank)
+        if len(front_ids) < 2:
+            continue
+        front = [individuals[i] for i in front_ids]
+        tools.emo.assignCrowdingDist(front)
+        np.testing.assert_allclose(distances[front_ids], [individual.fitness.crowding_dist for individual in front])
+
+
+def test_crowding_distances_skip_objectives_with_zero_span():
+    values = np.random.default_rng(0).random((8, 2))
+    # The first objective is the same for the whole front
+    values[:, 0] = 1.0
+    wvalues = get_weighted_values(make_individuals(values))
+    distances = get_crowding_distances(wvalues, np.zeros(len(values), dtype=int))
+
+    # Only the boundary individuals of the second objective are infinitely far, as DEAP gives when the constant
+    # objective is sorted last
+    front = make_individuals(values[:, ::-1])
+    tools.emo.assignCrowdingDist(front)
+    np.testing.assert_allclose(distances, [individual.fitness.crowding_dist for individual in front])
+    assert np.isinf(distances).sum() == 2
+
+    # Equal individuals are not crowded apart by any objective
+    assert get_crowding_distances(np.ones((3, 2)), np.zeros(3, dtype=int)).tolist() == [0.0, 0.0, 0.0]
+
+
+def test_sel_nsga2_keeps_fronts_in_order():
+    individuals = make_individuals(np.random.default_rng(1).random((30, 2)))
+    ranks = get_pareto_ranks(get_weighted_values(individuals))
+
+    selected = sel_nsga2(individuals, 12)
+    selected_ranks = [ranks[int(individual.genome[0])] for individual in selected]
+    assert len(selected) == 12
+    assert selected_ranks == sorted(selected_ranks)
+    # Fronts that fit into the selection are taken whole
+    for rank in set(selected_ranks[:-1]) - {selected_ranks[-1]}:
+        assert selected_ranks.count(rank) == (ranks == rank).sum()
+
+
+def test_pareto_archive_holds_pareto_front():
+    individuals = make_individuals(np.random.default_rng(2).random((50, 2)))
+    archive = ParetoArchive(maxsize=100)
+    archive.update(individuals[:25])
+    archive.update(individuals[25:])
+
+    front = tools.sortNondominated(individuals, len(individuals), first_front_only=True)[0]
+    assert sorted(int(individual.genome[0]) for individual in archive) == \
+        sorted(int(individual.genome[0]) for individual in front)
+
+
+def get_rows_sum(matrix: list, elems: str) -> float:
+    return float(sum(i for i, row in enumerate(matrix) for elem in row if elem in elems))
+
+
+def conflicting_objectives(matrix, **kwargs) -> tuple:
+    # The objectives conflict completely, so layouts with different scores don't dominate each other
+    rows_sum = get_rows_sum(matrix, 'abcde')
+    return rows_sum, rows_sum
+
+
+def make_optimizer(**kwargs) -> Optimizer:
+    return Optimizer(INIT_MATRIX, COUNTED_ELEMS, PERMUTABLE_ELEMS, fitness_func=conflicting_objectives,
+                     fitness_weights=(-1.0, 1.0), population_size=20, max_generation=5, seed=3, **kwargs)
+
+
+def test_pareto_front_is_not_limited_by_hall_of_fame_size():
+    # hall_of_fame_size keeps its default of 1
+    assert len(make_optimizer().optimize(top_k=5)) == 5
+    assert len(make_optimizer().optimize()) > 5
+
+    assert len(make_optimizer(pareto_front_size=3).optimize()) == 3
+    with pytest.raises(AssertionError, match='pareto_front_size'):
+        make_optimizer(pareto_front_size=3).optimize(top_k=4)
+
+
+def test_built_in_fitness_funcs_reject_several_weights(bigrams):
+    optimizer = Optimizer(INIT_MATRIX, COUNTED_ELEMS, PERMUTABLE_ELEMS, fitness_func='square',
+                          fitness_weights=(-1.0, 1.0))
+    optimizer.bigram_probs, optimizer.bigram_probs_vec = bigrams
+    with pytest.raises(AssertionError, match='custom fitness_func'):
+        optimizer.optimize()
@@ -0,0 +1,48 @@
+import random
+
+from mlo_optimizer.components.genetic_alg import mate_matrix, mutate_matrix, random_matrix
+
+import numpy as np
+
+import pytest
+
+
+def assert_permutation(genome: np.array, n_genes: int):
+    assert sorted(genome.tolist()) == list(range(n_genes))
+
+
+@pytest.fixture
+def population(template):
+    rng = np.random.default_rng(0)
+    return [random_matrix(template, rng=rng) for _ in range(50)]
+
+
+def test_mate_matrix_gives_permutations(template, population):
+    random.seed(0)
+    for individual_1, individual_2 in zip(population[::2], population[1::2]):
+        for child in mate_matrix(individual_1, individual_2):
+            assert_permutation(child.genome, len(template.permutable_elems))
+            assert not child.fitness.valid
+
+
+def test_mutate_matrix_gives_permutations(template, population):
+    random.seed(0)
+    np.random.seed(0)
+    for individual in population:
+        child, = mutate_matrix(individual, template)
+        assert_permutation(child.genome, len(template.permutable_elems))
+        # Only placed elements are swapped
+        assert child.genome[template.n_placed:].tolist() == individual.genome[template.n_placed:].tolist()
+
+
+def test_offspring_keep_matrix_structure(template, population):
+    random.seed(0)
+    child, _ = mate_matrix(population[0], population[1])
+    matrix = template.to_matrix(child.genome)
+
+    for row, init_row in zip(matrix, template.init_matrix):
+        for elem, init_elem in zip(row, init_row):
+            if init_elem is not None:
+                assert elem == init_elem
+            else:
+                assert elem in template.permutable_elems
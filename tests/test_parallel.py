@@ -0,0 +1,54 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from mlo_optimizer.components.individual import IndividualMin
+from mlo_optimizer.components.parallel import ParallelEvaluator
+from mlo_optimizer.keyboards.evaluator import LayoutEvaluator
+from mlo_optimizer.optimizer import Optimizer
+
+import numpy as np
+
+import pytest
+
+from tests.conftest import COUNTED_ELEMS, INIT_MATRIX, PERMUTABLE_ELEMS
+
+
+def weigh_genome(individual) -> tuple:
+    genome = individual.genome
+    return (float(genome @ np.arange(1, len(genome) + 1)),)
+
+
+@pytest.fixture
+def evaluator(template, bigrams) -> LayoutEvaluator:
+    bigram_probs, bigram_probs_vec = bigrams
+    return LayoutEvaluator(INIT_MATRIX, bigram_probs, bigram_probs_vec, template=template)
+
+
+@pytest.mark.parametrize('use_executor', [False, True])
+@pytest.mark.parametrize('compiled', [False, True])
+def test_parallel_fitnesses_match_serial(template, evaluator, use_executor, compiled):
+    rng = np.random.default_rng(0)
+    population = [IndividualMin(template.random_genome(rng)) for _ in range(50)]
+    evaluate = evaluator if compiled else weigh_genome
+    expected = [tuple(fitness) for fitness in evaluator.evaluate_population(population)] if compiled else \
+        [evaluate(individual) for individual in population]
+
+    with ProcessPoolExecutor(2) as executor:
+        with ParallelEvaluator(evaluate, n_jobs=2, executor=executor if use_executor else None) as parallel:
+            assert parallel.evaluate_population(population) == expected
+            # The shared population of the previous call is reused
+            assert parallel.evaluate_population(population[:20]) == expected[:20]
+
+
+def make_optimizer(bigrams, **kwargs) -> Optimizer:
+    optimizer = Optimizer(INIT_MATRIX, COUNTED_ELEMS, PERMUTABLE_ELEMS, fitness_func='square', population_size=20,
+                          max_generation=5, hall_of_fame_size=3, seed=11, **kwargs)
+    optimizer.bigram_probs, optimizer.bigram_probs_vec = bigrams
+    return optimizer
+
+
+def test_seeded_parallel_runs_match_serial_run(bigrams):
+    expected = make_optimizer(bigrams).optimize(top_k=3)
+
+    assert make_optimizer(bigrams, n_jobs=2).optimize(top_k=3) == expected
+    with ProcessPoolExecutor(2) as executor:
+        assert make_optimizer(bigrams, executor=executor).optimize(top_k=3) == expected
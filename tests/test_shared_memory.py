@@ -0,0 +1,40 @@
+import pickle
+
+from mlo_optimizer.components import shared_memory
+from mlo_optimizer.components.shared_memory import SharedArray
+
+import numpy as np
+
+
+def test_attached_array_uses_memory_of_block():
+    shared_array = SharedArray.from_array(np.arange(6).reshape(2, 3))
+    try:
+        attached = pickle.loads(pickle.dumps(shared_array))
+        np.testing.assert_array_equal(attached, shared_array.array)
+
+        shared_array.array[1, 2] = 10
+        assert attached[1, 2] == 10
+        del attached
+        shared_memory.detach_array(shared_array.shm.name)
+    finally:
+        shared_array.close()
+
+
+def test_block_of_same_role_replaces_attached_block():
+    old_array = SharedArray((4, 3), np.int16, role='test_genomes')
+    new_array = SharedArray((8, 3), np.int16, role='test_genomes')
+    try:
+        pickle.loads(pickle.dumps(old_array))
+        old_shm = shared_memory._attached_arrays[old_array.shm.name][0]
+
+        attached = pickle.loads(pickle.dumps(new_array))
+        assert attached.shape == (8, 3)
+        assert old_array.shm.name not in shared_memory._attached_arrays
+        # The replaced block is closed in the attaching process
+        assert old_shm.buf is None
+
+        del attached
+        shared_memory.detach_array(shared_memory._attached_roles.pop('test_genomes'))
+    finally:
+        old_array.close()
+        new_array.close()
@@ -0,0 +1,40 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from mlo_optimizer.components.genetic_alg import make_statistics, make_toolbox
+from mlo_optimizer.components.genome import LayoutTemplate
+from mlo_optimizer.components.individual import IndividualMin
+from mlo_optimizer.components.steady_state import ea_steady_state
+
+import numpy as np
+
+# Five elements in five slots give only 120 genomes, so the offspring often repeat evaluated ones
+SMALL_MATRIX = [
+    ['inv', None, None],
+    [None, None, None],
+]
+SMALL_ELEMS = ['a', 'b', 'c', 'd', 'e']
+
+
+def test_steady_state_submits_only_uncached_genomes():
+    template = LayoutTemplate(SMALL_MATRIX, SMALL_ELEMS)
+    evaluated_keys = Counter()
+
+    def evaluate(individual):
+        evaluated_keys[individual.genome.tobytes()] += 1
+        return (float(individual.genome @ np.arange(1, template.n_genes + 1)),)
+
+    def evaluate_chunk(individuals):
+        return [evaluate(individual) for individual in individuals]
+
+    rng = np.random.default_rng(0)
+    toolbox = make_toolbox(template, IndividualMin, evaluate, rng, tourn_size=2, fitness_cache_size=1000)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        toolbox.register('submit_evaluation', executor.submit, evaluate_chunk)
+        population, logbook = ea_steady_state(toolbox.populationCreator(n=10), toolbox, cxpb=0.9, mutpb=0.5,
+                                              ngen=30, max_pending=4, stats=make_statistics(), verbose=False)
+
+    assert sum(logbook.select('cache_hits')) > 0
+    assert max(evaluated_keys.values()) == 1
+    for individual in population:
+        assert individual.fitness.values == evaluate(individual)
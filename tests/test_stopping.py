@@ -0,0 +1,86 @@
+from itertools import count
+
+from mlo_optimizer.components import stopping
+from mlo_optimizer.components.algelitism import ea_simple_elitism
+from mlo_optimizer.components.genetic_alg import make_statistics, make_toolbox
+from mlo_optimizer.components.individual import IndividualMin
+from mlo_optimizer.components.stopping import StoppingCriteria
+from mlo_optimizer.keyboards.evaluator import LayoutEvaluator
+from mlo_optimizer.optimizer import Optimizer
+
+import numpy as np
+
+import pytest
+
+from tests.conftest import COUNTED_ELEMS, INIT_MATRIX, PERMUTABLE_ELEMS
+
+
+def run(template, evaluate, stopping_criteria: StoppingCriteria, ngen: int = 30):
+    toolbox = make_toolbox(template, IndividualMin, evaluate, np.random.default_rng(0), tourn_size=3)
+    toolbox.register('get_stop_reason', stopping_criteria.get_stop_reason)
+    _, logbook = ea_simple_elitism(toolbox.populationCreator(n=20), toolbox, cxpb=0.9, mutpb=0.2, ngen=ngen,
+                                   stats=make_statistics(), verbose=False)
+    return logbook
+
+
+@pytest.fixture
+def evaluator(template, bigrams) -> LayoutEvaluator:
+    bigram_probs, bigram_probs_vec = bigrams
+    return LayoutEvaluator(INIT_MATRIX, bigram_probs, bigram_probs_vec, template=template)
+
+
+def test_small_improvements_do_not_reset_stagnation_window():
+    criteria = StoppingCriteria(100, stagnation_window=3, min_improvement=0.01)
+    # Improvements by 0.5% are too small, the improvement by 5% resets the window
+    bests = [100.0, 99.5, 99.0, 94.0, 93.9, 93.8, 93.7]
+    reasons = [criteria.get_stop_reason({'gen': gen, 'nevals': 10, 'min': best}) for gen, best in enumerate(bests)]
+
+    assert reasons == [None, None, None, None, None, None, 'stagnation']
+    assert criteria.best_gen == 3
+
+
+def test_stagnation_stops_run(template):
+    def evaluate(individual):
+        return (1.0,)
+
+    logbook = run(template, evaluate, StoppingCriteria(30, stagnation_window=4, min_improvement=0.01))
+
+    assert logbook[-1]['gen'] == 4
+    assert logbook[-1]['stop_reason'] == 'stagnation'
+    assert all('stop_reason' not in record for record in logbook[:-1])
+
+
+def test_max_evals_stops_run(template, evaluator):
+    logbook = run(template, evaluator, StoppingCriteria(30, max_evals=100))
+    n_evals = np.cumsum(logbook.select('nevals'))
+
+    assert logbook[-1]['stop_reason'] == 'max_evals'
+    assert n_evals[-1] >= 100 > n_evals[-2]
+
+
+def test_max_time_stops_run(template, evaluator, monkeypatch):
+    # Each reading of the clock takes a second
+    clock = count()
+    monkeypatch.setattr(stopping.time, 'perf_counter', lambda: float(next(clock)))
+    logbook = run(template, evaluator, StoppingCriteria(30, max_time=3.5))
+
+    assert logbook[-1]['gen'] == 3
+    assert logbook[-1]['stop_reason'] == 'max_time'
+
+
+def test_max_generation_is_recorded(template, evaluator):
+    logbook = run(template, evaluator, StoppingCriteria(5), ngen=5)
+
+    assert logbook[-1]['gen'] == 5
+    assert logbook[-1]['stop_reason'] == 'max_generation'
+
+
+def test_optimizer_exports_stop_reason(bigrams):
+    records = []
+    optimizer = Optimizer(INIT_MATRIX, COUNTED_ELEMS, PERMUTABLE_ELEMS, fitness_func='square', population_size=20,
+                          max_generation=30, max_evals=100, metrics_sink=records.append, seed=1)
+    optimizer.bigram_probs, optimizer.bigram_probs_vec = bigrams
+    optimizer.optimize()
+
+    assert records[-1]['stop_reason'] == 'max_evals'
+    assert sum(record['nevals'] for record in records) >= 100
@@ -0,0 +1,78 @@
+from mlo_optimizer.components.genome import LayoutTemplate
+from mlo_optimizer.components.individual import IndividualMax, IndividualMin
+from mlo_optimizer.components.trajectory import TrajectoryConfig, run_restart
+from mlo_optimizer.keyboards.evaluator import LayoutEvaluator
+from mlo_optimizer.optimizer import Optimizer
+
+import numpy as np
+
+import pytest
+
+from tests.conftest import COUNTED_ELEMS, INIT_MATRIX, PERMUTABLE_ELEMS
+
+N_STEPS = {'annealing': 300, 'tabu': 20}
+
+
+def weigh_genome(individual) -> tuple:
+    # Objective function without incremental swap deltas
+    genome = individual.genome
+    return (float(genome @ np.arange(1, len(genome) + 1)),)
+
+
+def check_restart(config: TrajectoryConfig, seed: int):
+    seed_seq = np.random.SeedSequence(seed)
+    # The restart starts from the first genome drawn by its generator
+    start_genome = config.template.random_genome(np.random.default_rng(seed_seq))
+    start = config.individual_class(start_genome)
+    start.fitness.values = config.evaluate(config.individual_class(start_genome))
+
+    genome, score = run_restart(config, seed_seq)
+    individual = config.individual_class(genome)
+    individual.fitness.values = (score,)
+
+    assert sorted(genome.tolist()) == list(range(config.template.n_genes))
+    assert score == pytest.approx(config.evaluate(config.individual_class(genome))[0], rel=1e-12)
+    assert not individual.fitness < start.fitness
+    assert run_restart(config, np.random.SeedSequence(seed))[0].tolist() == genome.tolist()
+
+
+@pytest.mark.parametrize('engine', ['annealing', 'tabu'])
+@pytest.mark.parametrize('seed', range(3))
+def test_restart_is_not_worse_than_start(template, bigrams, engine, seed):
+    bigram_probs, bigram_probs_vec = bigrams
+    evaluate = LayoutEvaluator(INIT_MATRIX, bigram_probs, bigram_probs_vec, template=template)
+    check_restart(TrajectoryConfig(engine, template, IndividualMin, evaluate, N_STEPS[engine]), seed)
+
+
+@pytest.mark.parametrize('engine', ['annealing', 'tabu'])
+@pytest.mark.parametrize('individual_class', [IndividualMin, IndividualMax])
+def test_restart_with_custom_function(template, engine, individual_class):
+    check_restart(TrajectoryConfig(engine, template, individual_class, weigh_genome, N_STEPS[engine]), 0)
+
+
+@pytest.mark.parametrize('engine', ['annealing', 'tabu'])
+def test_single_placed_element_is_kept(engine):
+    # Three elements compete for a single free slot, so no swap is possible
+    template = LayoutTemplate([['inv', None]], ['a', 'b', 'c'])
+    config = TrajectoryConfig(engine, template, IndividualMin, weigh_genome, 10)
+    start_genome = template.random_genome(np.random.default_rng(np.random.SeedSequence(0)))
+
+    genome, score = run_restart(config, np.random.SeedSequence(0))
+    assert genome.tolist() == start_genome.tolist()
+    assert score == weigh_genome(IndividualMin(start_genome))[0]
+
+
+@pytest.mark.parametrize('engine', ['annealing', 'tabu'])
+def test_optimizer_engines_return_layouts(bigrams, engine):
+    optimizer = Optimizer(INIT_MATRIX, COUNTED_ELEMS, PERMUTABLE_ELEMS, fitness_func='square', engine=engine,
+                          n_restarts=2, n_steps=N_STEPS[engine], hall_of_fame_size=2, seed=0)
+    optimizer.bigram_probs, optimizer.bigram_probs_vec = bigrams
+    layouts = optimizer.optimize(top_k=2)
+
+    assert layouts[0][1] <= layouts[1][1]
+    for matrix, _ in layouts:
+        elems = [elem for row in matrix for elem in row]
+        assert sorted(elem for elem in elems if elem in PERMUTABLE_ELEMS) == sorted(PERMUTABLE_ELEMS)
+        for row, init_row in zip(matrix, INIT_MATRIX):
+            assert [elem for elem, init_elem in zip(row, init_row) if init_elem is not None] == \
+                [init_elem for init_elem in init_row if init_elem is not None]